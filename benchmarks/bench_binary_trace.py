@@ -0,0 +1,78 @@
+"""
+Microbenchmark of writing decorator records to a file with BinaryTraceHandler compared to FileHandler with
+LogFormatter in verbose and JSON modes.
+
+Run from the repository root:
+
+    python benchmarks/bench_binary_trace.py
+"""
+import logging
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_decorator.binary_trace import BinaryTraceHandler  # noqa: E402
+from log_decorator.log_formatter import FormatterMode, LogFormatter  # noqa: E402
+
+NUMBER = 20000
+
+REPEAT = 5
+
+KEYS = ('call_id', 'function', 'input_data', 'result', 'execution_time_ms')
+
+
+def get_records() -> list:
+    """Call and return records of a decorated function with a few arguments."""
+    function = 'service.handlers.orders.OrderService.create_order'
+    input_data = {'self': '<OrderService>', 'customer_id': 12345, 'items': [{'sku': 'SKU-1', 'quantity': 2}]}
+
+    records = []
+    for i in range(100):
+        call_id = f'{i:032x}'
+        extra = {'call_id': call_id, 'function': function, 'input_data': input_data}
+        records.append(_make_record(f'call {function}', extra))
+        extra = {**extra, 'execution_time_ms': 1.234, 'result': {'order_id': i, 'status': 'created'}}
+        records.append(_make_record(f'return {function}', extra))
+    return records
+
+
+def main():
+    records = get_records()
+
+    with tempfile.TemporaryDirectory() as directory:
+        handlers = {
+            'verbose': _get_file_handler(os.path.join(directory, 'verbose.log'), FormatterMode.VERBOSE),
+            'json': _get_file_handler(os.path.join(directory, 'json.log'), FormatterMode.JSON),
+            'binary': BinaryTraceHandler(os.path.join(directory, 'trace.bin')),
+        }
+
+        for name, handler in handlers.items():
+            def write(handler=handler):  # noqa: WPS430
+                for record in records:
+                    handler.handle(record)
+
+            elapsed = min(timeit.repeat(write, number=NUMBER // len(records), repeat=REPEAT))
+            handler.close()
+
+            size = os.path.getsize(handler.baseFilename)
+            count = NUMBER // len(records) * len(records) * REPEAT
+            print(
+                f'{name:8} {elapsed / NUMBER * 1e6:7.2f} us/record, {size / count:7.1f} bytes/record',
+            )
+
+
+def _get_file_handler(path: str, formatter_mode: FormatterMode) -> logging.FileHandler:
+    handler = logging.FileHandler(path)
+    handler.setFormatter(LogFormatter(formatter_mode=formatter_mode, limit_keys_to=KEYS))
+    return handler
+
+
+def _make_record(msg: str, extra: dict) -> logging.LogRecord:
+    return logging.getLogger('bench').makeRecord('bench', logging.INFO, '', 0, msg, (), None, extra=extra)
+
+
+if __name__ == '__main__':
+    main()
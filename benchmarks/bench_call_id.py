@@ -0,0 +1,46 @@
+"""
+Benchmark of call id generators in one and several threads.
+
+Run from the repository root:
+
+    python benchmarks/bench_call_id.py
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_decorator.call_id import fast_call_id, uuid1_call_id  # noqa: E402
+
+IDS_PER_THREAD = 100000
+
+THREADS_COUNTS = (1, 4, 16)
+
+
+def run_threads(threads_count: int, generate) -> float:
+    """Generate ids in threads and return time per id in ns."""
+    threads = [
+        threading.Thread(target=lambda: [generate() for _ in range(IDS_PER_THREAD)])
+        for _ in range(threads_count)
+    ]
+
+    start_time = time.perf_counter_ns()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return (time.perf_counter_ns() - start_time) / (threads_count * IDS_PER_THREAD)
+
+
+def main():
+    for threads_count in THREADS_COUNTS:
+        uuid1_ns = run_threads(threads_count, uuid1_call_id)
+        fast_ns = run_threads(threads_count, fast_call_id)
+        print(f'{threads_count:2} threads: uuid1 {uuid1_ns:7.1f} ns/id, fast {fast_ns:7.1f} ns/id')
+
+
+if __name__ == '__main__':
+    main()
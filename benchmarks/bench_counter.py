@@ -0,0 +1,67 @@
+"""
+Multi-threaded benchmark of calls counters used for `frequency` sampling.
+
+The shared dict counter which was used before is kept here as a reference, it loses counts under concurrency.
+
+Run from the repository root:
+
+    python benchmarks/bench_counter.py
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_decorator.sampling import CallCounter  # noqa: E402
+
+INCREMENTS_PER_THREAD = 200000
+
+THREADS_COUNTS = (1, 2, 4, 8, 16)
+
+
+def run_threads(threads_count: int, increment) -> float:
+    """Run increments in threads and return time per increment in ns."""
+    threads = [
+        threading.Thread(target=lambda: [increment() for _ in range(INCREMENTS_PER_THREAD)])
+        for _ in range(threads_count)
+    ]
+
+    start_time = time.perf_counter_ns()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return (time.perf_counter_ns() - start_time) / (threads_count * INCREMENTS_PER_THREAD)
+
+
+def main():
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # switch threads often to expose races
+
+    try:
+        for threads_count in THREADS_COUNTS:
+            logs_counter = {}
+
+            def dict_increment():
+                log_counter = logs_counter.setdefault('func', 0) + 1
+                logs_counter['func'] = log_counter  # noqa: B023
+
+            counter = CallCounter()
+
+            dict_ns = run_threads(threads_count, dict_increment)
+            counter_ns = run_threads(threads_count, counter.increment)
+
+            expected = threads_count * INCREMENTS_PER_THREAD
+            print(
+                f'{threads_count:2} threads: dict {dict_ns:6.1f} ns/call, lost {expected - logs_counter["func"]:8}; '
+                f'CallCounter {counter_ns:6.1f} ns/call, lost {expected - counter.value:8}',
+            )
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Per-call overhead of the log decorators.
+
+Run from the repository root:
+
+    python benchmarks/bench_decorator.py
+"""
+import asyncio
+import logging
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_decorator import async_log, emitters, log  # noqa: E402
+
+NUMBER = 20000
+
+REPEAT = 5
+
+
+def _get_logger() -> logging.Logger:
+    logger = logging.getLogger('benchmark')
+    logger.propagate = False
+    logger.handlers = [logging.NullHandler()]
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def _best_per_call_us(stmt, number: int = NUMBER) -> float:
+    return min(timeit.repeat(stmt, number=number, repeat=REPEAT)) / number * 1e6
+
+
+def main():
+    logger = _get_logger()
+
+    def plain(a, b, *args, c=None, **kwargs):
+        return a
+
+    logged = log.log(logger)(plain)
+
+    async def async_plain(a, b, *args, c=None, **kwargs):
+        return a
+
+    async_logged = async_log.log(logger)(async_plain)
+    loop = asyncio.new_event_loop()
+
+    async def run_async(func):
+        for _ in range(NUMBER):  # noqa: WPS122
+            await func(1, 2, 3, c=4, d=5)
+
+    def bench_async(func) -> float:
+        return min(
+            timeit.repeat(lambda: loop.run_until_complete(run_async(func)), number=1, repeat=REPEAT),
+        ) / NUMBER * 1e6
+
+    baseline = _best_per_call_us(lambda: plain(1, 2, 3, c=4, d=5))
+    sync_cost = _best_per_call_us(lambda: logged(1, 2, 3, c=4, d=5))
+    async_baseline = bench_async(async_plain)
+    async_cost = bench_async(async_logged)
+
+    body = {'token': 'secret', 'items': [{'id': i, 'name': f'item {i}'} for i in range(1000)]}
+    with_hidden_params = log.log(logger, hidden_params=['a__token'])(plain)
+    hidden_params_cost = _best_per_call_us(lambda: with_hidden_params(body, 2), number=NUMBER // 100)
+    with_shapes = log.log(logger, capture_mode=log.CaptureMode.SHAPES)(plain)
+    shapes_cost = _best_per_call_us(lambda: with_shapes(body, 2), number=NUMBER // 100)
+
+    caller_cost, total_cost = _bench_queue_emitter(logger, plain, body, background_capture=False)
+    background_caller_cost, background_total_cost = _bench_queue_emitter(logger, plain, body, background_capture=True)
+
+    print(f'sync undecorated:  {baseline:8.2f} us/call')
+    print(f'sync log.log:      {sync_cost:8.2f} us/call (overhead {sync_cost - baseline:8.2f} us)')
+    print(f'async undecorated: {async_baseline:8.2f} us/call')
+    print(f'async log.log:     {async_cost:8.2f} us/call (overhead {async_cost - async_baseline:8.2f} us)')
+    print(f'sync hidden_params, 1000 items body: {hidden_params_cost:8.2f} us/call')
+    print(f'sync capture_mode=SHAPES, 1000 items body: {shapes_cost:8.2f} us/call')
+    print(
+        f'sync QueueEmitter, 1000 items body:                    {caller_cost:8.2f} us/call in caller, '
+        f'{total_cost:8.2f} us/call with background thread',
+    )
+    print(
+        f'sync QueueEmitter background_capture, 1000 items body: {background_caller_cost:8.2f} us/call in caller, '
+        f'{background_total_cost:8.2f} us/call with background thread',
+    )
+
+
+def _bench_queue_emitter(logger: logging.Logger, func, body, background_capture: bool) -> tuple[float, float]:
+    """Return best time per call spent in the caller and best time per call including processing of the queue."""
+    number = NUMBER // 100
+    caller_times = []
+    total_times = []
+    for _ in range(REPEAT):  # noqa: WPS122
+        emitter = emitters.QueueEmitter(logger)
+        logged = log.log(logger, emitter=emitter, background_capture=background_capture)(func)
+
+        start = timeit.default_timer()
+        for _ in range(number):  # noqa: WPS122, WPS440
+            logged(body, 2)
+        caller_times.append(timeit.default_timer() - start)
+
+        emitter.stop()
+        total_times.append(timeit.default_timer() - start)
+
+    return min(caller_times) / number * 1e6, min(total_times) / number * 1e6
+
+
+if __name__ == '__main__':
+    main()
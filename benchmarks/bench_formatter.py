@@ -0,0 +1,93 @@
+"""
+Microbenchmark of LogFormatter over records of different size.
+
+The implementation which encoded each value with ujson.dumps, concatenated the message with `+=` and then cut the
+whole message to max_length is kept here as a reference.
+
+Run from the repository root:
+
+    python benchmarks/bench_formatter.py
+"""
+import logging
+import os
+import sys
+import timeit
+
+import ujson
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_decorator.log_formatter import LogFormatter  # noqa: E402
+
+REPEAT = 5
+
+
+class ConcatenatingLogFormatter(LogFormatter):
+    """Reference implementation: values are fully encoded and then the whole message is cut to max_length."""
+
+    def verbose_formatter(self, record: logging.LogRecord) -> str:
+        """Format record the way it was formatted before streaming encoding."""
+        record_data = record.__dict__
+
+        result = record_data.get('msg', '')
+        result += '\n' * 2
+
+        for i, j in record_data.items():
+            if (self.limit_keys_to is not None) and (i not in self.limit_keys_to):
+                continue
+
+            try:
+                prepared_value = ujson.dumps(j, indent=2, ensure_ascii=False)
+            except TypeError:
+                prepared_value = j
+
+            result += f'{self.separator}{str(i).upper().replace("_", " ")}:\n{prepared_value}'
+
+        result += self.separator
+
+        return self._strip_message_if_needed(result)
+
+
+def get_records() -> dict:
+    """Records with captured data of different size."""
+    order = {
+        'id': 123456,
+        'customer': {'name': 'John Smith', 'email': 'john@example.com', 'vip': False, 'phone': None},
+        'items': [{'sku': f'SKU-{i}', 'price': i * 1.5, 'quantity': i % 3, 'tags': ['a', 'b']} for i in range(50)],
+    }
+    payloads = {
+        'small': ({'user_id': 1, 'query': 'text'}, {'ok': True}),
+        'order': ({'order': order}, order['items'][:5]),
+        'list 200k items': ({'items': [{'id': i, 'name': f'item {i}'} for i in range(200000)]}, None),
+        'string 10 MB': ({'body': 'x' * 10 * 1024 * 1024}, None),
+    }
+
+    records = {}
+    for name, (input_data, result) in payloads.items():
+        records[name] = logging.getLogger('bench').makeRecord(
+            'bench', logging.INFO, '', 0, 'call bench', (), None, extra={'input_data': input_data, 'result': result},
+        )
+    return records
+
+
+def main():
+    streaming = LogFormatter()
+    concatenating = ConcatenatingLogFormatter()
+
+    for name, record in get_records().items():
+        reference_message = concatenating.format(record)
+        if len(reference_message) < concatenating.max_length:
+            assert streaming.format(record) == reference_message  # noqa: S101
+
+        number = max(1, 100000 // len(ujson.dumps(record.input_data)))
+        reference = min(timeit.repeat(lambda: concatenating.format(record), number=number, repeat=REPEAT))
+        current = min(timeit.repeat(lambda: streaming.format(record), number=number, repeat=REPEAT))
+
+        print(
+            f'{name:16} concatenating: {reference / number * 1e6:10.2f} us, '
+            f'streaming: {current / number * 1e6:10.2f} us, speedup: {reference / current:7.2f}x',
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""
+Microbenchmark of LogFormatter modes over records of different size.
+
+Run from the repository root:
+
+    python benchmarks/bench_formatter_modes.py
+"""
+import os
+import sys
+import timeit
+
+import ujson
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_formatter import get_records  # noqa: E402
+from log_decorator.log_formatter import FormatterMode, LogFormatter  # noqa: E402
+
+REPEAT = 5
+
+
+def main():
+    formatters = {i.value: LogFormatter(formatter_mode=i) for i in FormatterMode}
+
+    for name, record in get_records().items():
+        ujson.loads(formatters[FormatterMode.JSON.value].format(record))
+
+        number = max(1, 100000 // len(ujson.dumps(record.input_data)))
+        timings = []
+        for mode, formatter in formatters.items():
+            current = min(timeit.repeat(lambda: formatter.format(record), number=number, repeat=REPEAT))  # noqa: B023
+            timings.append(f'{mode}: {current / number * 1e6:10.2f} us')
+
+        print(f'{name:16}', ', '.join(timings))
+
+
+if __name__ == '__main__':
+    main()
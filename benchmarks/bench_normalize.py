@@ -0,0 +1,126 @@
+"""
+Microbenchmark of normalize_for_log over nested payloads of realistic size.
+
+The implementation which probed every leaf with ujson.dumps is kept here as a reference.
+
+Run from the repository root:
+
+    python benchmarks/bench_normalize.py
+"""
+import array
+import importlib.util
+import inspect
+import os
+import sys
+import timeit
+from datetime import datetime
+from typing import Any
+
+import ujson
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_decorator.log import CaptureLimits, normalize_for_log  # noqa: E402
+
+REPEAT = 5
+
+
+def probing_normalize_for_log(value: Any) -> Any:
+    """Reference implementation: type checks chain and ujson.dumps probe for every leaf."""
+    if isinstance(value, bool) or value is None:
+        return str(value)
+    elif isinstance(value, dict):
+        return {k: probing_normalize_for_log(v) for k, v in value.items()}
+    elif isinstance(value, (list, set, frozenset, tuple)):
+        return type(value)(probing_normalize_for_log(i) for i in value)
+
+    if inspect.isclass(value):
+        return str(value)
+
+    if hasattr(value, 'get_log_id'):
+        return value.get_log_id()
+
+    try:
+        ujson.dumps(value)
+    except TypeError:
+        return str(value)
+
+    return value
+
+
+class Model:
+    """Object of a class with `get_log_id` method, e.g. ORM model."""
+
+    def __init__(self, pk: int):
+        self.pk = pk
+
+    def get_log_id(self) -> str:
+        return f'Model {self.pk}'
+
+
+class Point:
+    """Object of a class which is not JSON serializable and is represented with `str`."""
+
+    __slots__ = ('x', 'y')
+
+    def __init__(self, x: int, y: int):
+        self.x = x
+        self.y = y
+
+    def __str__(self) -> str:
+        return f'Point({self.x}, {self.y})'
+
+
+def get_payloads() -> dict:
+    """Payloads similar to typical RPC requests and responses."""
+    order = {
+        'id': 123456,
+        'customer': {'name': 'John Smith', 'email': 'john@example.com', 'vip': False, 'phone': None},
+        'created_at': datetime(2021, 8, 17, 12, 39, 59),
+        'items': [
+            {'sku': f'SKU-{i}', 'price': i * 1.5, 'quantity': i % 3, 'tags': ('a', 'b'), 'comment': 'x' * 200}
+            for i in range(50)
+        ],
+        'total': 1234.5,
+    }
+    return {
+        'flat small': {f'key_{i}': i for i in range(10)},
+        'order': order,
+        'orders list': [order] * 20,
+        'large strings': ['y' * 10000 for _ in range(100)],
+        'models': [Model(i) for i in range(200)],
+        'points': [Point(i, i) for i in range(200)],
+    }
+
+
+def main():
+    for name, payload in get_payloads().items():
+        assert normalize_for_log(payload) == probing_normalize_for_log(payload)  # noqa: S101
+
+        number = max(1, 200000 // len(ujson.dumps(payload, default=str)))
+        probing = min(timeit.repeat(lambda: probing_normalize_for_log(payload), number=number, repeat=REPEAT))
+        dispatch = min(timeit.repeat(lambda: normalize_for_log(payload), number=number, repeat=REPEAT))
+
+        print(
+            f'{name:15} probing: {probing / number * 1e6:10.2f} us, '
+            f'dispatch: {dispatch / number * 1e6:10.2f} us, speedup: {probing / dispatch:5.2f}x',
+        )
+
+    limits = CaptureLimits(max_depth=5, max_items=100, max_length=1000, max_size=32000)
+    huge_payloads = {
+        'list 50k items': [{'id': i, 'name': f'item {i}'} for i in range(50000)],
+        'bytes 20 MB': b'z' * 20 * 1024 * 1024,
+        'array 1M floats': array.array('d', range(1000000)),
+    }
+    if importlib.util.find_spec('numpy'):
+        numpy = importlib.import_module('numpy')
+        huge_payloads['ndarray 4 MB'] = numpy.zeros((1024, 1024), dtype=numpy.float32)
+    for name, payload in huge_payloads.items():  # noqa: WPS440
+        unbounded = min(timeit.repeat(lambda: normalize_for_log(payload), number=1, repeat=REPEAT))
+        bounded = min(timeit.repeat(lambda: normalize_for_log(payload, limits), number=1, repeat=REPEAT))
+
+        print(f'{name:15} unbounded: {unbounded * 1e6:10.2f} us, bounded: {bounded * 1e6:10.2f} us')
+
+
+if __name__ == '__main__':
+    main()
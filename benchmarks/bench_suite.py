@@ -0,0 +1,218 @@
+"""
+Benchmark suite of decorators overhead and formatter throughput with regression thresholds.
+
+Each case is measured as the best time per operation of several repeats. Results are saved as JSON and can be
+compared with a baseline saved the same way, e.g. by the previous version of the library:
+
+    python benchmarks/bench_suite.py --output baseline.json
+    python benchmarks/bench_suite.py --output current.json --baseline baseline.json --threshold 0.25
+
+With `--baseline` the exit status is 1 if any case is slower than in the baseline by more than `--threshold` (a
+fraction of the baseline time). Timings depend on the machine, so compare results of the same machine only.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import platform
+import re
+import sys
+import time
+import timeit
+from typing import Any, Callable, Optional
+
+import ujson
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_decorator import async_log, log  # noqa: E402
+from log_decorator.log_formatter import FormatterMode, LogFormatter  # noqa: E402
+
+REPEAT = 5
+
+DEFAULT_THRESHOLD = 0.25
+
+RESULTS_VERSION = 1
+
+Case = tuple[Callable[[int], Any], int]
+
+
+def plain(a, b, *args, c=None, **kwargs):
+    return a
+
+
+async def async_plain(a, b, *args, c=None, **kwargs):
+    return a
+
+
+def get_payloads() -> dict[str, Any]:
+    """Arguments of decorated functions, the same for sync and async cases."""
+    deep = {'value': 1}
+    for i in range(100):
+        deep = {'level': i, 'child': deep}
+
+    return {
+        'small': {'user_id': 1, 'query': 'text', 'token': 'secret'},
+        'large': {'token': 'secret', 'items': [{'id': i, 'name': f'item {i}'} for i in range(1000)]},
+        'deep': deep,
+    }
+
+
+def get_decorator_options() -> dict[str, tuple[dict[str, Any], str]]:
+    """Decorator options of each case and the payload it is called with."""
+    return {
+        'plain': ({}, 'small'),
+        'hidden_params': ({'hidden_params': ['a__token']}, 'small'),
+        'track_exec_time': ({'track_exec_time': True}, 'small'),
+        'frequency 100': ({'frequency': 100}, 'small'),
+        'disabled level': ({'lvl': logging.DEBUG}, 'small'),
+        'large payload': ({}, 'large'),
+        'deep nesting': ({}, 'deep'),
+    }
+
+
+def get_cases(logger: logging.Logger, loop: asyncio.AbstractEventLoop) -> dict[str, Case]:
+    """Return cases by their names, each case is a function running the operation `number` times and the number."""
+    payloads = get_payloads()
+
+    cases = {
+        'sync undecorated': (_sync_case(plain, payloads['small'], 2), 20000),
+        'async undecorated': (_async_case(loop, async_plain, payloads['small'], 2), 20000),
+    }
+
+    for name, (options, payload) in get_decorator_options().items():
+        number = 100 if payload == 'large' else 2000
+        sync_logged = log.log(logger, **options)(plain)
+        async_logged = async_log.log(logger, **options)(async_plain)
+        cases[f'sync {name}'] = (_sync_case(sync_logged, payloads[payload], 2, 3, c=4, d=5), number)
+        cases[f'async {name}'] = (_async_case(loop, async_logged, payloads[payload], 2, 3, c=4, d=5), number)
+
+    for name, record in get_records().items():
+        for mode in FormatterMode:
+            formatter = LogFormatter(formatter_mode=mode)
+            number = max(10, 200000 // len(ujson.dumps(record.input_data)))
+            cases[f'formatter {mode.value} {name}'] = (_sync_case(formatter.format, record), number)
+
+    return cases
+
+
+def get_records() -> dict[str, logging.LogRecord]:
+    """Return records of typical call and return records size."""
+    order = {
+        'id': 123456,
+        'customer': {'name': 'John Smith', 'email': 'john@example.com', 'vip': False, 'phone': None},
+        'items': [{'sku': f'SKU-{i}', 'price': i * 1.5, 'quantity': i % 3, 'tags': ['a', 'b']} for i in range(50)],
+    }
+    payloads = {
+        'small record': ({'user_id': 1, 'query': 'text'}, {'ok': True}),
+        'order record': ({'order': order}, order['items'][:5]),
+    }
+
+    records = {}
+    for name, (input_data, result) in payloads.items():
+        records[name] = logging.getLogger('bench').makeRecord(
+            'bench', logging.INFO, '', 0, 'call bench', (), None, extra={'input_data': input_data, 'result': result},
+        )
+    return records
+
+
+def run(cases: dict[str, Case], repeat: int = REPEAT, scale: float = 1) -> dict[str, dict[str, float]]:
+    """Measure cases and return best time per operation (`us_per_op`) and `ops_per_second` of each case."""
+    results = {}
+    for name, (func, number) in cases.items():
+        number = max(1, int(number * scale))
+        func(1)  # warm up caches built on first call
+        best = min(timeit.repeat(lambda: func(number), number=1, repeat=repeat)) / number  # noqa: B023
+        results[name] = {'us_per_op': best * 1e6, 'ops_per_second': 1 / best}
+        print(f'{name:40} {best * 1e6:12.2f} us/op')
+    return results
+
+
+def compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    threshold: float,
+) -> list[str]:
+    """Return descriptions of cases which are slower than in the baseline by more than the threshold."""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+
+        ratio = result['us_per_op'] / baseline[name]['us_per_op']
+        if ratio > 1 + threshold:
+            regressions.append(
+                f'{name}: {baseline[name]["us_per_op"]:.2f} us -> {result["us_per_op"]:.2f} us ({ratio:.2f}x)',
+            )
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Measure decorators overhead and formatter throughput.')
+    parser.add_argument('--output', help='file to save results as JSON')
+    parser.add_argument('--baseline', help='results JSON file to compare with')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='allowed slowdown fraction')
+    parser.add_argument('--repeat', type=int, default=REPEAT, help='number of repeats of each case')
+    parser.add_argument('--scale', type=float, default=1, help='multiplier of number of operations of each case')
+    parser.add_argument('--filter', help='regular expression to select cases by name')
+    args = parser.parse_args(argv)
+
+    logger = logging.getLogger('benchmark')
+    logger.propagate = False
+    logger.handlers = [logging.NullHandler()]
+    logger.setLevel(logging.INFO)
+
+    loop = asyncio.new_event_loop()
+    try:
+        cases = get_cases(logger, loop)
+        if args.filter:
+            cases = {i: j for i, j in cases.items() if re.search(args.filter, i)}
+        results = run(cases, args.repeat, args.scale)
+    finally:
+        loop.close()
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            ujson.dump(
+                {
+                    'version': RESULTS_VERSION,
+                    'created': time.time(),
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'cases': results,
+                },
+                output,
+                indent=2,
+            )
+
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline) as baseline_file:
+        baseline = ujson.load(baseline_file)['cases']
+
+    regressions = compare(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f'REGRESSION {regression}')
+    print(f'{len(regressions)} of {len(results)} cases are slower than baseline by more than {args.threshold:.0%}')
+    return 1 if regressions else 0
+
+
+def _sync_case(func: Callable, *args: Any, **kwargs: Any) -> Callable[[int], None]:
+    def _run(number: int) -> None:
+        for _ in range(number):  # noqa: WPS122
+            func(*args, **kwargs)
+
+    return _run
+
+
+def _async_case(loop: asyncio.AbstractEventLoop, func: Callable, *args: Any, **kwargs: Any) -> Callable[[int], None]:
+    async def _calls(number: int) -> None:
+        for _ in range(number):  # noqa: WPS122
+            await func(*args, **kwargs)
+
+    return lambda number: loop.run_until_complete(_calls(number))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
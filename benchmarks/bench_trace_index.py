@@ -0,0 +1,71 @@
+"""
+Microbenchmark of querying a trace file with TraceIndex compared to reading the whole file.
+
+Run from the repository root:
+
+    python benchmarks/bench_trace_index.py
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_decorator.binary_trace import BinaryTraceHandler, read_trace  # noqa: E402
+from log_decorator.log_formatter import FormatterMode, LogFormatter  # noqa: E402
+from log_decorator.trace_index import TraceIndex  # noqa: E402
+
+CALLS = 50000
+
+FUNCTIONS = 100
+
+
+def write_trace(directory: str) -> dict:
+    """Write call and return records of CALLS calls of FUNCTIONS functions in binary and JSON lines formats."""
+    logger = logging.getLogger('bench_trace_index')
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+
+    paths = {'binary': os.path.join(directory, 'trace.bin'), 'json': os.path.join(directory, 'trace.log')}
+    json_handler = logging.FileHandler(paths['json'])
+    json_handler.setFormatter(LogFormatter(formatter_mode=FormatterMode.JSON, limit_keys_to=None))
+    logger.handlers = [BinaryTraceHandler(paths['binary']), json_handler]
+
+    for i in range(CALLS):
+        extra = {'call_id': f'{i:032x}', 'function': f'app.function_{i % FUNCTIONS}', 'input_data': {'arg': i}}
+        logger.info(f'call {extra["function"]}', extra=extra)
+        extra = {**extra, 'execution_time_ms': i % 1000 / 10, 'result': {'status': 'ok', 'items': list(range(10))}}
+        logger.info(f'return {extra["function"]}', extra=extra)
+
+    for handler in logger.handlers:
+        handler.close()
+    return paths
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        for name, path in write_trace(directory).items():
+            size = os.path.getsize(path)
+
+            if name == 'binary':
+                started = time.perf_counter()
+                records = [
+                    i for i in read_trace(path)
+                    if i.get('function') == 'app.function_7' and i.get('execution_time_ms', 0) >= 50
+                ]
+                print(f'{name:6} full scan:   {time.perf_counter() - started:8.4f} s, {len(records)} records')
+
+            started = time.perf_counter()
+            TraceIndex(path).close()
+            print(f'{name:6} index build: {time.perf_counter() - started:8.4f} s, {size / 1e6:.1f} MB file')
+
+            started = time.perf_counter()
+            with TraceIndex(path) as index:
+                records = list(index.find(function='app.function_7', min_execution_time_ms=50))
+            print(f'{name:6} query:       {time.perf_counter() - started:8.4f} s, {len(records)} records')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,28 @@
 import inspect
 import logging
 import time
-from copy import deepcopy
+from functools import partial
 from types import FunctionType
-from typing import Any, Iterable, Callable
-from uuid import uuid1
+from typing import Any, AsyncGenerator, Iterable, Callable, Optional
 
 from wrapt import decorator
 
-from .log import HIDDEN_VALUE, LOGS_COUNTER, SECONDS_TO_MS, get_logged_args, get_logger, normalize_for_log
+from .call_id import fast_call_id
+from .emitters import Emitter, resolve_deferred
+from .log import (
+    HIDDEN_VALUE,
+    CaptureLimits,
+    CaptureMode,
+    build_call_plan,
+    get_capture_functions,
+    get_logged_args,
+    get_logger,
+    log_item,
+    log_stats_summary,
+    with_log_id_memo,
+)
+from .sampling import FrequencySampler, Sampler
+from .stats import NS_IN_UNIT, STATS_REGISTRY, TimeUnit
 
 
 def log(  # noqa: WPS211
@@ -23,74 +37,256 @@ def log(  # noqa: WPS211
     track_exec_time: bool = False,
     frequency: int = None,
     exception_hook: FunctionType = None,
+    lazy_capture: bool = False,
+    capture_limits: Optional[CaptureLimits] = None,
+    sampler: Optional[Sampler] = None,
+    call_id_factory: Callable[[], str] = fast_call_id,
+    exec_time_unit: TimeUnit = TimeUnit.MS,
+    track_cpu_time: bool = False,
+    collect_stats: bool = False,
+    stats_interval: Optional[float] = None,
+    emitter: Optional[Emitter] = None,
+    item_sampler: Optional[Sampler] = None,
+    background_capture: bool = False,
+    capture_mode: CaptureMode = CaptureMode.VALUES,
+    memoize_log_ids: bool = False,
 ) -> Callable:
     """
     Decorator to trace async function calls in logs.
 
-    This decorator doesn't provide async logging, but only async function calls.
-    To use with async code consider either stdout/UDP inputs or use approach like:
-    https://docs.python.org/3/howto/logging-cookbook.html#dealing-with-handlers-that-block
+    By default records are passed to `logger_inst` handlers synchronously, so slow handlers block the event loop.
+    Pass `emitters.QueueEmitter` as `emitter` to only build records in the coroutine and leave formatting and I/O to
+    a background thread.
 
     It logs function call, function return and any exceptions with separate log records.
     This high-level function is needed to pass additional parameters and customise _log behavior.
+
+    Async generator functions are supported the same way as generator functions by sync decorator, but their return
+    records have no result.
+
+    `track_cpu_time` measures CPU time of the whole thread while the coroutine is awaited, so CPU time of other
+    coroutines executed meanwhile is included.
+
+    With `collect_stats` calls count, errors count and latency histogram of the function are collected in
+    `STATS_REGISTRY` regardless of sampling, with `stats_interval` they are logged and reset each interval.
+
+    Calls are sampled with `sampler` (`frequency` is a shortcut for `FrequencySampler`), errors are always logged.
+
+    Function result is normalized only if the return record will be emitted. With `lazy_capture` input arguments
+    are also normalized only if the call record will be emitted, otherwise they are captured after the call if an
+    exception occurs, so arguments mutated by the function are logged in their mutated state.
+
+    `background_capture`, `capture_mode` and `memoize_log_ids` work the same way as for sync decorator, see
+    `log.log`.
     """
-    # noinspection DuplicatedCode
-    @decorator
-    async def _log(wrapped: FunctionType, instance: Any, args: tuple[Any], kwargs: dict[str, Any]) -> Any:
-        """Actual implementation of the above decorator."""
-        func_name = f'{wrapped.__module__}.{wrapped.__qualname__}'
-        extra = {'call_id': uuid1().hex, 'function': func_name}
-
-        _hide_input_from_return = hide_input_from_return if not minify_logs else True
-
-        send_log = True
-
-        if frequency is not None:
-            log_counter = LOGS_COUNTER.setdefault(func_name, 0) + 1
-            LOGS_COUNTER[func_name] = log_counter
-
-            if log_counter % frequency != 0:
-                send_log = False
-
-        try:  # noqa: WPS229
-            params = inspect.getfullargspec(wrapped)
-            extra['input_data'] = get_logged_args(
-                params,
-                [instance] + list(args) if instance else args,
-                kwargs,
-                hidden_params,
+    _hide_input_from_return = hide_input_from_return if not minify_logs else True
+
+    sink = logger_inst if emitter is None else emitter
+
+    capture_mode = CaptureMode(capture_mode)
+    capture_args, capture_value = get_capture_functions(capture_mode, background_capture, emitter)
+
+    exec_time_unit = TimeUnit(exec_time_unit)
+    ns_in_unit = NS_IN_UNIT[exec_time_unit.value]
+    exec_time_key = f'execution_time_{exec_time_unit.value}'
+    cpu_time_key = f'cpu_time_{exec_time_unit.value}'
+
+    if frequency is not None:
+        if sampler is not None:
+            raise ValueError('Pass either frequency or sampler')
+        sampler = FrequencySampler(frequency)
+
+    def _decorate(wrapped: Any) -> Any:
+        """Build call plan for the decorated function once and wrap it."""
+        plan = build_call_plan(wrapped, hidden_params)
+        function_sampler = None if sampler is None else sampler.clone()
+        stats = STATS_REGISTRY.get_stats(plan.func_name) if collect_stats else None
+        function_item_sampler = None if item_sampler is None else item_sampler.clone()
+
+        # noinspection DuplicatedCode
+        @decorator
+        async def _log(wrapped: FunctionType, instance: Any, args: tuple[Any], kwargs: dict[str, Any]) -> Any:
+            """Actual implementation of the above decorator."""
+            extra = {'call_id': call_id_factory(), 'function': plan.func_name}
+            memo = {} if memoize_log_ids else None
+
+            call_number = plan.counter.increment()
+            # samplers are asked last, so rate budgets are not spent on calls which would not be logged anyway
+            emit_records = (
+                not exceptions_only
+                and sink.isEnabledFor(lvl)
+                and (function_sampler is None or function_sampler.should_sample(call_number))
+            )
+            capture_deferred = lazy_capture and not emit_records
+            call_args = [instance] + list(args) if instance else args
+            elapsed_ns = None
+
+            try:  # noqa: WPS229
+                if not capture_deferred:
+                    extra['input_data'] = with_log_id_memo(memo, capture_args, plan, call_args, kwargs, capture_limits)
+
+                if emit_records:
+                    sink.log(level=lvl, msg=plan.call_msg, extra=extra)
+
+                start_time = time.perf_counter_ns()
+                start_cpu_time = time.thread_time_ns() if track_cpu_time else 0
+
+                result = await wrapped(*args, **kwargs)
+
+                elapsed_ns = time.perf_counter_ns() - start_time
+                if track_exec_time:
+                    extra[exec_time_key] = elapsed_ns / ns_in_unit
+                if track_cpu_time:
+                    extra[cpu_time_key] = (time.thread_time_ns() - start_cpu_time) / ns_in_unit
+
+                if emit_records:
+                    # input and result trees are shared with the call record, they are never mutated after capture
+                    return_extra = {**extra, 'result': HIDDEN_VALUE}
+                    if not hide_output:
+                        return_extra['result'] = with_log_id_memo(memo, capture_value, result, capture_limits)
+                    if _hide_input_from_return:
+                        return_extra['input_data'] = HIDDEN_VALUE
+                    sink.log(level=lvl, msg=plan.return_msg, extra=return_extra)
+
+                return result
+            except Exception as exc:  # noqa
+                elapsed_ns = None
+
+                if capture_deferred:
+                    extra['input_data'] = with_log_id_memo(
+                        memo, get_logged_args, plan, call_args, kwargs, capture_limits, capture_mode,
+                    )
+                elif background_capture:
+                    resolve_deferred(extra)
+
+                sink.exception(msg=plan.error_msg, extra=extra)
+
+                if exception_hook is not None:
+                    await exception_hook(logger_inst, exc, extra)
+
+                if hasattr(exc, 'return_value'):
+                    return exc.return_value
+
+                raise
+            finally:
+                if stats is not None:
+                    stats.record(elapsed_ns)
+                    if stats_interval is not None:
+                        log_stats_summary(sink, lvl, plan, stats.pop_summary(stats_interval, exec_time_unit))
+
+        # noinspection DuplicatedCode
+        @decorator
+        def _log_generator(wrapped: FunctionType, instance: Any, args: tuple[Any], kwargs: dict[str, Any]) -> Any:
+            """Implementation of the above decorator for async generators, iteration is logged by `_iterate`."""
+            extra = {'call_id': call_id_factory(), 'function': plan.func_name}
+            memo = {} if memoize_log_ids else None
+
+            call_number = plan.counter.increment()
+            # samplers are asked last, so rate budgets are not spent on calls which would not be logged anyway
+            emit_records = (
+                not exceptions_only
+                and sink.isEnabledFor(lvl)
+                and (function_sampler is None or function_sampler.should_sample(call_number))
             )
-            if send_log and not exceptions_only:
-                logger_inst.log(level=lvl, msg=f'call {func_name}', extra=extra)
+            capture_deferred = lazy_capture and not emit_records
+            call_args = [instance] + list(args) if instance else args
+
+            if not capture_deferred:
+                extra['input_data'] = with_log_id_memo(memo, capture_args, plan, call_args, kwargs, capture_limits)
+
+            if emit_records:
+                sink.log(level=lvl, msg=plan.call_msg, extra=extra)
+
+            generator = wrapped(*args, **kwargs)
+            return _iterate(generator, extra, emit_records, capture_deferred, call_args, kwargs, memo)
+
+        # noinspection DuplicatedCode
+        async def _iterate(  # noqa: WPS211, WPS231
+            generator: AsyncGenerator,
+            extra: dict[str, Any],
+            emit_records: bool,
+            capture_deferred: bool,
+            call_args: Any,
+            kwargs: dict[str, Any],
+            memo: Optional[dict],
+        ) -> AsyncGenerator:
+            """Delegate iteration to the wrapped async generator and log sampled items and iteration result."""
+            items_count = 0
+            elapsed_ns = None
+            capture_item = capture_value if memo is None else partial(with_log_id_memo, memo, capture_value)
+            closed = False
+            sent = None
+            thrown = None
+
+            start_time = time.perf_counter_ns()
+            start_cpu_time = time.thread_time_ns() if track_cpu_time else 0
+
+            try:  # noqa: WPS229
+                while True:
+                    try:
+                        item = await (generator.asend(sent) if thrown is None else generator.athrow(thrown))
+                    except StopAsyncIteration:
+                        break
 
-            start_time = time.time()
+                    items_count += 1
+                    if (
+                        emit_records
+                        and function_item_sampler is not None
+                        and function_item_sampler.should_sample(items_count)
+                    ):
+                        log_item(sink, lvl, plan, extra, items_count, item, hide_output, capture_limits, capture_item)
 
-            result = await wrapped(*args, **kwargs)
+                    sent, thrown = None, None
+                    try:
+                        sent = yield item
+                    except GeneratorExit:
+                        await generator.aclose()
+                        closed = True
+                        break
+                    except BaseException as consumer_exc:  # noqa: WPS424 it is thrown into the wrapped generator
+                        thrown = consumer_exc
 
-            if track_exec_time:
-                extra['execution_time_ms'] = int((time.time() - start_time) * SECONDS_TO_MS)
+                elapsed_ns = time.perf_counter_ns() - start_time
+                extra['items_count'] = items_count
+                if track_exec_time:
+                    extra[exec_time_key] = elapsed_ns / ns_in_unit
+                if track_cpu_time:
+                    extra[cpu_time_key] = (time.thread_time_ns() - start_cpu_time) / ns_in_unit
 
-            extra['result'] = HIDDEN_VALUE if hide_output else normalize_for_log(result)
+                if emit_records:
+                    return_extra = dict(extra)
+                    if closed:
+                        return_extra['closed'] = True
+                    if _hide_input_from_return:
+                        return_extra['input_data'] = HIDDEN_VALUE
 
-            if send_log and not exceptions_only:
-                return_extra = deepcopy(extra)
-                if _hide_input_from_return:
-                    return_extra['input_data'] = HIDDEN_VALUE
-                logger_inst.log(level=lvl, msg=f'return {func_name}', extra=return_extra)
+                    sink.log(level=lvl, msg=plan.return_msg, extra=return_extra)
+            except Exception as exc:  # noqa
+                elapsed_ns = None
+                extra['items_count'] = items_count
 
-            return result
-        except Exception as exc:  # noqa
-            error_msg = f'error in {func_name}'
+                if capture_deferred:
+                    extra['input_data'] = with_log_id_memo(
+                        memo, get_logged_args, plan, call_args, kwargs, capture_limits, capture_mode,
+                    )
+                elif background_capture:
+                    resolve_deferred(extra)
 
-            if send_log:
-                logger_inst.exception(msg=error_msg, extra=extra if extra is not None else {})
+                sink.exception(msg=plan.error_msg, extra=extra)
 
-            if exception_hook is not None:
-                await exception_hook(logger_inst, exc, extra)
+                if exception_hook is not None:
+                    await exception_hook(logger_inst, exc, extra)
 
-            if hasattr(exc, 'return_value'):
-                return exc.return_value
+                if not hasattr(exc, 'return_value'):
+                    raise
+            finally:
+                if stats is not None:
+                    stats.record(elapsed_ns)
+                    if stats_interval is not None:
+                        log_stats_summary(sink, lvl, plan, stats.pop_summary(stats_interval, exec_time_unit))
 
-            raise
+        if inspect.isasyncgenfunction(wrapped):
+            return _log_generator(wrapped)
+        return _log(wrapped)
 
-    return _log
+    return _decorate
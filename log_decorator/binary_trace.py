@@ -0,0 +1,309 @@
+"""
+Compact binary format of log records for high-volume call tracing.
+
+A trace file is a sequence of length-prefixed frames: 4 bytes of little-endian payload length, 1 byte of frame kind
+and the payload. Every file (and every reopening of the file for appending) starts with a header frame, strings
+frames define entries of the string table (function names, messages, tuples of record and argument keys) which are
+referenced by their ids from records frames, so repeated strings are written once per file. Payloads are encoded
+with `marshal`, so trace files can be read by the same or newer Python versions only.
+
+Run to print records of trace files as JSON lines:
+
+    python -m log_decorator.binary_trace trace.bin.1 trace.bin
+"""
+import argparse
+import logging
+import marshal
+import struct
+import sys
+from logging.handlers import RotatingFileHandler
+from typing import Any, BinaryIO, Iterable, Iterator, Optional
+
+import ujson
+
+MAGIC = b'LDTR'
+
+FORMAT_VERSION = 1
+
+HEADER_FRAME = 0
+STRING_FRAME = 1
+RECORD_FRAME = 2
+
+FRAME_HEADER = struct.Struct('<IB')
+
+HEADER_SIZE = FRAME_HEADER.size + len(MAGIC) + 2
+
+DEFAULT_MAX_STRINGS = 65536
+
+INTERNED_VALUE_KEYS = frozenset(('function',))
+
+INTERNED_KEYS_KEYS = frozenset(('input_data',))
+
+RECORD_ATTRIBUTES = frozenset((*logging.makeLogRecord({}).__dict__, 'message', 'asctime'))
+
+_EXCEPTION_FORMATTER = logging.Formatter()
+
+
+class TraceEncoder:
+    """
+    Encoder of log records to binary frames.
+
+    Logger names, messages, values of `function` key and tuples of record keys and `input_data` keys are added to the
+    string table on first use, after `max_strings` entries new strings are written inline.
+    """
+
+    def __init__(self, max_strings: int = DEFAULT_MAX_STRINGS):
+        self.max_strings = max_strings
+        self._strings = {}
+
+    def reset(self) -> None:
+        """Forget the string table, it should be done before writing to a new file."""
+        self._strings = {}
+
+    def header(self) -> bytes:
+        """Return header frame which starts a file."""
+        return _frame(HEADER_FRAME, MAGIC + bytes((FORMAT_VERSION, marshal.version)))
+
+    def encode(self, record: logging.LogRecord) -> bytes:
+        """Return record frame preceded by frames of strings added to the string table by the record."""
+        frames = []
+
+        keys = []
+        values = []
+        for key, value in record.__dict__.items():
+            if key not in RECORD_ATTRIBUTES:
+                keys.append(key)
+                values.append(value)
+
+        exception_type = exception = None
+        if record.exc_info and record.exc_info[0] is not None:
+            if not record.exc_text:
+                record.exc_text = _EXCEPTION_FORMATTER.formatException(record.exc_info)
+            exception_type, exception = record.exc_info[0].__name__, record.exc_text
+
+        header = (
+            record.created,
+            record.levelno,
+            self._intern(record.name, frames),
+            self._intern(record.getMessage(), frames),
+            self._intern(tuple(keys), frames),
+            exception_type,
+            exception,
+        )
+        try:
+            payload = marshal.dumps((*header, *self._intern_values(keys, values, frames)))
+        except ValueError:
+            # values of types which are not supported by marshal (including subclasses of builtin types) are converted
+            # to strings as a whole, like verbose formatter does with values which are not JSON serializable
+            values = [i if _is_marshallable(i) else str(i) for i in values]
+            payload = marshal.dumps((*header, *self._intern_values(keys, values, frames)))
+
+        frames.append(_frame(RECORD_FRAME, payload))
+        return b''.join(frames)
+
+    def _intern_values(self, keys: list, values: list, frames: list) -> tuple[tuple, int]:
+        values = list(values)
+        interned_mask = 0
+        for position, key in enumerate(keys):
+            value = values[position]
+            if key in INTERNED_VALUE_KEYS and type(value) is str:
+                value = self._intern(value, frames)
+            elif key in INTERNED_KEYS_KEYS and type(value) is dict:
+                value = (self._intern(tuple(value), frames), tuple(value.values()))
+            else:
+                continue
+            values[position] = value
+            interned_mask |= 1 << position
+        return tuple(values), interned_mask
+
+    def _intern(self, value: Any, frames: list) -> Any:
+        string_id = self._strings.get(value)
+        if string_id is not None:
+            return string_id
+        if len(self._strings) >= self.max_strings:
+            return value
+
+        string_id = len(self._strings)
+        self._strings[value] = string_id
+        frames.append(_frame(STRING_FRAME, marshal.dumps(value)))
+        return string_id
+
+
+class TraceDecoder:
+    """
+    Decoder of frames written by `TraceEncoder` to records, it keeps the string table of the file being read in
+    `strings`, pass `strings` to decode records of a file part which string frames are already read.
+    """
+
+    def __init__(self, strings: Optional[list] = None):
+        self.strings = [] if strings is None else strings
+
+    def decode(self, kind: int, payload: bytes) -> Optional[dict[str, Any]]:
+        """
+        Return record of record frame as dict with `timestamp`, `level`, `logger` and `message` keys, keys of record
+        `extra` and `exception_type` and `exception` keys if the record has exception info, the same as JSON formatter
+        mode writes. None is returned for other frames.
+        """
+        if kind == RECORD_FRAME:
+            return self._decode_record(payload)
+
+        if kind == STRING_FRAME:
+            self.strings.append(marshal.loads(payload))
+        elif kind == HEADER_FRAME:
+            if payload[:len(MAGIC)] != MAGIC:
+                raise ValueError('Not a trace file')
+            if payload[len(MAGIC)] > FORMAT_VERSION or payload[len(MAGIC) + 1] > marshal.version:
+                raise ValueError('Trace file is written by newer version of log_decorator or Python')
+            self.strings = []
+        return None
+
+    def _decode_record(self, payload: bytes) -> dict[str, Any]:
+        created, levelno, name, message, keys, exception_type, exception, values, interned_mask = marshal.loads(payload)
+
+        record = {
+            'timestamp': created,
+            'level': logging.getLevelName(levelno),
+            'logger': self._get_string(name),
+            'message': self._get_string(message),
+        }
+
+        for position, key in enumerate(self._get_string(keys)):
+            value = values[position]
+            if interned_mask >> position & 1:
+                if key in INTERNED_KEYS_KEYS:
+                    value = dict(zip(self._get_string(value[0]), value[1]))
+                else:
+                    value = self._get_string(value)
+            record[key] = value
+
+        if exception_type is not None:
+            record['exception_type'] = exception_type
+            record['exception'] = exception
+        return record
+
+    def _get_string(self, value: Any) -> Any:
+        return self.strings[value] if type(value) is int else value
+
+
+class BinaryTraceHandler(RotatingFileHandler):
+    """
+    Handler which writes records to a file in the binary trace format.
+
+    The file is rotated the same way as by `logging.handlers.RotatingFileHandler` when it would exceed `max_bytes`
+    (never if `backup_count` is 0), each file starts with its own string table, so it can be read separately.
+    Formatter of the handler is not used, `extra` of records is written as is.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        max_bytes: int = 0,
+        backup_count: int = 0,
+        delay: bool = False,
+        max_strings: int = DEFAULT_MAX_STRINGS,
+    ):
+        self.encoder = TraceEncoder(max_strings)
+        super().__init__(filename, mode='ab', maxBytes=max_bytes, backupCount=backup_count, delay=delay)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Write record to the file."""
+        try:
+            self._write([record])
+        except Exception:  # noqa
+            self.handleError(record)
+
+    def write_batch(self, records: list[logging.LogRecord]) -> None:
+        """Write records to the file with a single write and flush call, it is used by `BatchingEmitter`."""
+        records = [i for i in records if self.filter(i)]
+        if not records:
+            return
+
+        self.acquire()
+        try:
+            self._write(records)
+        except Exception:  # noqa
+            self.handleError(records[-1])
+        finally:
+            self.release()
+
+    def _open(self) -> BinaryIO:
+        stream = open(self.baseFilename, 'ab')  # noqa: WPS515
+        self.encoder.reset()
+        stream.write(self.encoder.header())
+        return stream
+
+    def _write(self, records: list[logging.LogRecord]) -> None:
+        if self.stream is None:
+            self.stream = self._open()
+
+        frames = []
+        size = self.stream.tell()
+        for record in records:
+            data = self.encoder.encode(record)
+            if self.maxBytes > 0 and self.backupCount > 0 and size + len(data) > self.maxBytes and size > HEADER_SIZE:
+                self.stream.write(b''.join(frames))
+                frames = []
+                self._rotate()
+                data = self.encoder.encode(record)
+                size = self.stream.tell()
+            frames.append(data)
+            size += len(data)
+
+        self.stream.write(b''.join(frames))
+        self.stream.flush()
+
+    def _rotate(self) -> None:
+        self.doRollover()
+        if self.stream is None:
+            self.stream = self._open()
+
+
+def iter_frames(stream: BinaryIO) -> Iterator[tuple[int, bytes]]:
+    """Yield kind and payload of each frame of the stream, incomplete frame at the end (being written) is skipped."""
+    while True:
+        frame_header = stream.read(FRAME_HEADER.size)
+        if len(frame_header) < FRAME_HEADER.size:
+            return
+        length, kind = FRAME_HEADER.unpack(frame_header)
+        payload = stream.read(length)
+        if len(payload) < length:
+            return
+        yield kind, payload
+
+
+def read_trace(path: str) -> Iterator[dict[str, Any]]:
+    """Yield records of the trace file."""
+    decoder = TraceDecoder()
+    with open(path, 'rb') as stream:
+        for kind, payload in iter_frames(stream):
+            record = decoder.decode(kind, payload)
+            if record is not None:
+                yield record
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    """Print records of trace files as JSON lines."""
+    parser = argparse.ArgumentParser(description='Print records of binary trace files as JSON lines.')
+    parser.add_argument('paths', nargs='+', help='trace files, rotated files should be passed from the oldest one')
+    args = parser.parse_args(argv)
+
+    for path in args.paths:
+        for record in read_trace(path):
+            sys.stdout.write(ujson.dumps(record, ensure_ascii=False, default=repr))
+            sys.stdout.write('\n')
+
+
+def _frame(kind: int, payload: bytes) -> bytes:
+    return FRAME_HEADER.pack(len(payload), kind) + payload
+
+
+def _is_marshallable(value: Any) -> bool:
+    try:
+        marshal.dumps(value)
+    except ValueError:
+        return False
+    return True
+
+
+if __name__ == '__main__':
+    main()
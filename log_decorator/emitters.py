@@ -0,0 +1,388 @@
+import atexit
+import logging
+import queue
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from enum import Enum
+from logging.handlers import QueueListener
+from typing import Any, Callable, Optional
+
+from .sampling import CallCounter
+
+DEFAULT_QUEUE_SIZE = 10000
+
+DEFAULT_BATCH_SIZE = 100
+
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+_UNRESOLVED = object()
+
+
+class OverflowPolicy(str, Enum):
+    """Available policies to apply when emitter queue is full."""
+
+    DROP_NEWEST = 'drop_newest'
+    DROP_OLDEST = 'drop_oldest'
+    BLOCK = 'block'
+
+
+class Emitter(ABC):
+    """
+    Base class for logger-like objects which can be passed to log decorators as `emitter` to change how records are
+    delivered to handlers of the logger.
+    """
+
+    @abstractmethod
+    def isEnabledFor(self, level: int) -> bool:  # noqa: N802
+        """Check if records of the level would be processed."""
+
+    @abstractmethod
+    def log(self, level: int, msg: str, extra: Optional[dict[str, Any]] = None) -> None:
+        """Emit log record."""
+
+    @abstractmethod
+    def exception(self, msg: str, extra: Optional[dict[str, Any]] = None) -> None:
+        """Emit error log record with info about the exception being handled."""
+
+
+class DeferredValue:
+    """
+    Value of record `extra` which is computed by `func(*args)` when the record is processed by `QueueEmitter`
+    background thread instead of the caller, e.g. captured arguments normalized with `background_capture`.
+
+    The value is computed once and shared by all records it is passed to, if `func` raises the value is a string
+    describing the error, as the error can't be raised in the caller anymore.
+    """
+
+    __slots__ = ('func', 'args', '_value')
+
+    def __init__(self, func: Callable[..., Any], *args: Any):
+        self.func = func
+        self.args = args
+        self._value = _UNRESOLVED
+
+    def resolve(self) -> Any:
+        """Compute the value if it is not computed yet and return it."""
+        if self._value is _UNRESOLVED:
+            try:
+                self._value = self.func(*self.args)
+            except Exception as exc:  # noqa
+                self._value = f'<capture error: {exc!r}>'
+            self.args = ()
+        return self._value
+
+
+class QueueEmitter(Emitter):
+    """
+    Logger-like emitter which hands log records over to a background thread.
+
+    Records are built in the caller (so `extra` is captured at the moment of the call), but filtering, formatting and
+    I/O of `logger` handlers are performed by `logging.handlers.QueueListener` thread, so slow handlers don't block the
+    caller, e.g. an event loop. If the queue is full records are dropped or the caller is blocked according to
+    `overflow_policy`, number of dropped records is available in `dropped`.
+
+    `DeferredValue` values of records are resolved in the background thread before records are passed to handlers.
+    Records are processed by a single thread, so they are passed to handlers in the order they are emitted.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        maxsize: int = DEFAULT_QUEUE_SIZE,
+        overflow_policy: OverflowPolicy = OverflowPolicy.DROP_NEWEST,
+        block_timeout: Optional[float] = None,
+    ):
+        self.logger = logger
+        self.overflow_policy = OverflowPolicy(overflow_policy)
+        self.block_timeout = block_timeout
+
+        self.queue = queue.Queue(maxsize)
+        self._dropped = CallCounter()
+        self._listener = _Listener(self.queue, logger)
+        self._listener.start()
+
+        atexit.register(self.stop)
+
+    @property
+    def dropped(self) -> int:
+        """Number of records dropped due to queue overflow."""
+        return self._dropped.value
+
+    def isEnabledFor(self, level: int) -> bool:  # noqa: N802
+        """Check if records of the level would be processed by the logger."""
+        return self.logger.isEnabledFor(level)
+
+    def log(self, level: int, msg: str, extra: Optional[dict[str, Any]] = None) -> None:
+        """Build log record and put it to the queue."""
+        if self.logger.isEnabledFor(level):
+            self._put(make_record(self.logger, level, msg, extra))
+
+    def exception(self, msg: str, extra: Optional[dict[str, Any]] = None) -> None:
+        """Build error log record with info about the exception being handled and put it to the queue."""
+        if self.logger.isEnabledFor(logging.ERROR):
+            self._put(make_record(self.logger, logging.ERROR, msg, extra, sys.exc_info()))
+
+    def stop(self) -> None:
+        """Process all queued records and stop the background thread."""
+        if self._listener.is_running:
+            self._listener.stop()
+        atexit.unregister(self.stop)
+
+    def _put(self, record: logging.LogRecord) -> None:
+        if self.overflow_policy == OverflowPolicy.BLOCK:
+            try:
+                self.queue.put(record, timeout=self.block_timeout)
+            except queue.Full:
+                self._dropped.increment()
+            return
+
+        while True:
+            try:
+                self.queue.put_nowait(record)
+            except queue.Full:
+                if self.overflow_policy == OverflowPolicy.DROP_NEWEST:
+                    self._dropped.increment()
+                    return
+                self._drop_oldest()
+            else:
+                return
+
+    def _drop_oldest(self) -> None:
+        try:
+            self.queue.get_nowait()
+        except queue.Empty:
+            return
+        self._dropped.increment()
+
+
+class _Listener(QueueListener):
+    """Queue listener which passes records to a logger and can be stopped when the queue is full."""
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        resolve_deferred(record.__dict__)
+        return record
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+class BatchingEmitter(Emitter):
+    """
+    Logger-like emitter which buffers log records per thread and writes them to handlers in batches.
+
+    Buffer of a thread is flushed when it has `batch_size` records or its first record is older than `flush_interval`
+    seconds, on `flush` and `stop` calls and at interpreter exit. Age of buffers is checked on records of the thread
+    and by a daemon timer thread started with the first buffer, so records are written even if the thread doesn't log
+    anymore. Error records bypass the buffer: the buffer of the thread is flushed and the error record is written at
+    once.
+
+    Records of a batch are formatted and written to a stream with a single write and flush call by
+    `logging.StreamHandler` (including `logging.FileHandler`) instances, handlers with `write_batch(records)` method
+    (e.g. `BinaryTraceHandler`) get the whole batch, other handlers get records one by one.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: Optional[float] = DEFAULT_FLUSH_INTERVAL,
+    ):
+        self.logger = logger
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._local = threading.local()
+        self._buffers = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._timer = None
+
+        atexit.register(self.stop)
+
+    def isEnabledFor(self, level: int) -> bool:  # noqa: N802
+        """Check if records of the level would be processed by the logger."""
+        return self.logger.isEnabledFor(level)
+
+    def log(self, level: int, msg: str, extra: Optional[dict[str, Any]] = None) -> None:
+        """Build log record and put it to the buffer of the current thread, flush the buffer if it is full or old."""
+        if not self.logger.isEnabledFor(level):
+            return
+
+        now = time.monotonic()
+        buffer = self._get_buffer()
+        with buffer.lock:
+            if not buffer.records:
+                buffer.started = now
+            buffer.records.append(make_record(self.logger, level, msg, extra))
+
+            if len(buffer.records) >= self.batch_size or (
+                self.flush_interval is not None and now - buffer.started >= self.flush_interval
+            ):
+                self._flush_buffer(buffer)
+
+    def exception(self, msg: str, extra: Optional[dict[str, Any]] = None) -> None:
+        """Flush the buffer of the current thread and write error log record with info about the exception at once."""
+        if not self.logger.isEnabledFor(logging.ERROR):
+            return
+
+        record = make_record(self.logger, logging.ERROR, msg, extra, sys.exc_info())
+        buffer = self._get_buffer()
+        with buffer.lock:
+            buffer.records.append(record)
+            self._flush_buffer(buffer)
+
+    def flush(self) -> None:
+        """Write buffered records of all threads to handlers."""
+        with self._lock:
+            buffers = list(self._buffers)
+
+        for buffer in buffers:
+            with buffer.lock:
+                self._flush_buffer(buffer)
+
+        with self._lock:
+            self._buffers = [i for i in self._buffers if i.thread.is_alive() or i.records]
+
+    def stop(self) -> None:
+        """Stop the timer thread and write buffered records of all threads to handlers."""
+        self._stopped.set()
+        if self._timer is not None and self._timer is not threading.current_thread():
+            self._timer.join()
+        self.flush()
+        atexit.unregister(self.stop)
+
+    def _get_buffer(self) -> '_Buffer':
+        try:
+            return self._local.buffer
+        except AttributeError:
+            buffer = _Buffer()
+            self._local.buffer = buffer
+            with self._lock:
+                self._buffers.append(buffer)
+                if self._timer is None and self.flush_interval is not None and not self._stopped.is_set():
+                    self._timer = threading.Thread(target=self._flush_on_time, name='BatchingEmitter', daemon=True)
+                    self._timer.start()
+            return buffer
+
+    def _flush_on_time(self) -> None:
+        timeout = self.flush_interval
+        while not self._stopped.wait(timeout):
+            timeout = self._flush_old_buffers()
+
+    def _flush_old_buffers(self) -> float:
+        """Flush buffers with records older than `flush_interval`, return time left until the next buffer gets old."""
+        with self._lock:
+            buffers = list(self._buffers)
+
+        timeout = self.flush_interval
+        now = time.monotonic()
+        for buffer in buffers:
+            with buffer.lock:
+                if not buffer.records:
+                    continue
+                age = now - buffer.started
+                if age >= self.flush_interval:
+                    self._flush_buffer(buffer)
+                else:
+                    timeout = min(timeout, self.flush_interval - age)
+        return timeout
+
+    def _flush_buffer(self, buffer: '_Buffer') -> None:
+        records, buffer.records = buffer.records, []
+        if records:
+            handle_batch(self.logger, records)
+
+
+class _Buffer:
+    """Records buffered by a thread."""
+
+    __slots__ = ('records', 'started', 'lock', 'thread')
+
+    def __init__(self):
+        self.records = []
+        self.started = 0.0
+        self.lock = threading.Lock()
+        self.thread = threading.current_thread()
+
+
+def resolve_deferred(values: dict[str, Any]) -> None:
+    """Replace `DeferredValue` values of the dict with their resolved values in place."""
+    for key, value in values.items():
+        if type(value) is DeferredValue:
+            values[key] = value.resolve()
+
+
+def make_record(
+    logger: logging.Logger,
+    level: int,
+    msg: str,
+    extra: Optional[dict[str, Any]],
+    exc_info: Any = None,
+) -> logging.LogRecord:
+    """Build log record the same way as the logger does, but without looking up caller frame."""
+    return logger.makeRecord(logger.name, level, '(unknown file)', 0, msg, (), exc_info, extra=extra)
+
+
+def handle_batch(logger: logging.Logger, records: list[logging.LogRecord]) -> None:
+    """Pass records to handlers of the logger and its parents, write each batch to a stream at once if possible."""
+    if logger.disabled:
+        return
+
+    records = [i for i in records if logger.filter(i)]
+
+    for handler in get_handlers(logger):
+        batch = [i for i in records if i.levelno >= handler.level]
+        if not batch:
+            continue
+
+        # looked up on the class, so arbitrary attributes of handlers (e.g. mocks) are not taken for the method
+        write_batch = getattr(type(handler), 'write_batch', None)
+        if write_batch is not None:
+            write_batch(handler, batch)
+        elif isinstance(handler, logging.StreamHandler) and getattr(handler, 'stream', None) is not None:
+            _write_batch(handler, batch)
+        else:
+            for record in batch:
+                handler.handle(record)
+
+
+def get_handlers(logger: logging.Logger) -> list[logging.Handler]:
+    """Return handlers records of the logger are passed to, the same as `logging.Logger.callHandlers` does."""
+    handlers = []
+    current = logger
+    while current is not None:
+        handlers.extend(current.handlers)
+        current = current.parent if current.propagate else None
+
+    if not handlers and logging.lastResort is not None:
+        handlers.append(logging.lastResort)
+    return handlers
+
+
+def _write_batch(handler: logging.StreamHandler, records: list[logging.LogRecord]) -> None:
+    records = [i for i in records if handler.filter(i)]
+    if not records:
+        return
+
+    handler.acquire()
+    try:
+        lines = []
+        for record in records:
+            try:
+                lines.append(handler.format(record) + handler.terminator)
+            except Exception:  # noqa
+                handler.handleError(record)
+
+        try:
+            handler.stream.write(''.join(lines))
+            handler.flush()
+        except Exception:  # noqa
+            handler.handleError(records[-1])
+    finally:
+        handler.release()
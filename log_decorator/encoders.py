@@ -0,0 +1,347 @@
+from typing import Any, Optional
+
+import ujson
+
+PROBE_NODES = 32
+
+_CONTAINER_TYPES = frozenset((dict, list, tuple, set, frozenset))
+
+
+class LimitReached(Exception):
+    """Raised by `BoundedWriter` when the output has exceeded its length limit, so encoding can be stopped."""
+
+
+class BoundedWriter:
+    """
+    Output buffer which collects text parts and joins them once.
+
+    If `limit` is passed `LimitReached` is raised as soon as the collected text exceeds it, so the caller stops
+    producing text which would be cut anyway.
+    """
+
+    __slots__ = ('parts', 'length', 'limit')
+
+    def __init__(self, limit: Optional[int] = None):
+        self.parts = []
+        self.length = 0
+        self.limit = limit
+
+    def write(self, text: str) -> None:
+        """Append text to the output, raise `LimitReached` if the output has exceeded the limit."""
+        self.parts.append(text)
+        self.length += len(text)
+        if self.limit is not None and self.length > self.limit:
+            raise LimitReached
+
+    def remaining(self) -> Optional[int]:
+        """Return number of characters which can be written before the limit is exceeded."""
+        if self.limit is None:
+            return None
+        return self.limit - self.length
+
+    def mark(self) -> tuple[int, int]:
+        """Return current position to roll back to it later."""
+        return len(self.parts), self.length
+
+    def rollback(self, position: tuple[int, int]) -> None:
+        """Drop everything written after the position."""
+        parts_count, self.length = position
+        del self.parts[parts_count:]  # noqa: WPS420
+
+    def getvalue(self) -> str:
+        """Return collected text."""
+        return ''.join(self.parts)
+
+
+def encode_json(
+    value: Any,
+    indent: Optional[int] = None,
+    max_length: Optional[int] = None,
+    lenient: bool = False,
+) -> str:
+    """
+    Encode value to JSON the same way as `ujson.dumps(value, indent=indent, ensure_ascii=False)` does.
+
+    If `max_length` is passed encoding is stopped once the output exceeds it, so the cost depends on `max_length`
+    instead of the value size. In this case only the first `max_length + 1` characters of the returned text are
+    guaranteed to match the full JSON, so it should be cut by the caller.
+    Raises `TypeError` if the value (or its part encoded before the limit) is not JSON serializable. With `lenient`
+    sets and frozensets are encoded as arrays and other values which are not JSON serializable as strings of their
+    `str`, only the values themselves are stringified instead of containers holding them.
+    """
+    writer = BoundedWriter(max_length)
+    try:
+        write_json(writer, value, indent, lenient)
+    except LimitReached:
+        pass  # noqa: WPS420
+    return writer.getvalue()
+
+
+def write_json(writer: BoundedWriter, value: Any, indent: Optional[int] = None, lenient: bool = False) -> None:
+    """Encode value to JSON in a single pass writing it straight to the writer, see `encode_json` for `lenient`."""
+    if indent:
+        _write_json(writer, value, indent, '\n', ': ', lenient)
+    else:
+        _write_json(writer, value, 0, '', ':', lenient)
+
+
+def _write_json(  # noqa: C901, WPS211, WPS231
+    writer: BoundedWriter,
+    value: Any,
+    indent: int,
+    newline: str,
+    key_separator: str,
+    lenient: bool,
+) -> None:
+    value_type = type(value)
+
+    if value_type is str:
+        remaining = writer.remaining()
+        if remaining is not None and len(value) > remaining:
+            # escaped string is never shorter than the original one, so its prefix is enough to exceed the limit
+            value = value[:remaining]
+        writer.write(ujson.dumps(value, ensure_ascii=False))
+    elif value_type is dict or value_type is list or value_type is tuple:
+        if writer.limit is not None and not _fits(value, writer.limit - writer.length):
+            _write_container(writer, value, indent, newline, key_separator, lenient)
+            return
+
+        try:
+            encoded = ujson.dumps(value, ensure_ascii=False, indent=indent)
+        except TypeError:
+            if not lenient:
+                raise
+            # only items which are not JSON serializable are stringified
+            _write_container(writer, value, indent, newline, key_separator, lenient)
+            return
+
+        if len(newline) > 1:
+            encoded = encoded.replace('\n', newline)
+        writer.write(encoded)
+    elif value_type is int:
+        writer.write(str(value))
+    elif value is None:
+        writer.write('null')
+    elif value is True:
+        writer.write('true')
+    elif value is False:
+        writer.write('false')
+    elif lenient and (value_type is set or value_type is frozenset):
+        _write_container(writer, value, indent, newline, key_separator, lenient)
+    else:
+        # floats, subclasses of builtin types and types with custom serialization are left to ujson itself
+        try:
+            encoded = ujson.dumps(value, ensure_ascii=False, indent=indent)
+        except TypeError:
+            if not lenient:
+                raise
+            # the string is cut to the remaining length before escaping
+            _write_json(writer, str(value), indent, newline, key_separator, lenient)
+            return
+
+        if len(newline) > 1:
+            encoded = encoded.replace('\n', newline)
+        writer.write(encoded)
+
+
+def _write_container(  # noqa: WPS211
+    writer: BoundedWriter,
+    value: Any,
+    indent: int,
+    newline: str,
+    key_separator: str,
+    lenient: bool,
+) -> None:
+    """Write container item by item, so writing stops at the limit even if the container is huge."""
+    if not value:
+        writer.write('{}' if type(value) is dict else '[]')
+        return
+
+    item_newline = newline + ' ' * indent if newline else ''
+
+    if type(value) is dict:
+        delimiter = '{'
+        for item_key, item_value in value.items():
+            writer.write(delimiter)
+            writer.write(item_newline)
+            writer.write(_encode_key(item_key, lenient))
+            writer.write(key_separator)
+            _write_json(writer, item_value, indent, item_newline, key_separator, lenient)
+            delimiter = ','
+        writer.write(newline)
+        writer.write('}')
+        return
+
+    delimiter = '['
+    for item in value:
+        writer.write(delimiter)
+        writer.write(item_newline)
+        _write_json(writer, item, indent, item_newline, key_separator, lenient)
+        delimiter = ','
+    writer.write(newline)
+    writer.write(']')
+
+
+def may_fit(value: Any, limit: int) -> bool:
+    """
+    Cheaply check if encoded value may fit into the limit, so it is worth encoding at once without `BoundedWriter`.
+
+    Length of strings and bytes and the estimate of containers (see `_fits`) are checked, other values are assumed to
+    be short. The result is a guess, the encoded value still has to be checked.
+    """
+    value_type = type(value)
+    if value_type is str or value_type is bytes:
+        return len(value) <= limit
+    if value_type in _CONTAINER_TYPES:
+        return _fits(value, limit)
+    return True
+
+
+def _fits(value: Any, limit: int) -> bool:
+    """
+    Check if encoded container may fit into the limit, so it can be encoded by ujson at once.
+
+    Only first `PROBE_NODES` nodes are inspected (depth-first) to keep the check much cheaper than encoding itself,
+    it catches long strings and containers with many items wherever they are nested. The estimate (number of items
+    plus length of string and bytes values) is never greater than length of the encoded value.
+    """
+    size = 0
+    nodes = PROBE_NODES
+    stack = [value]
+    while stack:
+        current = stack.pop()
+
+        size += len(current)
+        if size > limit:
+            return False
+
+        for item in current.values() if type(current) is dict else current:
+            item_type = type(item)
+            if item_type is str or item_type is bytes:
+                size += len(item)
+            elif (
+                item_type is dict
+                or item_type is list
+                or item_type is tuple
+                or item_type is set
+                or item_type is frozenset
+            ):
+                stack.append(item)
+
+            nodes -= 1
+            if not nodes:
+                return size <= limit
+
+        if size > limit:
+            return False
+
+    return True
+
+
+def encode_repr(value: Any, max_length: Optional[int] = None) -> str:
+    """
+    Encode value the same way as `repr(value)` does.
+
+    If `max_length` is passed encoding is stopped once the output exceeds it, like `encode_json` does.
+    """
+    writer = BoundedWriter(max_length)
+    try:
+        write_repr(writer, value)
+    except LimitReached:
+        pass  # noqa: WPS420
+    return writer.getvalue()
+
+
+def write_repr(writer: BoundedWriter, value: Any) -> None:
+    """Encode value with `repr` in a single pass writing it straight to the writer."""
+    value_type = type(value)
+
+    if value_type is str or value_type is bytes:
+        remaining = None if writer.limit is None else writer.limit - writer.length
+        if remaining is not None and len(value) > remaining:
+            writer.write(_repr_prefix(value, remaining))
+        else:
+            writer.write(repr(value))
+    elif value_type in _CONTAINER_TYPES:
+        if writer.limit is None or _fits(value, writer.limit - writer.length):
+            writer.write(repr(value))
+        else:
+            _write_repr_container(writer, value)
+    else:
+        writer.write(repr(value))
+
+
+def write_str(writer: BoundedWriter, value: Any) -> None:
+    """Encode value with `str` in a single pass writing it straight to the writer."""
+    value_type = type(value)
+
+    if value_type is str:
+        remaining = None if writer.limit is None else writer.limit - writer.length
+        writer.write(value if remaining is None else value[:remaining + 1])
+    elif value_type in _CONTAINER_TYPES:
+        # builtin containers are converted to strings with repr of their items
+        write_repr(writer, value)
+    else:
+        writer.write(str(value))
+
+
+def _write_repr_container(writer: BoundedWriter, value: Any) -> None:  # noqa: C901
+    """Write container item by item, so writing stops at the limit even if the container is huge."""
+    value_type = type(value)
+
+    if value_type is dict:
+        delimiter = '{'
+        for item_key, item_value in value.items():
+            writer.write(delimiter)
+            write_repr(writer, item_key)
+            writer.write(': ')
+            write_repr(writer, item_value)
+            delimiter = ', '
+        writer.write('}')
+        return
+
+    if value_type is list:
+        opening, closing = '[', ']'
+    elif value_type is tuple:
+        opening, closing = '(', ',)' if len(value) == 1 else ')'
+    elif value_type is set:
+        opening, closing = '{', '}'
+    else:
+        opening, closing = 'frozenset({', '})'
+
+    delimiter = opening
+    for item in value:
+        writer.write(delimiter)
+        write_repr(writer, item)
+        delimiter = ', '
+    writer.write(closing)
+
+
+def _repr_prefix(value: Any, length: int) -> str:
+    """
+    Return beginning of `repr` of the string (or bytes) prefix which is at least `length` characters long.
+
+    `repr` uses double quotes if the value contains single quotes and doesn't contain double ones, so the full value
+    is checked to choose the same quotes as `repr(value)` does.
+    """
+    single_quote, double_quote = ("'", '"') if type(value) is str else (b"'", b'"')
+
+    prefix = value[:length]
+    uses_double_quotes = single_quote in value and double_quote not in value
+    if uses_double_quotes == (single_quote in prefix and double_quote not in prefix):
+        return repr(prefix)
+
+    # the extra quote makes repr choose the same quotes as for the full value, it is dropped with the closing quote
+    return repr(prefix + (single_quote if uses_double_quotes else double_quote))[:-2]
+
+
+def _encode_key(key: Any, lenient: bool = False) -> str:
+    if type(key) is str:
+        return ujson.dumps(key, ensure_ascii=False)
+    # ujson converts keys of other types to strings on its own, e.g. `None` to "null"
+    try:
+        return ujson.dumps({key: None}, ensure_ascii=False)[1:-6]
+    except TypeError:
+        if not lenient:
+            raise
+        return ujson.dumps(str(key), ensure_ascii=False)
@@ -1,22 +1,41 @@
+import dataclasses
 import inspect
 import logging
-import re
+import sys
 import time
-from copy import deepcopy
+import weakref
+from contextvars import ContextVar
+from enum import Enum
+from functools import partial
+from itertools import islice
 from types import FunctionType
-from typing import Any, Callable, Iterable, List, Tuple
-from uuid import uuid1
+from typing import Any, Callable, Generator, Iterable, Optional
 
 import ujson
 from wrapt import decorator
 
+from .call_id import fast_call_id
+from .emitters import DeferredValue, Emitter, QueueEmitter, resolve_deferred
+from .sampling import CallCounter, FrequencySampler, Sampler
+from .stats import NS_IN_UNIT, STATS_REGISTRY, TimeUnit
+
 HIDDEN_VALUE = 'hidden'
 
 SECONDS_TO_MS = 1000
 
 LOWEST_LOG_LVL = 5
 
-LOGS_COUNTER = {}  # noqa: WPS407
+LOG_REPR_REGISTRY = {}  # noqa: WPS407
+
+LOG_REPR_FACTORIES = []  # noqa: WPS407
+
+ARRAY_PREVIEW_ITEMS = 8
+
+MAX_BYTES_REPR_LENGTH = 1024
+
+MAX_LOG_REPR_DEPTH = 32
+
+_CALL_PLANS = weakref.WeakKeyDictionary()
 
 
 def get_logger(logger_name: str = 'service_logger') -> logging.Logger:
@@ -26,6 +45,111 @@ def get_logger(logger_name: str = 'service_logger') -> logging.Logger:
     return logger
 
 
+class CaptureLimits:
+    """
+    Limits applied to captured values, they bound capture cost and memory regardless of the payload size.
+
+    - `max_depth` - containers nested deeper are replaced with a short description.
+    - `max_items` - max number of items kept in each container.
+    - `max_length` - max length of each string and bytes value.
+    - `max_size` - approximate overall size in characters of a single captured value (all input arguments are
+      treated as a single value).
+
+    Each truncation leaves a marker like `'<1234 more items>'` in place of the dropped data.
+    """
+
+    __slots__ = ('max_depth', 'max_items', 'max_length', 'max_size')
+
+    def __init__(
+        self,
+        max_depth: Optional[int] = None,
+        max_items: Optional[int] = None,
+        max_length: Optional[int] = None,
+        max_size: Optional[int] = None,
+    ):
+        self.max_depth = max_depth
+        self.max_items = max_items
+        self.max_length = max_length
+        self.max_size = max_size
+
+
+class CaptureMode(str, Enum):
+    """Available modes of capturing input arguments, result and yielded items."""
+
+    VALUES = 'values'
+    SHAPES = 'shapes'
+
+
+class CallPlan:
+    """Per-function call data resolved once at decoration time and reused by every call."""
+
+    __slots__ = (
+        'func_name',
+        'argspec',
+        'arg_names',
+        'positional_count',
+        'varargs',
+        'kwonly_args',
+        'hide_tree',
+        'counter',
+        'call_msg',
+        'return_msg',
+        'error_msg',
+        'stats_msg',
+        'item_msg',
+    )
+
+    def __init__(
+        self,
+        wrapped: Any,
+        hidden_params: Iterable = (),
+        argspec: Optional[inspect.FullArgSpec] = None,
+    ):
+        target = getattr(wrapped, '__func__', wrapped)
+
+        self.func_name = '' if target is None else f'{target.__module__}.{target.__qualname__}'
+        self.argspec = inspect.getfullargspec(target) if argspec is None else argspec
+        self.arg_names = tuple(self.argspec.args)
+        self.positional_count = len(self.arg_names)
+        self.varargs = self.argspec.varargs
+        self.kwonly_args = tuple(self.argspec.kwonlyargs)
+        self.hide_tree = compile_hidden_params(hidden_params)
+        self.counter = CallCounter()
+
+        self.call_msg = f'call {self.func_name}'
+        self.return_msg = f'return {self.func_name}'
+        self.error_msg = f'error in {self.func_name}'
+        self.stats_msg = f'stats {self.func_name}'
+        self.item_msg = f'yield {self.func_name}'
+
+    def get_hide_node(self, item_name: str) -> Optional['HideNode']:
+        """Return compiled hide tree node for the argument or `None` if nothing should be hidden in it."""
+        if self.hide_tree is None:
+            return None
+        return self.hide_tree.get_child(item_name)
+
+
+def build_call_plan(wrapped: Any, hidden_params: Iterable = ()) -> CallPlan:
+    """Build call plan for the function being decorated and register it to be found by `get_call_plan`."""
+    plan = CallPlan(wrapped, hidden_params)
+
+    try:
+        _CALL_PLANS[getattr(wrapped, '__func__', wrapped)] = plan
+    except TypeError:  # objects which don't support weak references can't be found later
+        pass
+
+    return plan
+
+
+def get_call_plan(func: Any) -> Optional[CallPlan]:
+    """Return call plan of the function (method, class) decorated with log decorator, e.g. to inspect its counter."""
+    target = getattr(func, '__wrapped__', func)
+    try:
+        return _CALL_PLANS.get(getattr(target, '__func__', target))
+    except TypeError:
+        return None
+
+
 def log(  # noqa: WPS211
     logger_inst: logging.Logger = get_logger(),
     lvl: int = logging.INFO,
@@ -38,166 +162,1113 @@ def log(  # noqa: WPS211
     track_exec_time: bool = False,
     frequency: int = None,
     exception_hook: FunctionType = None,
+    lazy_capture: bool = False,
+    capture_limits: Optional[CaptureLimits] = None,
+    sampler: Optional[Sampler] = None,
+    call_id_factory: Callable[[], str] = fast_call_id,
+    exec_time_unit: TimeUnit = TimeUnit.MS,
+    track_cpu_time: bool = False,
+    collect_stats: bool = False,
+    stats_interval: Optional[float] = None,
+    emitter: Optional[Emitter] = None,
+    item_sampler: Optional[Sampler] = None,
+    background_capture: bool = False,
+    capture_mode: CaptureMode = CaptureMode.VALUES,
+    memoize_log_ids: bool = False,
 ) -> Callable:
     """
     Decorator to trace function calls in logs.
 
     It logs function call, function return and any exceptions with separate log records.
     This high-level function is needed to pass additional parameters and customise _log behavior.
+
+    For generator functions the call is logged when the generator is created, while the return (or error) record is
+    emitted when iteration is finished and contains number of yielded items and total iteration time. Yielded items
+    are not buffered, they are logged with separate records only if selected by `item_sampler`.
+
+    Records are passed to `logger_inst` handlers one by one, pass `emitters.BatchingEmitter` as `emitter` to write them
+    to handlers in batches.
+
+    With `collect_stats` calls count, errors count and latency histogram of the function are collected in
+    `STATS_REGISTRY` regardless of sampling, with `stats_interval` they are logged and reset each interval.
+
+    Calls are sampled with `sampler` (`frequency` is a shortcut for `FrequencySampler`), errors are always logged.
+
+    Function result is normalized only if the return record will be emitted. With `lazy_capture` input arguments
+    are also normalized only if the call record will be emitted, otherwise they are captured after the call if an
+    exception occurs, so arguments mutated by the function are logged in their mutated state.
+
+    With `background_capture` (requires `emitters.QueueEmitter` as `emitter`) only a shallow snapshot of arguments,
+    result and yielded items is taken in the caller, see `snapshot_value`, while normalization, redaction and
+    formatting are performed by the emitter thread. Nested containers and other objects are not copied, so their
+    changes made after the capture may be visible in logs. Input of failed calls is normalized in the caller to pass
+    it to `exception_hook`.
+
+    With `capture_mode=CaptureMode.SHAPES` arguments, result and yielded items are logged as their shapes (type, length,
+    dict keys, array shape) instead of values, see `describe_shape`, so capture cost doesn't depend on nested data.
+
+    With `memoize_log_ids` `get_log_id` is called once per object for all values captured for a call (input, result,
+    items), so objects repeated in them are rendered once, see `with_log_id_memo`.
     """
-    # noinspection DuplicatedCode
-    @decorator
-    def _log(wrapped: FunctionType, instance: Any, args: tuple[Any], kwargs: dict[str, Any]) -> Any:
-        """Actual implementation of the above decorator."""
-        func_name = f'{wrapped.__module__}.{wrapped.__qualname__}'
-        extra = {'call_id': uuid1().hex, 'function': func_name}
+    _hide_input_from_return = hide_input_from_return if not minify_logs else True
+
+    sink = logger_inst if emitter is None else emitter
 
-        _hide_input_from_return = hide_input_from_return if not minify_logs else True
+    capture_mode = CaptureMode(capture_mode)
+    capture_args, capture_value = get_capture_functions(capture_mode, background_capture, emitter)
 
-        send_log = True
+    exec_time_unit = TimeUnit(exec_time_unit)
+    ns_in_unit = NS_IN_UNIT[exec_time_unit.value]
+    exec_time_key = f'execution_time_{exec_time_unit.value}'
+    cpu_time_key = f'cpu_time_{exec_time_unit.value}'
 
-        if frequency is not None:
-            log_counter = LOGS_COUNTER.setdefault(func_name, 0) + 1
-            LOGS_COUNTER[func_name] = log_counter
+    if frequency is not None:
+        if sampler is not None:
+            raise ValueError('Pass either frequency or sampler')
+        sampler = FrequencySampler(frequency)
 
-            if log_counter % frequency != 0:
-                send_log = False
+    def _decorate(wrapped: Any) -> Any:
+        """Build call plan for the decorated function once and wrap it."""
+        plan = build_call_plan(wrapped, hidden_params)
+        function_sampler = None if sampler is None else sampler.clone()
+        stats = STATS_REGISTRY.get_stats(plan.func_name) if collect_stats else None
+        function_item_sampler = None if item_sampler is None else item_sampler.clone()
 
-        try:  # noqa: WPS229
-            params = inspect.getfullargspec(wrapped)
-            extra['input_data'] = get_logged_args(
-                params,
-                [instance] + list(args) if instance else args,
-                kwargs,
-                hidden_params,
+        # noinspection DuplicatedCode
+        @decorator
+        def _log(wrapped: FunctionType, instance: Any, args: tuple[Any], kwargs: dict[str, Any]) -> Any:
+            """Actual implementation of the above decorator."""
+            extra = {'call_id': call_id_factory(), 'function': plan.func_name}
+            memo = {} if memoize_log_ids else None
+
+            call_number = plan.counter.increment()
+            # samplers are asked last, so rate budgets are not spent on calls which would not be logged anyway
+            emit_records = (
+                not exceptions_only
+                and sink.isEnabledFor(lvl)
+                and (function_sampler is None or function_sampler.should_sample(call_number))
             )
-            if send_log and not exceptions_only:
-                logger_inst.log(level=lvl, msg=f'call {func_name}', extra=extra)
+            capture_deferred = lazy_capture and not emit_records
+            call_args = [instance] + list(args) if instance else args
+            elapsed_ns = None
+
+            try:  # noqa: WPS229
+                if not capture_deferred:
+                    extra['input_data'] = with_log_id_memo(memo, capture_args, plan, call_args, kwargs, capture_limits)
+
+                if emit_records:
+                    sink.log(level=lvl, msg=plan.call_msg, extra=extra)
+
+                start_time = time.perf_counter_ns()
+                start_cpu_time = time.thread_time_ns() if track_cpu_time else 0
+
+                result = wrapped(*args, **kwargs)
+
+                elapsed_ns = time.perf_counter_ns() - start_time
+                if track_exec_time:
+                    extra[exec_time_key] = elapsed_ns / ns_in_unit
+                if track_cpu_time:
+                    extra[cpu_time_key] = (time.thread_time_ns() - start_cpu_time) / ns_in_unit
+
+                if emit_records:
+                    # input and result trees are shared with the call record, they are never mutated after capture
+                    return_extra = {**extra, 'result': HIDDEN_VALUE}
+                    if not hide_output:
+                        return_extra['result'] = with_log_id_memo(memo, capture_value, result, capture_limits)
+                    if _hide_input_from_return:
+                        return_extra['input_data'] = HIDDEN_VALUE
+
+                    sink.log(level=lvl, msg=plan.return_msg, extra=return_extra)
+
+                return result
+            except Exception as exc:  # noqa
+                elapsed_ns = None
+
+                if capture_deferred:
+                    extra['input_data'] = with_log_id_memo(
+                        memo, get_logged_args, plan, call_args, kwargs, capture_limits, capture_mode,
+                    )
+                elif background_capture:
+                    resolve_deferred(extra)
+
+                sink.exception(msg=plan.error_msg, extra=extra)
+
+                if exception_hook is not None:
+                    exception_hook(logger_inst, exc, extra)
+
+                if hasattr(exc, 'return_value'):
+                    return exc.return_value
+
+                raise
+            finally:
+                if stats is not None:
+                    stats.record(elapsed_ns)
+                    if stats_interval is not None:
+                        log_stats_summary(sink, lvl, plan, stats.pop_summary(stats_interval, exec_time_unit))
+
+        # noinspection DuplicatedCode
+        @decorator
+        def _log_generator(wrapped: FunctionType, instance: Any, args: tuple[Any], kwargs: dict[str, Any]) -> Any:
+            """Implementation of the above decorator for generator functions, iteration is logged by `_iterate`."""
+            extra = {'call_id': call_id_factory(), 'function': plan.func_name}
+            memo = {} if memoize_log_ids else None
+
+            call_number = plan.counter.increment()
+            # samplers are asked last, so rate budgets are not spent on calls which would not be logged anyway
+            emit_records = (
+                not exceptions_only
+                and sink.isEnabledFor(lvl)
+                and (function_sampler is None or function_sampler.should_sample(call_number))
+            )
+            capture_deferred = lazy_capture and not emit_records
+            call_args = [instance] + list(args) if instance else args
+
+            if not capture_deferred:
+                extra['input_data'] = with_log_id_memo(memo, capture_args, plan, call_args, kwargs, capture_limits)
+
+            if emit_records:
+                sink.log(level=lvl, msg=plan.call_msg, extra=extra)
+
+            generator = wrapped(*args, **kwargs)
+            return _iterate(generator, extra, emit_records, capture_deferred, call_args, kwargs, memo)
+
+        # noinspection DuplicatedCode
+        def _iterate(  # noqa: WPS211, WPS231
+            generator: Generator,
+            extra: dict[str, Any],
+            emit_records: bool,
+            capture_deferred: bool,
+            call_args: Any,
+            kwargs: dict[str, Any],
+            memo: Optional[dict],
+        ) -> Generator:
+            """Delegate iteration to the wrapped generator and log sampled items and iteration result."""
+            items_count = 0
+            elapsed_ns = None
+            capture_item = capture_value if memo is None else partial(with_log_id_memo, memo, capture_value)
+            closed = False
+            sent = None
+            thrown = None
+
+            start_time = time.perf_counter_ns()
+            start_cpu_time = time.thread_time_ns() if track_cpu_time else 0
+
+            try:  # noqa: WPS229
+                while True:
+                    try:
+                        item = generator.send(sent) if thrown is None else generator.throw(thrown)
+                    except StopIteration as stop:
+                        result = stop.value
+                        break
+
+                    items_count += 1
+                    if (
+                        emit_records
+                        and function_item_sampler is not None
+                        and function_item_sampler.should_sample(items_count)
+                    ):
+                        log_item(sink, lvl, plan, extra, items_count, item, hide_output, capture_limits, capture_item)
+
+                    sent, thrown = None, None
+                    try:
+                        sent = yield item
+                    except GeneratorExit:
+                        generator.close()
+                        closed, result = True, None
+                        break
+                    except BaseException as consumer_exc:  # noqa: WPS424 it is thrown into the wrapped generator
+                        thrown = consumer_exc
+
+                elapsed_ns = time.perf_counter_ns() - start_time
+                extra['items_count'] = items_count
+                if track_exec_time:
+                    extra[exec_time_key] = elapsed_ns / ns_in_unit
+                if track_cpu_time:
+                    extra[cpu_time_key] = (time.thread_time_ns() - start_cpu_time) / ns_in_unit
+
+                if emit_records:
+                    return_extra = {**extra, 'result': HIDDEN_VALUE}
+                    if not hide_output:
+                        return_extra['result'] = with_log_id_memo(memo, capture_value, result, capture_limits)
+                    if closed:
+                        return_extra['closed'] = True
+                    if _hide_input_from_return:
+                        return_extra['input_data'] = HIDDEN_VALUE
+
+                    sink.log(level=lvl, msg=plan.return_msg, extra=return_extra)
+
+                return result
+            except Exception as exc:  # noqa
+                elapsed_ns = None
+                extra['items_count'] = items_count
+
+                if capture_deferred:
+                    extra['input_data'] = with_log_id_memo(
+                        memo, get_logged_args, plan, call_args, kwargs, capture_limits, capture_mode,
+                    )
+                elif background_capture:
+                    resolve_deferred(extra)
+
+                sink.exception(msg=plan.error_msg, extra=extra)
+
+                if exception_hook is not None:
+                    exception_hook(logger_inst, exc, extra)
 
-            start_time = time.time()
+                if hasattr(exc, 'return_value'):
+                    return exc.return_value
 
-            result = wrapped(*args, **kwargs)
-            if track_exec_time:
-                extra['execution_time_ms'] = int((time.time() - start_time) * SECONDS_TO_MS)
+                raise
+            finally:
+                if stats is not None:
+                    stats.record(elapsed_ns)
+                    if stats_interval is not None:
+                        log_stats_summary(sink, lvl, plan, stats.pop_summary(stats_interval, exec_time_unit))
 
-            extra['result'] = HIDDEN_VALUE if hide_output else normalize_for_log(result)
+        if inspect.isgeneratorfunction(wrapped):
+            return _log_generator(wrapped)
+        return _log(wrapped)
 
-            if send_log and not exceptions_only:
-                return_extra = deepcopy(extra)
-                if _hide_input_from_return:
-                    return_extra['input_data'] = HIDDEN_VALUE
+    return _decorate
 
-                logger_inst.log(level=lvl, msg=f'return {func_name}', extra=return_extra)
 
-            return result
-        except Exception as exc:  # noqa
-            error_msg = f'error in {func_name}'
+def log_item(  # noqa: WPS211
+    logger_inst: Any,
+    lvl: int,
+    plan: CallPlan,
+    extra: dict[str, Any],
+    item_number: int,
+    item: Any,
+    hide_output: bool,
+    limits: Optional[CaptureLimits],
+    capture_value: Optional[Callable[[Any, Optional[CaptureLimits]], Any]] = None,
+) -> None:
+    """Log item yielded by decorated generator, input data of the call is not repeated in item records."""
+    capture_value = capture_value or normalize_for_log
+    logger_inst.log(
+        level=lvl,
+        msg=plan.item_msg,
+        extra={
+            'call_id': extra['call_id'],
+            'function': plan.func_name,
+            'item_number': item_number,
+            'item': HIDDEN_VALUE if hide_output else capture_value(item, limits),
+        },
+    )
 
-            if send_log:
-                logger_inst.exception(msg=error_msg, extra=extra if extra is not None else {})
 
-            if exception_hook is not None:
-                exception_hook(logger_inst, exc, extra)
+def log_stats_summary(logger_inst: Any, lvl: int, plan: CallPlan, summary: Optional[dict]) -> None:
+    """Log summary of function calls statistics if it is available."""
+    if summary is not None:
+        logger_inst.log(level=lvl, msg=plan.stats_msg, extra={'function': plan.func_name, 'stats': summary})
 
-            if hasattr(exc, 'return_value'):
-                return exc.return_value
 
-            raise
+def get_capture_functions(
+    capture_mode: CaptureMode,
+    background_capture: bool,
+    emitter: Optional[Emitter],
+) -> tuple[Callable, Callable]:
+    """Return functions to capture call arguments and values (result, items) according to decorator options."""
+    if background_capture and not isinstance(emitter, QueueEmitter):
+        raise ValueError('background_capture requires QueueEmitter as emitter')
 
-    return _log
+    if capture_mode == CaptureMode.SHAPES:
+        # shapes are cheaper to describe in the caller than to take snapshots for the background thread
+        return get_args_shapes, describe_shape
+    if background_capture:
+        return get_deferred_args, get_deferred_value
+    return get_logged_args, normalize_for_log
 
 
 def get_logged_args(
-    params: inspect.FullArgSpec,
+    plan: CallPlan,
     args: tuple[Any],
     kwargs: dict[str, Any],
-    hidden_params: Iterable,
+    limits: Optional[CaptureLimits] = None,
+    mode: CaptureMode = CaptureMode.VALUES,
 ) -> dict[str, Any]:
-    """Return dict with function call argument names and their values casted to primitive types."""
+    """
+    Return dict with function call argument names and their values casted to primitive types (or their shapes).
+
+    Signature of older versions `(params, args, kwargs, hidden_params)` with `inspect.FullArgSpec` of the function is
+    still supported, the plan is built from the argspec on each call in this case.
+    """
+    if isinstance(plan, inspect.FullArgSpec):
+        plan = CallPlan(None, limits or (), plan)
+        limits = None
+
+    if mode == CaptureMode.SHAPES:
+        return get_args_shapes(plan, args, kwargs, limits)
+
+    bounded = None if limits is None else _BoundedNormalizer(limits)
+
     result = {}
 
-    for i, v in enumerate(args[:len(params.args)]):
-        arg_name = params.args[i]
-        arg_value = _hide_items(v, arg_name, hidden_params)
-        result[arg_name] = normalize_for_log(arg_value)
+    for arg_name, v in zip(plan.arg_names, args):
+        result[arg_name] = _capture(v, plan.get_hide_node(arg_name), bounded)
 
-    varargs = params.varargs
+    varargs = plan.varargs
     if varargs:
-        if _hide_items(args[len(params.args):], varargs, hidden_params) == HIDDEN_VALUE:
-            result['*args'] = f'hidden {len(args) - len(params.args)} args'
+        hide_node = plan.get_hide_node(varargs)
+        if hide_node is not None and hide_node.hidden:
+            result['*args'] = f'hidden {len(args) - plan.positional_count} args'
         else:
-            result['*args'] = tuple(normalize_for_log(i) for i in args[len(params.args):])  # noqa: WPS441
+            result['*args'] = _capture(tuple(args[plan.positional_count:]), hide_node, bounded)
 
     for k, v in kwargs.items():
-        kwarg = _hide_items(v, k, hidden_params)
-        result[k] = normalize_for_log(kwarg)
+        result[k] = _capture(v, plan.get_hide_node(k), bounded)
 
     return result
 
 
-def normalize_for_log(value: Any) -> Any:
-    """Cast any value to a primitive type."""
-    if isinstance(value, bool) or value is None:
-        return str(value)
-    elif isinstance(value, dict):
-        return {k: normalize_for_log(v) for k, v in value.items()}
-    elif isinstance(value, (list, set, frozenset, tuple)):
-        return type(value)(normalize_for_log(i) for i in value)
+def get_args_shapes(
+    plan: CallPlan,
+    args: tuple[Any],
+    kwargs: dict[str, Any],
+    limits: Optional[CaptureLimits] = None,
+) -> dict[str, Any]:
+    """Return dict with function call argument names and shapes of their values, hidden arguments are not described."""
+    result = {}
+
+    for arg_name, v in zip(plan.arg_names, args):
+        result[arg_name] = _capture_shape(v, plan.get_hide_node(arg_name), limits)
+
+    varargs = plan.varargs
+    if varargs:
+        hide_node = plan.get_hide_node(varargs)
+        if hide_node is not None and hide_node.hidden:
+            result['*args'] = f'hidden {len(args) - plan.positional_count} args'
+        else:
+            length = len(args) - plan.positional_count
+            result['*args'] = [
+                _capture_shape(v, None if hide_node is None else hide_node.get_item_child(i, length), limits)
+                for i, v in enumerate(args[plan.positional_count:])
+            ]
+
+    for k, v in kwargs.items():
+        result[k] = _capture_shape(v, plan.get_hide_node(k), limits)
+
+    return result
+
+
+def describe_shape(value: Any, limits: Optional[CaptureLimits] = None) -> dict[str, Any]:
+    """
+    Return summary of the value shape without walking into it: type name and, depending on the type, `len` of sized
+    values, `keys` of dicts (up to `limits.max_items`), `shape` and `dtype` of arrays (e.g. numpy) and `nbytes` of
+    arrays and memory views.
+    """
+    value_type = type(value)
+    describer = _SHAPE_DESCRIBERS_CACHE.get(value_type)
+    if describer is None:
+        describer = _resolve_shape_describer(value_type)
+    return describer(value, limits)
+
+
+def _capture_shape(value: Any, hide_node: Optional['HideNode'], limits: Optional[CaptureLimits]) -> Any:
+    # shapes don't contain nested values, so only hiding of the whole value is applied
+    if hide_node is not None and hide_node.hidden:
+        return HIDDEN_VALUE
+    return describe_shape(value, limits)
+
+
+def _resolve_shape_describer(value_type: type) -> Callable[[Any, Optional[CaptureLimits]], dict[str, Any]]:
+    """Find how to describe values of the type and cache the decision."""
+    describer = _BUILTIN_SHAPE_DESCRIBERS.get(value_type)
+
+    if describer is None:
+        if issubclass(value_type, dict):
+            describer = _describe_dict
+        elif hasattr(value_type, 'shape') and hasattr(value_type, 'dtype'):
+            describer = _describe_array
+        elif hasattr(value_type, '__len__') and not issubclass(value_type, type):
+            describer = _describe_sized
+        else:
+            describer = _describe_type
+
+    _SHAPE_DESCRIBERS_CACHE[value_type] = describer
+    return describer
+
+
+def _describe_type(value: Any, limits: Optional[CaptureLimits]) -> dict[str, Any]:
+    return {'type': type(value).__name__}
+
+
+def _describe_sized(value: Any, limits: Optional[CaptureLimits]) -> dict[str, Any]:
+    try:
+        length = len(value)
+    except Exception:  # noqa
+        # custom `__len__` may fail, the value is described by its type then
+        return {'type': type(value).__name__}
+    return {'type': type(value).__name__, 'len': length}
+
 
-    return _get_log_repr(value)
+def _describe_dict(value: dict, limits: Optional[CaptureLimits]) -> dict[str, Any]:
+    max_items = None if limits is None else limits.max_items
+    keys = [k if type(k) is str else str(k) for k in islice(value, max_items)]
+    if len(keys) < len(value):
+        keys.append(f'<{len(value) - len(keys)} more items>')
+    return {'type': type(value).__name__, 'len': len(value), 'keys': keys}
+
+
+def _describe_array(value: Any, limits: Optional[CaptureLimits]) -> dict[str, Any]:
+    shape = {'type': type(value).__name__, 'shape': list(value.shape), 'dtype': str(value.dtype)}
+    nbytes = getattr(value, 'nbytes', None)
+    if type(nbytes) is int:
+        shape['nbytes'] = nbytes
+    return shape
+
+
+def _describe_memoryview(value: memoryview, limits: Optional[CaptureLimits]) -> dict[str, Any]:
+    return {'type': 'memoryview', 'shape': list(value.shape or ()), 'nbytes': value.nbytes}
+
+
+def get_deferred_args(
+    plan: CallPlan,
+    args: tuple[Any],
+    kwargs: dict[str, Any],
+    limits: Optional[CaptureLimits] = None,
+) -> DeferredValue:
+    """Take snapshot of call arguments, they are converted by `get_logged_args` when the value is resolved."""
+    return DeferredValue(
+        get_logged_args,
+        plan,
+        [snapshot_value(i) for i in args],
+        {k: snapshot_value(v) for k, v in kwargs.items()},
+        limits,
+    )
+
+
+def get_deferred_value(value: Any, limits: Optional[CaptureLimits] = None) -> DeferredValue:
+    """Take snapshot of the value, it is converted by `normalize_for_log` when the value is resolved."""
+    return DeferredValue(normalize_for_log, snapshot_value(value), limits)
+
+
+def snapshot_value(value: Any) -> Any:
+    """
+    Return shallow snapshot of the value to normalize it later.
+
+    Builtin mutable containers (list, dict, set, bytearray) are copied without their items, any other values are
+    returned as is: immutable values can't change, while custom objects can't be copied cheaply and safely.
+    """
+    copy = _SNAPSHOT_COPIERS.get(type(value))
+    return value if copy is None else copy(value)
+
+
+def _capture(value: Any, hide_node: Optional['HideNode'], bounded: Optional['_BoundedNormalizer']) -> Any:
+    if bounded is not None:
+        return bounded.normalize(value, hide_node=hide_node)
+    if hide_node is None:
+        return normalize_for_log(value)
+    return _normalize_redacted(value, hide_node)
+
+
+def register_log_repr(value_type: type, converter: Optional[Callable[[Any], Any]] = None) -> Callable:
+    """
+    Register converter to represent values of the type (and its subclasses) in logs.
+
+    Converter is called with the value and should return a value ready for logging, it takes precedence over any
+    built-in representation. Can be used as a decorator when `converter` is not passed.
+    """
+    def _register(func: Callable[[Any], Any]) -> Callable[[Any], Any]:
+        LOG_REPR_REGISTRY[value_type] = func
+        _NORMALIZERS_CACHE.clear()
+        return func
+
+    if converter is None:
+        return _register
+
+    return _register(converter)
+
+
+def unregister_log_repr(value_type: type) -> None:
+    """Remove converter registered for the type with `register_log_repr`."""
+    LOG_REPR_REGISTRY.pop(value_type, None)
+    _NORMALIZERS_CACHE.clear()
+
+
+def register_log_repr_factory(factory: Callable[[type], Optional[Callable[[Any], Any]]]) -> Callable:
+    """
+    Register factory of converters for families of types which can't be registered one by one, e.g. all dataclasses.
+
+    Factory is called once per type which has no registered converter, built-in representation or `get_log_id` method
+    and returns converter for values of the type or `None` to leave the type to other factories. Converter should
+    return plain value (e.g. dict of fields), it is normalized afterwards within active capture limits. Factories
+    registered later are asked first. Can be used as a decorator.
+    """
+    LOG_REPR_FACTORIES.insert(0, factory)
+    _NORMALIZERS_CACHE.clear()
+    return factory
+
+
+def unregister_log_repr_factory(factory: Callable[[type], Optional[Callable[[Any], Any]]]) -> None:
+    """Remove factory registered with `register_log_repr_factory`."""
+    if factory in LOG_REPR_FACTORIES:
+        LOG_REPR_FACTORIES.remove(factory)
+    _NORMALIZERS_CACHE.clear()
+
+
+def with_log_id_memo(memo: Optional[dict], func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Call `func(*args)` reusing results of `get_log_id` calls stored in `memo` for the same objects and storing new
+    ones there, pass the same dict to share results between captures, e.g. of input and result of a call.
+    """
+    if memo is None:
+        return func(*args)
+
+    token = _LOG_ID_MEMO.set(memo)
+    try:
+        return func(*args)
+    finally:
+        _LOG_ID_MEMO.reset(token)
+
+
+def normalize_for_log(value: Any, limits: Optional[CaptureLimits] = None) -> Any:
+    """Cast any value to a primitive type, truncate it if limits are passed."""
+    if limits is not None:
+        return _BoundedNormalizer(limits).normalize(value)
+
+    value_type = type(value)
+    normalizer = _NORMALIZERS_CACHE.get(value_type)
+    if normalizer is None:
+        normalizer = _resolve_normalizer(value_type)
+    return normalizer(value)
+
+
+def _resolve_normalizer(value_type: type) -> Callable[[Any], Any]:
+    """Find how to normalize values of the type and cache the decision."""
+    normalizer = _find_registered_converter(value_type)
+
+    if normalizer is None:
+        normalizer = _BUILTIN_NORMALIZERS.get(value_type)
+
+    if normalizer is None:
+        if issubclass(value_type, type):
+            normalizer = str
+        elif issubclass(value_type, dict):
+            normalizer = _normalize_dict
+        elif issubclass(value_type, (list, set, frozenset, tuple)):
+            normalizer = _normalize_collection
+        elif issubclass(value_type, (bytes, bytearray)):
+            normalizer = _normalize_bytes
+        elif hasattr(value_type, 'get_log_id'):
+            normalizer = _call_get_log_id
+        else:
+            normalizer = _find_factory_converter(value_type) or _get_log_repr
+
+    _NORMALIZERS_CACHE[value_type] = normalizer
+    return normalizer
+
+
+def _find_registered_converter(value_type: type) -> Optional[Callable[[Any], Any]]:
+    for base in value_type.__mro__:
+        converter = LOG_REPR_REGISTRY.get(base)
+        if converter is not None:
+            return converter
+
+    for registered_type, converter in LOG_REPR_REGISTRY.items():  # noqa: WPS440
+        if issubclass(value_type, registered_type):
+            return converter
+
+    return None
+
+
+def _find_factory_converter(value_type: type) -> Optional[Callable[[Any], Any]]:
+    for factory in (*LOG_REPR_FACTORIES, *_BUILTIN_LOG_REPR_FACTORIES):
+        converter = factory(value_type)
+        if converter is not None:
+            return _Expander(converter)
+    return None
+
+
+def _normalize_dict(value: dict) -> dict:
+    return {k: normalize_for_log(v) for k, v in value.items()}
+
+
+def _normalize_collection(value: Any) -> Any:
+    return type(value)(normalize_for_log(i) for i in value)
+
+
+def _normalize_bytes(value: Any) -> Any:
+    return str(value) if len(value) <= MAX_BYTES_REPR_LENGTH else summarize_buffer(value)
+
+
+def _as_is(value: Any) -> Any:
+    return value
+
+
+class _Expander:
+    """Normalizer which converts value with a factory converter and normalizes the result like any other value."""
+
+    __slots__ = ('convert',)
+
+    def __init__(self, convert: Callable[[Any], Any]):
+        self.convert = convert
+
+    def __call__(self, value: Any) -> Any:
+        return self.expand(value, normalize_for_log)
+
+    def expand(self, value: Any, normalize: Callable[..., Any], *args: Any) -> Any:
+        """
+        Normalize converted value by `normalize(converted, *args)`.
+
+        Values which are already being expanded (e.g. a tree node referencing its parent) and values nested deeper
+        than `MAX_LOG_REPR_DEPTH` expanded values are represented by `object.__repr__` instead, as they would never
+        end otherwise.
+        """
+        expanding = _EXPANDING.get()
+        token = None
+        if expanding is None:
+            expanding = set()
+            token = _EXPANDING.set(expanding)
+
+        try:
+            value_id = id(value)
+            if value_id in expanding or len(expanding) >= MAX_LOG_REPR_DEPTH:
+                return normalize(object.__repr__(value), *args)
+
+            expanding.add(value_id)
+            try:
+                return normalize(self.convert(value), *args)
+            finally:
+                expanding.discard(value_id)
+        finally:
+            if token is not None:
+                _EXPANDING.reset(token)
+
+
+class _BoundedNormalizer:
+    """Normalizer which stops walking containers and copying values once capture limits are reached."""
+
+    __slots__ = ('limits', 'remaining')
+
+    def __init__(self, limits: CaptureLimits):
+        self.limits = limits
+        self.remaining = limits.max_size
+
+    def normalize(self, value: Any, depth: int = 0, hide_node: Optional['HideNode'] = None) -> Any:
+        """Cast value to a primitive type within limits, hide parts of it pointed by the hide tree node."""
+        if hide_node is not None and (hide_node.hidden or not isinstance(value, (dict, list, tuple))):
+            self._consume(len(HIDDEN_VALUE))
+            return HIDDEN_VALUE
+
+        value_type = type(value)
+        normalizer = _NORMALIZERS_CACHE.get(value_type)
+        if normalizer is None:
+            normalizer = _resolve_normalizer(value_type)
+
+        if hide_node is not None or normalizer is _normalize_dict or normalizer is _normalize_collection:
+            max_depth = self.limits.max_depth
+            if max_depth is not None and depth >= max_depth:
+                self._consume(1)
+                return f'<{value_type.__name__} of {len(value)} items>'
+
+            if isinstance(value, dict):
+                return self._normalize_dict(value, depth + 1, hide_node)
+            return value_type(self._normalize_items(value, depth + 1, hide_node))
+
+        if normalizer is _normalize_bytes:
+            return self._truncate(value, str)
+
+        if type(normalizer) is _Expander:
+            return normalizer.expand(value, self.normalize, depth)
+
+        result = normalizer(value)
+        if isinstance(result, str):
+            return self._truncate(result, _as_is)
+
+        self._consume(1)
+        return result
+
+    def _normalize_dict(self, value: dict, depth: int, hide_node: Optional['HideNode']) -> dict:
+        result = {}
+
+        max_items = self.limits.max_items
+        for i, (k, v) in enumerate(value.items()):
+            if self._is_exhausted() or (max_items is not None and i >= max_items):
+                result['...'] = f'<{len(value) - i} more items>'
+                break
+
+            self._consume(len(k) if isinstance(k, str) else 1)
+            result[k] = self.normalize(v, depth, None if hide_node is None else hide_node.get_child(k))
+
+        return result
+
+    def _normalize_items(self, value: Any, depth: int, hide_node: Optional['HideNode']) -> list:
+        result = []
+
+        length = len(value)
+        max_items = self.limits.max_items
+        for i, item in enumerate(value):
+            if self._is_exhausted() or (max_items is not None and i >= max_items):
+                result.append(f'<{length - i} more items>')
+                break
+
+            item_hide_node = None if hide_node is None else hide_node.get_item_child(i, length)
+            result.append(self.normalize(item, depth, item_hide_node))
+
+        return result
+
+    def _truncate(self, value: Any, cast: Callable[[Any], str]) -> str:
+        max_length = self.limits.max_length
+        if self.remaining is not None:
+            max_length = max(self.remaining, 0) if max_length is None else min(max_length, max(self.remaining, 0))
+
+        if max_length is None or len(value) <= max_length:
+            self._consume(len(value))
+            return cast(value)
+
+        self._consume(max_length)
+        return f'{cast(value[:max_length])}<{len(value) - max_length} more chars>'
+
+    def _consume(self, size: int) -> None:
+        if self.remaining is not None:
+            self.remaining -= size
+
+    def _is_exhausted(self) -> bool:
+        return self.remaining is not None and self.remaining <= 0
 
 
 def _get_log_repr(value: Any) -> Any:
-    """Cast value of complex type to a primitive type."""
-    if inspect.isclass(value):
-        return str(value)
+    """
+    Cast value of a type without known representation to a primitive type and cache how values of the type should be
+    represented: summarized if it supports buffer protocol, as is if the value is JSON serializable or with `str`
+    otherwise.
+    """
+    value_type = type(value)
 
-    has_log_id = hasattr(value, 'get_log_id')
-    if has_log_id:
-        return value.get_log_id()
+    if hasattr(value, 'get_log_id'):
+        # the method is not defined by the class (e.g. it is provided by `__getattr__`), so it is looked up per value
+        _NORMALIZERS_CACHE[value_type] = _get_dynamic_log_repr
+        return _call_get_log_id(value)
+
+    try:
+        memoryview(value).release()
+    except TypeError:
+        pass  # noqa: WPS420
+    else:
+        _NORMALIZERS_CACHE[value_type] = summarize_buffer
+        return summarize_buffer(value)
 
     try:
         ujson.dumps(value)
     except TypeError:
+        _NORMALIZERS_CACHE[value_type] = str
         return str(value)
 
+    _NORMALIZERS_CACHE[value_type] = _as_is
     return value
 
 
-def _hide_items(item: Any, item_name: str, hidden_params: Iterable) -> Any:
-    """Hide items according to configuration."""
-    if item_name in hidden_params:
-        return HIDDEN_VALUE
+def _get_dynamic_log_repr(value: Any) -> Any:
+    if hasattr(value, 'get_log_id'):
+        return _call_get_log_id(value)
 
-    hide_pointers = []
+    try:
+        ujson.dumps(value)
+    except TypeError:
+        return str(value)
+    return value
 
-    for i in hidden_params:
-        if re.match(item_name, i):
-            pointer = i.split('__')[1:]
-            if pointer not in hide_pointers:
-                hide_pointers.append(pointer)
 
-    if not hide_pointers:
-        return item
+def _call_get_log_id(value: Any) -> Any:
+    memo = _LOG_ID_MEMO.get()
+    if memo is None:
+        return value.get_log_id()
 
-    result = deepcopy(item)
-    for i in hide_pointers:
-        try:
-            result = _hide_items_impl(result, i)
-        except (KeyError, IndexError):
-            pass
+    # objects are memoized by id, weak reference ensures the id is not reused by another object
+    memoized = memo.get(id(value))
+    if memoized is not None and memoized[0]() is value:
+        return memoized[1]
 
-    return result
+    log_id = value.get_log_id()
+    try:
+        memo[id(value)] = (weakref.ref(value), log_id)
+    except TypeError:  # objects which don't support weak references are not memoized
+        pass  # noqa: WPS420
+    return log_id
+
+
+def dataclass_log_repr(value_type: type) -> Optional[Callable[[Any], Any]]:
+    """
+    Factory representing dataclasses as dicts of their fields shown by their `repr`, it is not registered by default
+    (dataclasses are represented with `str`), enable it with `register_log_repr_factory(dataclass_log_repr)`.
+    """
+    if not dataclasses.is_dataclass(value_type):
+        return None
+
+    names = tuple(i.name for i in dataclasses.fields(value_type) if i.repr)
 
+    def _convert(value: Any) -> dict:
+        return {i: getattr(value, i) for i in names}
 
-def _hide_items_impl(item: Any, pointers: List | Tuple):
-    pointer = pointers[0]
-    if isinstance(item, list):
-        pointer = int(pointer)
+    return _convert
+
+
+def pydantic_log_repr(value_type: type) -> Optional[Callable[[Any], Any]]:
+    """
+    Factory representing pydantic models as dicts of their fields, pydantic is not imported to check it. It is not
+    registered by default (models are represented with `str`), enable it with
+    `register_log_repr_factory(pydantic_log_repr)`.
+    """
+    if not any(i.__module__.partition('.')[0] == 'pydantic' for i in value_type.__mro__[:-1]):
+        return None
+    if hasattr(value_type, 'model_dump'):
+        return lambda value: value.model_dump()
+    if hasattr(value_type, 'dict'):
+        return lambda value: value.dict()
+    return None
+
+
+def _numpy_log_repr(value_type: type) -> Optional[Callable[[Any], Any]]:
+    """Represent numpy scalars as Python scalars and summarize arrays, numpy is not imported to check it."""
+    numpy = sys.modules.get('numpy')
+    if numpy is None:
+        return None
+    if issubclass(value_type, numpy.generic):
+        return lambda value: value.item()
+    if issubclass(value_type, numpy.ndarray):
+        return summarize_array
+    return None
+
+
+def summarize_array(value: Any, preview_items: int = ARRAY_PREVIEW_ITEMS, stats: bool = False) -> dict[str, Any]:
+    """
+    Return summary of numpy array: type name, `dtype`, `shape`, `nbytes` and `head` and `tail` with first and last
+    `preview_items` items of the flattened array (or `head` with all items of small arrays).
 
-    if isinstance(item[pointer], (dict, list)) and len(pointers) > 1:
-        item[pointer] = _hide_items_impl(item[pointer], pointers[1:])
+    With `stats` `min`, `max` and `mean` of numeric arrays (NaNs are skipped) and `nan_count` of float arrays are
+    added, they are computed with vectorized numpy reductions. The array is never copied, only previewed items are.
+    """
+    summary = {
+        'type': type(value).__name__,
+        'dtype': str(value.dtype),
+        'shape': list(value.shape),
+        'nbytes': int(value.nbytes),
+    }
+    summary.update(_get_preview(value.flat, int(value.size), preview_items, _get_array_items))
+    if stats:
+        summary.update(_get_array_stats(value))
+    return summary
+
+
+def summarize_buffer(value: Any, preview_items: int = ARRAY_PREVIEW_ITEMS) -> dict[str, Any]:
+    """
+    Return summary of object supporting buffer protocol (`bytes`, `bytearray`, `memoryview`, `array.array`, `mmap`
+    etc.): type name, struct `format` of items, `shape`, `nbytes` and `head` and `tail` with first and last
+    `preview_items` items of one-dimensional buffers (or `head` with all items of small ones). The buffer is not copied.
+    """
+    with memoryview(value) as view:
+        summary = {
+            'type': type(value).__name__,
+            'format': view.format,
+            'shape': list(view.shape),
+            'nbytes': view.nbytes,
+        }
+        if view.ndim == 1:
+            try:
+                summary.update(_get_preview(view, len(view), preview_items, _get_buffer_items))
+            except NotImplementedError:  # `tolist` doesn't support some formats
+                pass  # noqa: WPS420
+    return summary
+
+
+def _get_preview(items: Any, length: int, preview_items: int, convert: Callable[[Any], Any]) -> dict[str, Any]:
+    if length <= preview_items * 2:
+        return {'head': convert(items[:length])}
+    return {'head': convert(items[:preview_items]), 'tail': convert(items[length - preview_items:length])}
+
+
+def _get_array_items(items: Any) -> list:
+    return normalize_for_log(items.tolist())
+
+
+def _get_buffer_items(items: memoryview) -> Any:
+    if items.format in {'B', 'c'}:
+        return str(items.tobytes())
+    return normalize_for_log(items.tolist())
+
+
+def _get_array_stats(value: Any) -> dict[str, Any]:
+    numpy = sys.modules['numpy']
+
+    kind = value.dtype.kind
+    if kind not in {'b', 'i', 'u', 'f'} or not value.size:
+        return {}
+
+    stats = {}
+    where = True
+    if kind == 'f':
+        # the mask is the only temporary array, it is inverted in place to select values which are not NaN
+        mask = numpy.isnan(value)
+        stats['nan_count'] = int(numpy.count_nonzero(mask))
+        if stats['nan_count'] == value.size:
+            return stats
+        if stats['nan_count']:
+            where = numpy.logical_not(mask, out=mask)
+
+    if where is True:
+        minimum, maximum, mean = value.min(), value.max(), value.mean()
     else:
-        item[pointer] = HIDDEN_VALUE
+        minimum = value.min(where=where, initial=numpy.inf)
+        maximum = value.max(where=where, initial=-numpy.inf)
+        mean = value.mean(where=where)
+
+    stats.update(min=normalize_for_log(minimum.item()), max=normalize_for_log(maximum.item()), mean=float(mean))
+    return stats
+
+
+_BUILTIN_NORMALIZERS = {  # noqa: WPS407
+    type(None): str,
+    bool: str,
+    str: _as_is,
+    int: _as_is,
+    float: _as_is,
+    bytes: _normalize_bytes,
+    bytearray: _normalize_bytes,
+    memoryview: summarize_buffer,
+    dict: _normalize_dict,
+    list: _normalize_collection,
+    tuple: _normalize_collection,
+    set: _normalize_collection,
+    frozenset: _normalize_collection,
+}
+
+_NORMALIZERS_CACHE = {}  # noqa: WPS407
+
+_BUILTIN_SHAPE_DESCRIBERS = {  # noqa: WPS407
+    type(None): _describe_type,
+    bool: _describe_type,
+    int: _describe_type,
+    float: _describe_type,
+    str: _describe_sized,
+    bytes: _describe_sized,
+    bytearray: _describe_sized,
+    memoryview: _describe_memoryview,
+    dict: _describe_dict,
+    list: _describe_sized,
+    tuple: _describe_sized,
+    set: _describe_sized,
+    frozenset: _describe_sized,
+}
+
+_SHAPE_DESCRIBERS_CACHE = {}  # noqa: WPS407
+
+_SNAPSHOT_COPIERS = {  # noqa: WPS407
+    list: list.copy,
+    dict: dict.copy,
+    set: set.copy,
+    bytearray: bytearray.copy,
+}
+
+_BUILTIN_LOG_REPR_FACTORIES = (_numpy_log_repr,)
+
+_LOG_ID_MEMO = ContextVar('log_id_memo', default=None)
+
+_EXPANDING = ContextVar('expanding', default=None)
+
+
+def compile_hidden_params(hidden_params: Iterable) -> Optional['HideNode']:
+    """
+    Compile `hidden_params` into a tree keyed by argument name and then by `__` separated path segments.
+
+    `*` segment matches any key or index on its level. Returns `None` if there is nothing to hide.
+    """
+    root = None
+
+    for param in hidden_params:
+        if root is None:
+            root = HideNode()
+        root.add(param.split('__'))
+
+    return root
+
+
+class HideNode:
+    """Node of compiled `hidden_params` tree, node is hidden itself or has children which should be hidden."""
+
+    __slots__ = ('hidden', 'children', 'wildcard', '_merged')
+
+    def __init__(self):
+        self.hidden = False
+        self.children = {}
+        self.wildcard = None
+        self._merged = {}
+
+    def add(self, segments: list[str]) -> None:
+        """Add path to hide to the tree."""
+        node = self
+        for segment in segments:
+            if segment == '*':
+                if node.wildcard is None:
+                    node.wildcard = HideNode()
+                node = node.wildcard
+            else:
+                node = node.children.setdefault(segment, HideNode())
+        node.hidden = True
+
+    def get_child(self, key: Any) -> Optional['HideNode']:
+        """Return node for dict key or argument name, exact and wildcard matches are merged."""
+        if not self.children:
+            return self.wildcard
+
+        if not isinstance(key, str):
+            key = str(key)
+
+        child = self.children.get(key)
+        if child is None or self.wildcard is None:
+            return child or self.wildcard
+
+        merged = self._merged.get(key)
+        if merged is None:
+            merged = child.merge(self.wildcard)
+            self._merged[key] = merged
+        return merged
+
+    def get_item_child(self, index: int, length: int) -> Optional['HideNode']:
+        """Return node for sequence item, negative indexes are supported."""
+        if not self.children:
+            return self.wildcard
+
+        key = str(index)
+        if key not in self.children:
+            key = str(index - length)
+        return self.get_child(key)
+
+    def merge(self, other: 'HideNode') -> 'HideNode':
+        """Return new node which hides everything hidden by any of the nodes."""
+        node = HideNode()
+        node.hidden = self.hidden or other.hidden
+
+        for key in self.children.keys() | other.children.keys():
+            own, others = self.children.get(key), other.children.get(key)
+            node.children[key] = own.merge(others) if own and others else own or others
+
+        if self.wildcard and other.wildcard:
+            node.wildcard = self.wildcard.merge(other.wildcard)
+        else:
+            node.wildcard = self.wildcard or other.wildcard
+
+        return node
+
+
+def _normalize_redacted(value: Any, hide_node: HideNode) -> Any:
+    """Cast value to a primitive type hiding parts of it pointed by the hide tree node in the same pass."""
+    if hide_node.hidden:
+        return HIDDEN_VALUE
+
+    if isinstance(value, dict):
+        result = {}
+        for k, v in value.items():
+            child = hide_node.get_child(k)
+            result[k] = normalize_for_log(v) if child is None else _normalize_redacted(v, child)
+        return result
+
+    if isinstance(value, (list, tuple)):
+        length = len(value)
+        result = []
+        for i, item in enumerate(value):
+            child = hide_node.get_item_child(i, length)
+            result.append(normalize_for_log(item) if child is None else _normalize_redacted(item, child))
+        return type(value)(result)
 
-    return item
+    # path continues into a value which can't be addressed by it, hide it as a whole to be on the safe side
+    return HIDDEN_VALUE
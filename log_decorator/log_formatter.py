@@ -1,19 +1,27 @@
 import logging
-from typing import Optional, Iterable
+from typing import Any, Callable, Optional, Iterable
 from enum import Enum
 
 import ujson
 
+from .encoders import BoundedWriter, LimitReached, encode_json, may_fit, write_json, write_repr, write_str
+
 DEFAULT_MAX_LOG_LENGTH = 32000
 
 DEFAULT_SEPARATOR = f'\n\n{"=" * 50}\n\n'
 
+_MISSING = object()
+
+# prefixes of fields are cached per key name, the cache is bounded in case of records with arbitrary attribute names
+_MAX_CACHED_PREFIXES = 1024
+
 
 class FormatterMode(str, Enum):
     """Available formatter modes."""
 
     COMPACT = 'compact'
     VERBOSE = 'verbose'
+    JSON = 'json'
 
 
 class LogFormatter(logging.Formatter):
@@ -25,6 +33,7 @@ class LogFormatter(logging.Formatter):
         limit_keys_to: Optional[Iterable] = ('input_data', 'result'),
         max_length: Optional[int] = DEFAULT_MAX_LOG_LENGTH,
         separator: str = DEFAULT_SEPARATOR,
+        rename_keys: Optional[dict[str, str]] = None,
         **kwargs,
     ):
         super(LogFormatter, self).__init__(**kwargs)  # noqa: WPS608
@@ -32,54 +41,285 @@ class LogFormatter(logging.Formatter):
         available_formatters = {
             FormatterMode.COMPACT: self.compact_formatter,
             FormatterMode.VERBOSE: self.verbose_formatter,
+            FormatterMode.JSON: self.json_formatter,
         }
         self.selected_formatter = available_formatters.get(formatter_mode)
         if self.selected_formatter is None:
             raise Exception(f'Formatter {formatter_mode} is unavailable')  # noqa: WPS454
 
-        self.limit_keys_to = limit_keys_to
+        self.limit_keys_to = None
+        self._keys = None
+        if limit_keys_to is not None:
+            # sets have no order, so their keys are sorted to write fields in the same order in all processes
+            keys = sorted(limit_keys_to) if isinstance(limit_keys_to, (set, frozenset)) else limit_keys_to
+            self._keys = tuple(dict.fromkeys(keys))
+            self.limit_keys_to = frozenset(self._keys)
+
+        self.rename_keys = rename_keys or {}
         self.max_length = max_length
         self.separator = separator
+        self._prefixes = {_compact_prefix: {}, _verbose_title: {}, _json_prefix: {}}
+
+        # the message is the only field of the default format, so `logging.Formatter.format` can be skipped
+        self._message_only = (
+            self._style._fmt == self._style.default_format  # noqa: WPS437
+            and type(self).formatMessage is logging.Formatter.formatMessage
+        )
 
     def format(self, record: logging.LogRecord) -> str:
         """Converts log record to readable string."""
         return self.selected_formatter(record)  # noqa
 
     def compact_formatter(self, record: logging.LogRecord) -> str:
-        """Converts log record to single-line compact readable string for console output."""
-        formatted = super(LogFormatter, self).format(record)  # noqa: WPS608
+        """
+        Converts log record to single-line compact readable string for console output.
 
-        record_data = record.__dict__
-        extra = {}
-        for i, j in record_data.items():
-            if (self.limit_keys_to is None) or (i in self.limit_keys_to):
-                extra[i] = j
+        Values are encoded with `repr` in a single pass, if the record exceeds `max_length` each value is truncated to
+        its share of the length, encoding of each value is stopped once it can't fit anyway.
+        """
+        if self._message_only and not (record.exc_info or record.exc_text or record.stack_info):
+            record.message = record.getMessage()
+            formatted = record.message
+        else:
+            formatted = super(LogFormatter, self).format(record)  # noqa: WPS608
+
+        keys, values = self._get_fields(record.__dict__)
+        prefixes = self._get_prefixes(keys, _compact_prefix)
+        # fields are separated by `, ` inside of ` {...}` after the message
+        fixed_length = len(formatted) + sum(map(len, prefixes)) + max(len(keys) * 2 - 2, 0) + 3
 
-        return self._strip_message_if_needed(f'{formatted} {extra}')
+        texts = self._encode_fields(values, write_repr, repr, fixed_length)
+
+        message = ''.join([formatted, ' {', ', '.join([i + j for i, j in zip(prefixes, texts)]), '}'])
+        return self._strip_message_if_needed(message)
 
     def verbose_formatter(self, record: logging.LogRecord) -> str:
-        """Converts log record to multi-line verbose readable string for log storage."""
+        """
+        Converts log record to multi-line verbose readable string for log storage.
+
+        Values are encoded to JSON in a single pass, values which are not JSON serializable are written as strings.
+        If the record exceeds `max_length` each value is truncated to its share of the length, encoding of each value
+        is stopped once it can't fit anyway. Values are encoded as they were normalized by the decorator, the record
+        keeps them structured for other handlers.
+        """
         record_data = record.__dict__
 
-        result = record_data.get('msg', '')
-        result += '\n' * 2
+        keys, values = self._get_fields(record_data)
+        headers = [f'{self.separator}{i}:\n' for i in self._get_prefixes(keys, _verbose_title)]
+        opening = f'{record_data.get("msg", "")}\n\n'
+        closing = f'{self.separator}'
 
-        for i, j in record_data.items():
-            if (self.limit_keys_to is not None) and (i not in self.limit_keys_to):
-                continue
+        texts = self._encode_fields(
+            values,
+            _write_verbose_value,
+            _dump_verbose_value,
+            len(opening) + len(closing) + sum(map(len, headers)),
+        )
 
-            try:
-                prepared_value = ujson.dumps(j, indent=2, ensure_ascii=False)
-            except TypeError:
-                prepared_value = j
+        message = ''.join([opening, *(i + j for i, j in zip(headers, texts)), closing])
+        return self._strip_message_if_needed(message)
+
+    def json_formatter(self, record: logging.LogRecord) -> str:
+        """
+        Converts log record to single-line JSON object for machine ingestion.
+
+        The object starts with `timestamp`, `level`, `logger` and `message` fields followed by the record fields
+        (e.g. `call_id`, `function`, `input_data`, `result`, `execution_time_ms` according to `limit_keys_to`) and
+        `exception_type` and `exception` fields for records with exception info. Sets are written as arrays, values
+        which are not JSON serializable are written as strings (only the values, not containers holding them). If the
+        record exceeds `max_length` each value is truncated to its share of the length and replaced with a string of
+        its beginning, so the line is always valid JSON. The message is truncated too if values don't fit otherwise,
+        only the record header and field names are never truncated.
+        """
+        record_data = record.__dict__
+
+        keys, values = self._get_fields(record_data)
+        if 'message' in keys:
+            # set by other formatters, it is the same as the `message` field
+            position = keys.index('message')
+            del keys[position], values[position]  # noqa: WPS420
+        if record.exc_info and record.exc_info[0] is not None:
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+            keys.extend(('exception_type', 'exception'))
+            values.extend((record.exc_info[0].__name__, record.exc_text))
+
+        header = ujson.dumps(
+            {'timestamp': record.created, 'level': record.levelname, 'logger': record.name},
+            ensure_ascii=False,
+        )[:-1]
+        message = ujson.dumps(record.getMessage(), ensure_ascii=False)
+        prefixes = self._get_prefixes(keys, _json_prefix)
+        fixed_length = len(header) + len(',"message":') + sum(map(len, prefixes)) + 1
+
+        texts = self._encode_fields(
+            values,
+            _write_json_value,
+            _dump_json_value,
+            fixed_length + len(message),
+            truncate=_truncate_json,
+        )
+
+        if self.max_length is not None:
+            line_length = fixed_length + len(message) + sum(map(len, texts))
+            if line_length > self.max_length:
+                # values are truncated to `"..."` at most, the rest of the excess is cut from the message
+                message = _truncate_json(message, max(len(message) - line_length + self.max_length, len('"..."')))
+
+        opening = f'{header},"message":{message}'
+        return ''.join([opening, *(i + j for i, j in zip(prefixes, texts)), '}'])
+
+    def _get_fields(self, record_data: dict) -> tuple[list, list]:
+        """Return names and values of record fields to be written, names are renamed according to `rename_keys`."""
+        if self._keys is None:
+            keys = list(record_data)
+            values = list(record_data.values())
+        else:
+            keys = []
+            values = []
+            for key in self._keys:
+                value = record_data.get(key, _MISSING)
+                if value is not _MISSING:
+                    keys.append(key)
+                    values.append(value)
 
-            result += f'{self.separator}{str(i).upper().replace("_", " ")}:\n{prepared_value}'
+        if self.rename_keys:
+            keys = [self.rename_keys.get(i, i) for i in keys]
+        return keys, values
 
-        result += self.separator
+    def _get_prefixes(self, keys: list, build: Callable[[Any], str]) -> list:
+        """Return prefixes of fields built by `build` from their names, prefixes are cached per name."""
+        cache = self._prefixes[build]
+        try:
+            return [cache[i] for i in keys]
+        except KeyError:
+            prefixes = [build(i) for i in keys]
+            if len(cache) < _MAX_CACHED_PREFIXES:
+                cache.update(zip(keys, prefixes))
+            return prefixes
+
+    def _encode_fields(
+        self,
+        values: list,
+        encode: Callable[[BoundedWriter, Any], None],
+        dump: Callable[[Any], str],
+        fixed_length: int,
+        truncate: Optional[Callable[[str, int], str]] = None,
+    ) -> list:
+        """
+        Encode values so that the message with them fits into `max_length`.
+
+        If values may fit (checked by `may_fit`) they are encoded by `dump` at once, which is the common case of small
+        records. Otherwise each value is encoded by `encode` only until it exceeds the length available for all values,
+        so the cost is bounded by `max_length` regardless of values size. If values don't fit together, the available
+        length is shared between them: values shorter than the equal share are kept as is, the rest is divided between
+        longer ones.
+        """
+        if self.max_length is None:
+            return [dump(i) for i in values]
+
+        available = max(self.max_length - fixed_length, 0)
+        # values are probed together, so the estimate is of the total length and costs a single probe
+        if may_fit(values, available):
+            texts = [dump(i) for i in values]
+            if sum(map(len, texts)) <= available:
+                return texts
+
+        texts = []
+        for value in values:
+            writer = BoundedWriter(available)
+            try:
+                encode(writer, value)
+            except LimitReached:
+                pass  # noqa: WPS420
+            texts.append(writer.getvalue())
 
-        return self._strip_message_if_needed(result)
+        if sum(map(len, texts)) <= available:
+            return texts
+
+        lengths = _share_length([len(i) for i in texts], available)
+        return [(truncate or _truncate)(i, j) for i, j in zip(texts, lengths)]
 
     def _strip_message_if_needed(self, message):
         if self.max_length is not None and len(message) > self.max_length:
             return f'{message[:self.max_length-3]}...'
         return message
+
+
+def _write_verbose_value(writer: BoundedWriter, value: Any) -> None:
+    try:
+        write_json(writer, value, indent=2)
+    except TypeError:
+        writer.rollback((0, 0))
+        write_str(writer, value)
+
+
+def _compact_prefix(key: Any) -> str:
+    return f'{key!r}: '
+
+
+def _verbose_title(key: Any) -> str:
+    return str(key).upper().replace('_', ' ')
+
+
+def _json_prefix(key: Any) -> str:
+    return f',{ujson.dumps(str(key), ensure_ascii=False)}:'
+
+
+def _dump_verbose_value(value: Any) -> str:
+    try:
+        return ujson.dumps(value, ensure_ascii=False, indent=2)
+    except TypeError:
+        return str(value)
+
+
+def _dump_json_value(value: Any) -> str:
+    try:
+        return ujson.dumps(value, ensure_ascii=False)
+    except TypeError:
+        return encode_json(value, lenient=True)
+
+
+def _write_json_value(writer: BoundedWriter, value: Any) -> None:
+    write_json(writer, value, lenient=True)
+
+
+def _share_length(lengths: list[int], available: int) -> list[int]:
+    """Divide available length between items, items shorter than their equal share get their whole length."""
+    shares = [0] * len(lengths)
+    for position, i in enumerate(sorted(range(len(lengths)), key=lengths.__getitem__)):
+        shares[i] = min(lengths[i], available // (len(lengths) - position))
+        available -= shares[i]
+    return shares
+
+
+def _truncate(text: str, length: int) -> str:
+    if len(text) <= length:
+        return text
+    if length < 3:
+        return '...'[:length]
+    return f'{text[:length - 3]}...'
+
+
+def _truncate_json(text: str, length: int) -> str:
+    """Replace encoded value which is longer than `length` with JSON string of its beginning ending with `...`."""
+    if len(text) <= length:
+        return text
+
+    if text.startswith('"'):
+        # the string is cut as is, positions inside of escape sequences are skipped
+        for end in range(max(length - 4, 1), max(length - 10, 0), -1):
+            truncated = f'{text[:end]}..."'
+            try:
+                ujson.loads(truncated)
+            except ValueError:
+                continue
+            return truncated
+
+    cut = length - 5
+    while True:
+        truncated = ujson.dumps(f'{text[:max(cut, 0)]}...', ensure_ascii=False)
+        if len(truncated) <= length or cut <= 0:
+            return truncated
+        # escaping makes the string longer than the cut text, so the cut is shortened by the excess
+        cut -= len(truncated) - length
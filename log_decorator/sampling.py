@@ -0,0 +1,185 @@
+import itertools
+import random
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
+from typing import Optional
+
+
+class CallCounter:
+    """
+    Thread-safe calls counter without locks on the hot path.
+
+    Calls are numbered by a process-wide `itertools.count` (its `next` is atomic), so samplers see the number of the
+    call among calls of all threads. The total is kept in per-thread shards which don't contend with each other,
+    `value` is the sum of all shards. Shards of finished threads are merged into a retired total, so the counter
+    doesn't grow with the number of threads which ever called the function.
+    """
+
+    __slots__ = ('_numbers', '_shards', '_retired', '_local', '_lock')
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.reset()
+
+    def increment(self) -> int:
+        """Count a call and return its number among calls of all threads."""
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._add_shard()
+
+        shard[0] += 1
+        return next(self._numbers)
+
+    @property
+    def value(self) -> int:
+        """Total number of counted calls in all threads."""
+        with self._lock:
+            return self._retired[0] + sum(shard[0] for shard in self._shards)
+
+    def reset(self) -> None:
+        """Start counting from zero in all threads."""
+        with self._lock:
+            self._numbers = itertools.count(1)
+            self._shards = []
+            self._retired = [0]
+            self._local = threading.local()
+
+    def _add_shard(self) -> list:
+        shard = [0]
+        # the owner lives in the thread-local storage only, so it is collected when the thread finishes
+        owner = _ShardOwner(shard)
+        with self._lock:
+            self._local.shard = shard
+            self._local.owner = owner
+            self._shards.append(shard)
+            weakref.finalize(owner, _retire_shard, self._lock, self._shards, self._retired, shard)
+        return shard
+
+
+class _ShardOwner:
+    __slots__ = ('shard', '__weakref__')
+
+    def __init__(self, shard: list):
+        self.shard = shard
+
+
+def _retire_shard(lock: threading.RLock, shards: list, retired: list, shard: list) -> None:
+    with lock:
+        retired[0] += shard[0]
+        shards.remove(shard)
+
+
+class Sampler(ABC):
+    """
+    Base class for samplers which decide which calls of a decorated function should be logged.
+
+    Each decorated function gets its own sampler created by `clone`, so samplers state is never shared between
+    functions. Errors are logged regardless of samplers decisions.
+    """
+
+    @abstractmethod
+    def clone(self) -> 'Sampler':
+        """Return sampler with the same configuration and fresh state."""
+
+    @abstractmethod
+    def should_sample(self, call_number: int) -> bool:
+        """Decide if the call should be logged, `call_number` is the number of the call among all threads."""
+
+
+class FrequencySampler(Sampler):
+    """Log each `frequency` call, this sampler is used when `frequency` is passed to log decorators."""
+
+    def __init__(self, frequency: int):
+        self.frequency = frequency
+
+    def clone(self) -> 'FrequencySampler':
+        """Return sampler with the same configuration."""
+        return FrequencySampler(self.frequency)
+
+    def should_sample(self, call_number: int) -> bool:
+        """Log each `frequency` call."""
+        return call_number % self.frequency == 0
+
+
+class ProbabilitySampler(Sampler):
+    """Log calls randomly with the given probability, it doesn't alias with periodic traffic patterns."""
+
+    def __init__(self, probability: float):
+        self.probability = probability
+
+    def clone(self) -> 'ProbabilitySampler':
+        """Return sampler with the same configuration."""
+        return ProbabilitySampler(self.probability)
+
+    def should_sample(self, call_number: int) -> bool:
+        """Log call with the configured probability."""
+        return random.random() < self.probability
+
+
+class RateLimitSampler(Sampler):
+    """Log at most `records_per_second` calls per second on average allowing bursts up to `burst` calls."""
+
+    def __init__(self, records_per_second: float, burst: Optional[float] = None):
+        self.records_per_second = records_per_second
+        self.burst = max(records_per_second, 1) if burst is None else burst
+
+        self._tokens = self.burst
+        self._last_time = time.monotonic()
+        self._lock = threading.Lock()
+
+    def clone(self) -> 'RateLimitSampler':
+        """Return sampler with the same configuration and full bucket."""
+        return RateLimitSampler(self.records_per_second, self.burst)
+
+    def should_sample(self, call_number: int) -> bool:
+        """Take a token from the bucket if there is one."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last_time) * self.records_per_second)
+            self._last_time = now
+
+            if self._tokens < 1:
+                return False
+
+            self._tokens -= 1
+            return True
+
+
+class AdaptiveSampler(Sampler):
+    """
+    Log calls with a probability adjusted to keep `target_per_second` records per second.
+
+    Calls rate is measured over `window` seconds and the probability for the next window is calculated from it, so
+    all calls are logged under low load and logs volume stays around the target during traffic spikes.
+    """
+
+    def __init__(self, target_per_second: float, window: float = 1.0):
+        self.target_per_second = target_per_second
+        self.window = window
+
+        self.probability = 1.0
+        self._window_start = time.monotonic()
+        self._window_calls = 0
+        self._lock = threading.Lock()
+
+    def clone(self) -> 'AdaptiveSampler':
+        """Return sampler with the same configuration and fresh statistics."""
+        return AdaptiveSampler(self.target_per_second, self.window)
+
+    def should_sample(self, call_number: int) -> bool:
+        """Log call with probability calculated during the previous window."""
+        with self._lock:
+            self._window_calls += 1
+
+            now = time.monotonic()
+            elapsed = now - self._window_start
+            if elapsed >= self.window:
+                calls_per_second = self._window_calls / elapsed
+                self.probability = min(1.0, self.target_per_second / calls_per_second)
+                self._window_start = now
+                self._window_calls = 0
+
+        return self.probability >= 1 or random.random() < self.probability
@@ -0,0 +1,184 @@
+import threading
+import time
+from enum import Enum
+from typing import Any, Optional
+
+NS_IN_UNIT = {  # noqa: WPS407
+    'ns': 1,
+    'us': 1000,
+    'ms': 1000000,
+}
+
+SUB_BUCKETS_BITS = 3
+
+SUB_BUCKETS = 1 << SUB_BUCKETS_BITS
+
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+
+class TimeUnit(str, Enum):
+    """Available execution time units."""
+
+    NS = 'ns'
+    US = 'us'
+    MS = 'ms'
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram.
+
+    Each power of two range of nanoseconds is split into 8 linear buckets, so values are stored with relative error
+    below 12.5% and memory doesn't depend on the number of recorded values.
+    """
+
+    __slots__ = ('buckets', 'count')
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+
+    def record(self, value_ns: int) -> None:
+        """Add value to the histogram."""
+        index = self.get_bucket_index(value_ns)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+
+    def percentile(self, percent: float) -> int:
+        """Return upper bound of the bucket containing the percentile in nanoseconds, 0 if nothing is recorded."""
+        threshold = self.count * percent / 100
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= threshold:
+                return self.get_bucket_upper_bound(index)
+        return 0
+
+    @staticmethod
+    def get_bucket_index(value_ns: int) -> int:
+        """Return index of the bucket for the value."""
+        if value_ns < SUB_BUCKETS:
+            return max(value_ns, 0)
+
+        shift = value_ns.bit_length() - SUB_BUCKETS_BITS - 1
+        return shift * SUB_BUCKETS + (value_ns >> shift)
+
+    @staticmethod
+    def get_bucket_upper_bound(index: int) -> int:
+        """Return the biggest value which falls into the bucket."""
+        if index < SUB_BUCKETS * 2:
+            return index
+
+        shift = index // SUB_BUCKETS - 1
+        return ((index % SUB_BUCKETS + SUB_BUCKETS + 1) << shift) - 1
+
+
+class CallStats:
+    """Thread-safe statistics of calls of a single function: calls and errors counts and latency histogram."""
+
+    def __init__(self, function: str):
+        self.function = function
+        self._lock = threading.Lock()
+        self._reset()
+
+    def record(self, elapsed_ns: Optional[int]) -> None:
+        """Record call, `None` means that the call failed, time of failed calls isn't added to the histogram."""
+        with self._lock:
+            self.count += 1
+
+            if elapsed_ns is None:
+                self.errors += 1
+                return
+
+            self.total_ns += elapsed_ns
+            self.min_ns = elapsed_ns if self.min_ns is None else min(self.min_ns, elapsed_ns)
+            self.max_ns = elapsed_ns if self.max_ns is None else max(self.max_ns, elapsed_ns)
+            self.histogram.record(elapsed_ns)
+
+    def snapshot(self, unit: TimeUnit = TimeUnit.MS, percentiles: tuple = DEFAULT_PERCENTILES) -> dict[str, Any]:
+        """Return statistics of the function, times are converted to the unit and the unit is added to keys."""
+        with self._lock:
+            return self._snapshot(unit, percentiles)
+
+    def reset(self) -> None:
+        """Start collecting statistics from scratch."""
+        with self._lock:
+            self._reset()
+
+    def pop_summary(
+        self,
+        interval: float,
+        unit: TimeUnit = TimeUnit.MS,
+        percentiles: tuple = DEFAULT_PERCENTILES,
+    ) -> Optional[dict[str, Any]]:
+        """Return snapshot and reset statistics if `interval` seconds passed since the previous reset."""
+        if time.monotonic() - self.started_at < interval:
+            return None
+
+        with self._lock:
+            if time.monotonic() - self.started_at < interval:
+                return None
+
+            summary = self._snapshot(unit, percentiles)
+            self._reset()
+            return summary
+
+    def _snapshot(self, unit: TimeUnit, percentiles: tuple) -> dict[str, Any]:
+        unit = TimeUnit(unit)
+        ns_in_unit = NS_IN_UNIT[unit.value]
+        successful = self.count - self.errors
+
+        snapshot = {
+            'count': self.count,
+            'errors': self.errors,
+            'period_s': time.monotonic() - self.started_at,
+            f'mean_{unit.value}': self.total_ns / successful / ns_in_unit if successful else None,
+            f'min_{unit.value}': None if self.min_ns is None else self.min_ns / ns_in_unit,
+            f'max_{unit.value}': None if self.max_ns is None else self.max_ns / ns_in_unit,
+        }
+        for percent in percentiles:
+            value_ns = min(self.histogram.percentile(percent), self.max_ns or 0)
+            snapshot[f'p{percent}_{unit.value}'] = value_ns / ns_in_unit if successful else None
+
+        return snapshot
+
+    def _reset(self) -> None:
+        self.count = 0
+        self.errors = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = None
+        self.histogram = LatencyHistogram()
+        self.started_at = time.monotonic()
+
+
+class StatsRegistry:
+    """Registry of calls statistics of decorated functions, functions with the same name share statistics."""
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def get_stats(self, function: str) -> CallStats:
+        """Return statistics of the function, create them if needed."""
+        stats = self._stats.get(function)
+        if stats is None:
+            with self._lock:
+                stats = self._stats.setdefault(function, CallStats(function))
+        return stats
+
+    def snapshot(
+        self,
+        unit: TimeUnit = TimeUnit.MS,
+        percentiles: tuple = DEFAULT_PERCENTILES,
+    ) -> dict[str, dict[str, Any]]:
+        """Return statistics of all functions by their names."""
+        return {function: stats.snapshot(unit, percentiles) for function, stats in list(self._stats.items())}
+
+    def reset(self) -> None:
+        """Reset statistics of all functions."""
+        for stats in list(self._stats.values()):
+            stats.reset()
+
+
+STATS_REGISTRY = StatsRegistry()
@@ -2,7 +2,7 @@ import logging
 import unittest
 from unittest.mock import ANY, AsyncMock, MagicMock
 
-from log_decorator import async_log, log
+from log_decorator import async_log, emitters, log, sampling
 
 
 class TestAsyncLog(unittest.IsolatedAsyncioTestCase):
@@ -82,7 +82,18 @@ class TestAsyncLog(unittest.IsolatedAsyncioTestCase):
             except TestException:  # noqa
                 pass
 
-        self.logger_inst_mock.exception.assert_called_once_with(
+        self.logger_inst_mock.log.assert_called_once_with(
+            level=logging.INFO,
+            msg=f'call {test_func_name}',
+            extra={
+                'call_id': ANY,
+                'function': test_func_name,
+                'input_data': {},
+            },
+        )
+
+        self.assertEqual(self.logger_inst_mock.exception.call_count, 2)
+        self.logger_inst_mock.exception.assert_called_with(
             msg=f'error in {test_func_name}',
             extra={
                 'call_id': ANY,
@@ -196,3 +207,212 @@ class TestAsyncLog(unittest.IsolatedAsyncioTestCase):
                 'input_data': {},
             },
         )
+
+    async def test_log_lazy_capture(self):
+        test_func_name = 'log_decorator.tests.test_async_log.TestAsyncLog.test_log_lazy_capture.<locals>.test'
+
+        self.logger_inst_mock.isEnabledFor.return_value = False
+
+        @async_log.log(self.logger_inst_mock, lazy_capture=True)
+        async def test(arg):
+            if arg:
+                raise ValueError()
+            return arg
+
+        self.assertEqual(await test(0), 0)
+        self.logger_inst_mock.log.assert_not_called()
+
+        with self.assertRaises(ValueError):
+            await test(1)
+
+        self.logger_inst_mock.exception.assert_called_once_with(
+            msg=f'error in {test_func_name}',
+            extra={
+                'call_id': ANY,
+                'function': test_func_name,
+                'input_data': {'arg': 1},
+            },
+        )
+
+    async def test_log_collect_stats(self):
+        test_func_name = 'log_decorator.tests.test_async_log.TestAsyncLog.test_log_collect_stats.<locals>.test'
+
+        @async_log.log(self.logger_inst_mock, collect_stats=True)
+        async def test(arg):
+            if arg:
+                raise ValueError()
+
+        await test(0)
+        with self.assertRaises(ValueError):
+            await test(1)
+
+        snapshot = log.STATS_REGISTRY.snapshot()[test_func_name]
+        self.assertEqual(snapshot['count'], 2)
+        self.assertEqual(snapshot['errors'], 1)
+
+    async def test_log_with_queue_emitter(self):
+        test_func_name = 'log_decorator.tests.test_async_log.TestAsyncLog.test_log_with_queue_emitter.<locals>.test'
+
+        logger = logging.getLogger('test_async_log_queue_emitter')
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        handler = MagicMock(level=logging.NOTSET)
+        logger.handlers = [handler]
+
+        emitter = emitters.QueueEmitter(logger)
+
+        @async_log.log(logger, emitter=emitter)
+        async def test(arg):
+            if arg:
+                raise ValueError()
+            return arg
+
+        await test(0)
+        with self.assertRaises(ValueError):
+            await test(1)
+
+        emitter.stop()
+
+        records = [i.args[0] for i in handler.handle.call_args_list]
+        self.assertEqual(
+            [i.getMessage() for i in records],
+            [
+                f'call {test_func_name}',
+                f'return {test_func_name}',
+                f'call {test_func_name}',
+                f'error in {test_func_name}',
+            ],
+        )
+        self.assertEqual(records[1].result, 0)
+        self.assertIs(records[3].exc_info[0], ValueError)
+
+    async def test_log_background_capture(self):
+        with self.assertRaises(ValueError):
+            async_log.log(self.logger_inst_mock, background_capture=True)
+
+        logger = logging.getLogger('test_async_log_background_capture')
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        handler = MagicMock(level=logging.NOTSET)
+        logger.handlers = [handler]
+
+        emitter = emitters.QueueEmitter(logger)
+        exception_hook = AsyncMock()
+
+        @async_log.log(logger, emitter=emitter, background_capture=True, exception_hook=exception_hook)
+        async def test(arg, items):
+            items.append(3)
+            if arg:
+                raise ValueError()
+            return items
+
+        await test(0, [1])
+        with self.assertRaises(ValueError):
+            await test(1, [])
+        emitter.stop()
+
+        exception_hook.assert_awaited_once_with(logger, ANY, ANY)
+        self.assertEqual(exception_hook.call_args.args[2]['input_data'], {'arg': 1, 'items': []})
+
+        records = [i.args[0] for i in handler.handle.call_args_list]
+        self.assertEqual(records[0].input_data, {'arg': 0, 'items': [1]})
+        self.assertEqual(records[1].result, [1, 3])
+        self.assertEqual(records[3].input_data, {'arg': 1, 'items': []})
+
+    async def test_log_capture_mode_shapes(self):
+        self.logger_inst_mock.isEnabledFor.return_value = True
+
+        @async_log.log(self.logger_inst_mock, capture_mode=log.CaptureMode.SHAPES, hidden_params=['token'])
+        async def test(payload, token):
+            return payload
+
+        await test(b'test', 'secret')
+
+        extra = self.logger_inst_mock.log.call_args.kwargs['extra']
+        self.assertEqual(extra['input_data'], {'payload': {'type': 'bytes', 'len': 4}, 'token': 'hidden'})
+        self.assertEqual(extra['result'], {'type': 'bytes', 'len': 4})
+
+    async def test_log_async_generator(self):
+        test_func_name = 'log_decorator.tests.test_async_log.TestAsyncLog.test_log_async_generator.<locals>.test'
+
+        @async_log.log(self.logger_inst_mock, item_sampler=sampling.FrequencySampler(1), track_exec_time=True)
+        async def test(count):
+            for i in range(count):
+                sent = yield i
+                if sent:
+                    yield sent
+
+        generator = test(2)
+        self.assertEqual(await generator.__anext__(), 0)
+        self.assertEqual(await generator.asend('sent'), 'sent')
+        self.assertEqual([i async for i in generator], [1])
+
+        self.assertEqual(
+            [i.kwargs['msg'] for i in self.logger_inst_mock.log.call_args_list],
+            [f'call {test_func_name}'] + [f'yield {test_func_name}'] * 3 + [f'return {test_func_name}'],
+        )
+        self.assertEqual(
+            self.logger_inst_mock.log.call_args_list[2].kwargs['extra'],
+            {'call_id': ANY, 'function': test_func_name, 'item_number': 2, 'item': 'sent'},
+        )
+        self.logger_inst_mock.log.assert_called_with(
+            level=logging.INFO,
+            msg=f'return {test_func_name}',
+            extra={
+                'call_id': ANY,
+                'function': test_func_name,
+                'input_data': {'count': 2},
+                'items_count': 3,
+                'execution_time_ms': ANY,
+            },
+        )
+
+        generator = test(2)
+        await generator.__anext__()
+        await generator.aclose()
+
+        self.assertEqual(self.logger_inst_mock.log.call_args.kwargs['extra']['closed'], True)
+        self.assertEqual(self.logger_inst_mock.log.call_args.kwargs['extra']['items_count'], 1)
+
+    async def test_log_async_generator_with_exception(self):
+        test_func_name = (
+            'log_decorator.tests.test_async_log.TestAsyncLog.test_log_async_generator_with_exception.<locals>.test'
+        )
+
+        class ExceptionWithReturnValue(Exception):
+            return_value = 'test'
+
+        exception_hook = AsyncMock()
+
+        @async_log.log(
+            self.logger_inst_mock,
+            lazy_capture=True,
+            hide_input_from_return=True,
+            exception_hook=exception_hook,
+        )
+        async def test(arg):
+            try:
+                yield 1
+            except KeyError:
+                yield 2
+            raise arg
+
+        generator = test(ValueError())
+        self.assertEqual(await generator.__anext__(), 1)
+        self.assertEqual(await generator.athrow(KeyError()), 2)
+        with self.assertRaises(ValueError):
+            await generator.__anext__()
+
+        self.logger_inst_mock.exception.assert_called_once_with(
+            msg=f'error in {test_func_name}',
+            extra={
+                'call_id': ANY,
+                'function': test_func_name,
+                'input_data': {'arg': ANY},
+                'items_count': 2,
+            },
+        )
+        exception_hook.assert_awaited_once()
+
+        self.assertEqual([i async for i in test(ExceptionWithReturnValue())], [1])
+        self.assertEqual(self.logger_inst_mock.exception.call_count, 2)
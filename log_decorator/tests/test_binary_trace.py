@@ -0,0 +1,209 @@
+import io
+import logging
+import os
+import tempfile
+from contextlib import redirect_stdout
+from unittest import TestCase
+from unittest.mock import ANY
+
+import ujson
+
+from log_decorator import binary_trace, log
+from log_decorator.emitters import BatchingEmitter
+
+
+class TestBinaryTrace(TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'trace.bin')
+
+        self.logger = logging.getLogger('test_binary_trace')
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+
+    def tearDown(self):
+        for handler in self.logger.handlers:
+            handler.close()
+        self.logger.handlers = []
+        self.directory.cleanup()
+
+        super().tearDown()
+
+    def test_decorator_records(self):
+        test_func_name = 'log_decorator.tests.test_binary_trace.TestBinaryTrace.test_decorator_records.<locals>.test'
+
+        self.logger.addHandler(binary_trace.BinaryTraceHandler(self.path))
+
+        @log.log(self.logger, track_exec_time=True)
+        def test(arg1, arg2=None):
+            return {'arg1': arg1, 'items': [arg2, (1.5, True)]}
+
+        test(1)
+        test('test', arg2={'test'})
+
+        records = list(binary_trace.read_trace(self.path))
+        self.assertEqual(len(records), 4)
+        self.assertEqual(
+            records[1],
+            {
+                'timestamp': ANY,
+                'level': 'INFO',
+                'logger': 'test_binary_trace',
+                'message': f'return {test_func_name}',
+                'call_id': records[0]['call_id'],
+                'function': test_func_name,
+                'input_data': {'arg1': 1},
+                'execution_time_ms': ANY,
+                'result': {'arg1': 1, 'items': ['None', (1.5, 'True')]},
+            },
+        )
+        self.assertEqual(records[2]['input_data'], {'arg1': 'test', 'arg2': {'test'}})
+
+        with open(self.path, 'rb') as stream:
+            self.assertEqual(stream.read().count(test_func_name.encode()), 3)
+
+    def test_exception_and_unsupported_values(self):
+        self.logger.addHandler(binary_trace.BinaryTraceHandler(self.path, delay=True))
+
+        try:
+            raise ValueError('test')
+        except ValueError:
+            self.logger.exception('error', extra={'input_data': {'test': object}, 'result': [1]})
+
+        self.logger.info('test %s', 1, extra={'function': logging.INFO, 'input_data': 'hidden'})
+
+        records = list(binary_trace.read_trace(self.path))
+        self.assertEqual(records[0]['message'], 'error')
+        self.assertEqual(records[0]['input_data'], "{'test': <class 'object'>}")
+        self.assertEqual(records[0]['result'], [1])
+        self.assertEqual(records[0]['exception_type'], 'ValueError')
+        self.assertTrue(records[0]['exception'].endswith('ValueError: test'))
+
+        self.assertEqual(records[1]['message'], 'test 1')
+        self.assertEqual(records[1]['function'], logging.INFO)
+        self.assertEqual(records[1]['input_data'], 'hidden')
+        self.assertNotIn('exception', records[1])
+
+    def test_exception_outside_of_handler(self):
+        self.logger.addHandler(binary_trace.BinaryTraceHandler(self.path, delay=True))
+
+        self.logger.exception('error', extra={'result': 1})
+
+        records = list(binary_trace.read_trace(self.path))
+        self.assertEqual(records[0]['message'], 'error')
+        self.assertEqual(records[0]['result'], 1)
+        self.assertNotIn('exception_type', records[0])
+
+    def test_string_table_limit(self):
+        self.logger.addHandler(binary_trace.BinaryTraceHandler(self.path, max_strings=3))
+
+        for i in range(5):
+            self.logger.info(f'test {i}', extra={'function': f'function {i}', 'input_data': {f'arg {i}': i}})
+
+        records = list(binary_trace.read_trace(self.path))
+        self.assertEqual([i['message'] for i in records], [f'test {i}' for i in range(5)])
+        self.assertEqual([i['function'] for i in records], [f'function {i}' for i in range(5)])
+        self.assertEqual([i['input_data'] for i in records], [{f'arg {i}': i} for i in range(5)])
+
+    def test_rotation(self):
+        self.logger.addHandler(binary_trace.BinaryTraceHandler(self.path, max_bytes=300, backup_count=10, delay=True))
+
+        for i in range(20):
+            self.logger.info('test', extra={'function': 'test', 'input_data': {'arg': i}})
+
+        paths = sorted(
+            (i for i in os.listdir(self.directory.name)),
+            key=lambda i: -int(i.rsplit('.', 1)[-1]) if i[-1].isdigit() else 0,
+        )
+        self.assertGreater(len(paths), 2)
+
+        records = []
+        for path in paths:
+            self.assertLessEqual(os.path.getsize(os.path.join(self.directory.name, path)), 300)
+            records.extend(binary_trace.read_trace(os.path.join(self.directory.name, path)))
+        self.assertEqual([i['input_data']['arg'] for i in records], list(range(20)))
+
+    def test_no_rotation_without_backups(self):
+        self.logger.addHandler(binary_trace.BinaryTraceHandler(self.path, max_bytes=300, delay=True))
+
+        for i in range(20):
+            self.logger.info('test', extra={'function': 'test_function', 'input_data': {'arg': i}})
+
+        self.assertEqual(os.listdir(self.directory.name), [os.path.basename(self.path)])
+        self.assertGreater(os.path.getsize(self.path), 300)
+        with open(self.path, 'rb') as stream:
+            self.assertEqual(stream.read().count(b'test_function'), 1)
+        self.assertEqual([i['input_data']['arg'] for i in binary_trace.read_trace(self.path)], list(range(20)))
+
+    def test_append_and_incomplete_frame(self):
+        handler = binary_trace.BinaryTraceHandler(self.path)
+        self.logger.addHandler(handler)
+        self.logger.info('test 1', extra={'function': 'test'})
+        handler.close()
+
+        self.logger.handlers = [binary_trace.BinaryTraceHandler(self.path)]
+        self.logger.info('test 2', extra={'function': 'other'})
+        self.logger.handlers[0].close()
+
+        with open(self.path, 'ab') as stream:
+            stream.write(binary_trace.FRAME_HEADER.pack(100, binary_trace.RECORD_FRAME) + b'test')
+
+        records = list(binary_trace.read_trace(self.path))
+        self.assertEqual([(i['message'], i['function']) for i in records], [('test 1', 'test'), ('test 2', 'other')])
+
+    def test_wrong_file(self):
+        with open(self.path, 'wb') as stream:
+            stream.write(binary_trace.FRAME_HEADER.pack(6, binary_trace.HEADER_FRAME) + b'test\x01\x01')
+
+        with self.assertRaises(ValueError):
+            list(binary_trace.read_trace(self.path))
+
+        with open(self.path, 'wb') as stream:
+            stream.write(binary_trace.FRAME_HEADER.pack(6, binary_trace.HEADER_FRAME) + b'LDTR\xff\x01')
+
+        with self.assertRaises(ValueError):
+            list(binary_trace.read_trace(self.path))
+
+    def test_batching_emitter(self):
+        handler = binary_trace.BinaryTraceHandler(self.path, max_bytes=500, backup_count=1)
+        self.logger.addHandler(handler)
+        emitter = BatchingEmitter(self.logger, batch_size=10, flush_interval=None)
+
+        for i in range(5):
+            emitter.log(logging.INFO, 'test', {'input_data': {'arg': i}})
+        self.assertEqual(list(binary_trace.read_trace(self.path)), [])
+
+        emitter.flush()
+        self.assertEqual([i['input_data']['arg'] for i in binary_trace.read_trace(self.path)], list(range(5)))
+
+        for i in range(5, 20):
+            emitter.log(logging.INFO, 'test', {'input_data': {'arg': i}})
+        emitter.flush()
+
+        records = [*binary_trace.read_trace(f'{self.path}.1'), *binary_trace.read_trace(self.path)]
+        self.assertEqual([i['input_data']['arg'] for i in records], list(range(20 - len(records), 20)))
+
+    def test_main(self):
+        self.logger.addHandler(binary_trace.BinaryTraceHandler(self.path))
+        self.logger.info('test', extra={'function': 'test', 'input_data': {'arg': b'test'}, 'result': None})
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            binary_trace.main([self.path, self.path])
+
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(
+            ujson.loads(lines[0]),
+            {
+                'timestamp': ANY,
+                'level': 'INFO',
+                'logger': 'test_binary_trace',
+                'message': 'test',
+                'function': 'test',
+                'input_data': {'arg': "b'test'"},
+                'result': None,
+            },
+        )
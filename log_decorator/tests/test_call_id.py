@@ -0,0 +1,53 @@
+import os
+import threading
+from unittest import TestCase, skipUnless
+from unittest.mock import patch
+
+from log_decorator import call_id
+
+
+class TestCallId(TestCase):
+    def test_fast_call_id(self):
+        first_id = call_id.fast_call_id()
+        second_id = call_id.fast_call_id()
+
+        self.assertEqual(len(first_id), 32)
+        self.assertEqual(first_id[:16], second_id[:16])
+        self.assertLess(first_id, second_id)
+
+    def test_fast_call_id_in_threads(self):
+        call_ids = []
+
+        def generate():
+            call_ids.extend(call_id.fast_call_id() for _ in range(10000))
+
+        threads = [threading.Thread(target=generate) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(set(call_ids)), 40000)
+
+    @skipUnless(hasattr(os, 'fork'), 'fork is not available')
+    def test_fast_call_id_after_fork(self):
+        read_fd, write_fd = os.pipe()
+
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover
+            os.write(write_fd, call_id.fast_call_id().encode())
+            os._exit(0)  # noqa: WPS437
+
+        os.waitpid(pid, 0)
+        child_id = os.read(read_fd, 32).decode()
+        os.close(read_fd)
+        os.close(write_fd)
+
+        parent_id = call_id.fast_call_id()
+
+        self.assertNotEqual(child_id[:16], parent_id[:16])
+        self.assertNotEqual(child_id, parent_id)
+
+    def test_uuid1_call_id(self):
+        with patch('log_decorator.call_id.uuid1') as uuid1_mock:
+            self.assertEqual(call_id.uuid1_call_id(), uuid1_mock.return_value.hex)
@@ -0,0 +1,278 @@
+import logging
+import threading
+import time
+from io import StringIO
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from log_decorator.emitters import BatchingEmitter, DeferredValue, OverflowPolicy, QueueEmitter
+
+
+class RecordsHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.threads = []
+
+    def emit(self, record):
+        self.records.append(record)
+        self.threads.append(threading.current_thread())
+
+
+def get_test_logger(name):
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = RecordsHandler()
+    logger.handlers = [handler]
+    return logger, handler
+
+
+class TestQueueEmitter(TestCase):
+    def test_emit(self):
+        logger, handler = get_test_logger('test_queue_emitter')
+        emitter = QueueEmitter(logger)
+
+        self.assertTrue(emitter.isEnabledFor(logging.INFO))
+        self.assertFalse(emitter.isEnabledFor(logging.DEBUG))
+
+        emitter.log(logging.INFO, 'test msg', extra={'input_data': {'a': 1}})
+        emitter.log(logging.DEBUG, 'skipped')
+        try:
+            raise ValueError('test')
+        except ValueError:
+            emitter.exception('error msg', extra={'input_data': {}})
+
+        emitter.stop()
+        emitter.stop()
+
+        self.assertEqual([i.getMessage() for i in handler.records], ['test msg', 'error msg'])
+        self.assertEqual(handler.records[0].input_data, {'a': 1})
+        self.assertIs(handler.records[1].exc_info[0], ValueError)
+        self.assertEqual(handler.records[1].levelno, logging.ERROR)
+        self.assertNotIn(threading.current_thread(), handler.threads)
+        self.assertEqual(emitter.dropped, 0)
+
+    def test_overflow_policies(self):
+        logger, handler = get_test_logger('test_queue_emitter_overflow')
+
+        for policy, expected_messages in (
+            (OverflowPolicy.DROP_NEWEST, ['0', '1']),
+            (OverflowPolicy.DROP_OLDEST, ['2', '3']),
+            (OverflowPolicy.BLOCK, ['0', '1']),
+        ):
+            emitter = QueueEmitter(logger, maxsize=2, overflow_policy=policy, block_timeout=0.01)
+            emitter.stop()
+
+            for i in range(4):
+                emitter.log(logging.INFO, str(i))
+
+            queued_messages = [emitter.queue.get_nowait().getMessage() for _ in range(2)]
+
+            self.assertEqual(queued_messages, expected_messages)
+            self.assertEqual(emitter.dropped, 2)
+
+        emitter._drop_oldest()  # noqa: WPS437
+        self.assertEqual(emitter.dropped, 2)
+
+    def test_deferred_values(self):
+        logger, handler = get_test_logger('test_queue_emitter_deferred')
+        emitter = QueueEmitter(logger)
+
+        func = MagicMock(side_effect=lambda value: (value, threading.current_thread()))
+        value = DeferredValue(func, 1)
+        emitter.log(logging.INFO, 'test 1', extra={'input_data': value})
+        emitter.log(logging.INFO, 'test 2', extra={'input_data': value, 'result': DeferredValue(int, 'error')})
+        emitter.stop()
+
+        func.assert_called_once_with(1)
+        self.assertEqual(handler.records[0].input_data, (1, handler.threads[0]))
+        self.assertNotEqual(handler.threads[0], threading.current_thread())
+        self.assertIs(handler.records[1].input_data, handler.records[0].input_data)
+        self.assertTrue(handler.records[1].result.startswith('<capture error: ValueError('))
+
+
+class CountingStream(StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+
+def get_batching_logger(name):
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    stream = CountingStream()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter('%(levelname)s %(message)s'))
+    logger.handlers = [handler]
+    return logger, stream
+
+
+class TestBatchingEmitter(TestCase):
+    def test_flush_on_size(self):
+        logger, stream = get_batching_logger('test_batching_emitter_size')
+        emitter = BatchingEmitter(logger, batch_size=3, flush_interval=None)
+
+        self.assertTrue(emitter.isEnabledFor(logging.INFO))
+        self.assertFalse(emitter.isEnabledFor(logging.DEBUG))
+
+        for i in range(5):
+            emitter.log(logging.INFO, str(i))
+        emitter.log(logging.DEBUG, 'skipped')
+
+        self.assertEqual(stream.getvalue(), 'INFO 0\nINFO 1\nINFO 2\n')
+        self.assertEqual(stream.writes, 1)
+
+        emitter.flush()
+        emitter.flush()
+
+        self.assertEqual(stream.getvalue(), 'INFO 0\nINFO 1\nINFO 2\nINFO 3\nINFO 4\n')
+        self.assertEqual(stream.writes, 2)
+
+    def test_flush_on_time(self):
+        logger, stream = get_batching_logger('test_batching_emitter_time')
+        emitter = BatchingEmitter(logger, batch_size=100, flush_interval=1)
+
+        with patch('log_decorator.emitters.time.monotonic', side_effect=[10, 10.5, 11, 11.5]):
+            emitter.log(logging.INFO, '0')
+            emitter.log(logging.INFO, '1')
+            self.assertEqual(stream.getvalue(), '')
+
+            emitter.log(logging.INFO, '2')
+            self.assertEqual(stream.getvalue(), 'INFO 0\nINFO 1\nINFO 2\n')
+
+            emitter.log(logging.INFO, '3')
+            self.assertEqual(stream.writes, 1)
+
+        emitter.flush()
+        self.assertEqual(stream.getvalue(), 'INFO 0\nINFO 1\nINFO 2\nINFO 3\n')
+
+    def test_flush_on_timer(self):
+        logger, stream = get_batching_logger('test_batching_emitter_timer')
+        emitter = BatchingEmitter(logger, batch_size=100, flush_interval=0.05)
+
+        emitter.log(logging.INFO, 'call')
+        self.assertEqual(stream.getvalue(), '')
+
+        deadline = time.monotonic() + 5
+        while not stream.getvalue() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(stream.getvalue(), 'INFO call\n')
+        self.assertEqual(stream.writes, 1)
+
+        emitter.stop()
+        self.assertFalse(emitter._timer.is_alive())  # noqa: WPS437
+
+        emitter.log(logging.INFO, 'after stop')
+        emitter.flush()
+        self.assertEqual(stream.getvalue(), 'INFO call\nINFO after stop\n')
+
+    def test_exception_bypasses_buffer(self):
+        logger, stream = get_batching_logger('test_batching_emitter_exception')
+        emitter = BatchingEmitter(logger)
+
+        emitter.log(logging.INFO, 'call')
+        try:
+            raise ValueError('test')
+        except ValueError:
+            emitter.exception('error')
+
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(lines[:2], ['INFO call', 'ERROR error'])
+        self.assertEqual(lines[-1], 'ValueError: test')
+        self.assertEqual(stream.writes, 1)
+
+        logger.setLevel(logging.CRITICAL)
+        emitter.exception('skipped')
+        emitter.log(logging.INFO, 'skipped')
+        emitter.flush()
+        self.assertEqual(stream.writes, 1)
+
+    def test_flush_threads(self):
+        logger, stream = get_batching_logger('test_batching_emitter_threads')
+        emitter = BatchingEmitter(logger)
+
+        thread = threading.Thread(target=emitter.log, args=(logging.INFO, 'thread'))
+        thread.start()
+        thread.join()
+        emitter.log(logging.INFO, 'main')
+
+        self.assertEqual(stream.getvalue(), '')
+        self.assertEqual(len(emitter._buffers), 2)  # noqa: WPS437
+
+        emitter.flush()
+
+        self.assertEqual(sorted(stream.getvalue().splitlines()), ['INFO main', 'INFO thread'])
+        self.assertEqual(len(emitter._buffers), 1)  # noqa: WPS437
+
+    def test_handlers(self):
+        parent = logging.getLogger('test_batching_emitter_parent')
+        parent.propagate = False
+        parent_handler = MagicMock(level=logging.NOTSET)
+        parent.handlers = [parent_handler]
+
+        logger, stream = get_batching_logger('test_batching_emitter_parent.child')
+        logger.propagate = True
+        logger.handlers[0].setLevel(logging.WARNING)
+        logger.handlers[0].addFilter(lambda record: record.getMessage() != 'filtered')
+        emitter = BatchingEmitter(logger)
+
+        emitter.log(logging.INFO, 'info')
+        emitter.log(logging.WARNING, 'warning')
+        emitter.log(logging.WARNING, 'filtered')
+        emitter.flush()
+
+        self.assertEqual(stream.getvalue(), 'WARNING warning\n')
+        self.assertEqual(
+            [i.args[0].getMessage() for i in parent_handler.handle.call_args_list],
+            ['info', 'warning', 'filtered'],
+        )
+
+        logger.handlers[0].addFilter(lambda record: False)
+        logger.addFilter(lambda record: record.getMessage() != 'info')
+        emitter.log(logging.WARNING, 'info')
+        emitter.flush()
+        self.assertEqual(parent_handler.handle.call_count, 3)
+
+        logger.disabled = True
+        emitter.log(logging.WARNING, 'disabled')
+        emitter.flush()
+        self.assertEqual(parent_handler.handle.call_count, 3)
+
+    def test_handler_errors(self):
+        logger, stream = get_batching_logger('test_batching_emitter_errors')
+        handler = logger.handlers[0]
+        handler.handleError = MagicMock()
+        handler.setFormatter(MagicMock(format=MagicMock(side_effect=[ValueError(), 'ok'])))
+        emitter = BatchingEmitter(logger)
+
+        emitter.log(logging.INFO, 'broken')
+        emitter.log(logging.INFO, 'ok')
+        emitter.flush()
+
+        self.assertEqual(stream.getvalue(), 'ok\n')
+        self.assertEqual(handler.handleError.call_count, 1)
+
+        stream.close()
+        emitter.log(logging.INFO, 'closed')
+        handler.setFormatter(None)
+        emitter.flush()
+        self.assertEqual(handler.handleError.call_count, 2)
+
+    def test_last_resort(self):
+        logger = logging.getLogger('test_batching_emitter_last_resort')
+        logger.propagate = False
+        logger.handlers = []
+        emitter = BatchingEmitter(logger)
+
+        with patch('logging.lastResort', MagicMock(level=logging.WARNING)) as last_resort:
+            emitter.log(logging.WARNING, 'warning')
+            emitter.flush()
+
+        self.assertEqual(last_resort.handle.call_args[0][0].getMessage(), 'warning')
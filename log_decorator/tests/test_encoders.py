@@ -0,0 +1,152 @@
+from decimal import Decimal
+from unittest import TestCase
+
+import ujson
+
+from log_decorator.encoders import BoundedWriter, LimitReached, encode_json, encode_repr, write_json, write_str
+
+TEST_VALUES = (
+    None,
+    True,
+    False,
+    1,
+    -2 ** 70,
+    1.5,
+    1e-7,
+    float('inf'),
+    Decimal('2.5'),
+    '',
+    'text/with "escaped" \\ chars\n\x01 and unicode é😀',
+    [],
+    {},
+    (1, 'a', None),
+    [[], {}, [[1]], {'a': {}}],
+    {'a': 1, 'b': [1, 2, {'c': None, 'd': (True, 1.5)}], 'e': {'f': 'g'}},
+    {1: 'int key', None: 'none key', 1.5: 'float key', False: 'bool key', (1, 2): 'tuple key'},
+)
+
+
+class TestBoundedWriter(TestCase):
+    def test_write(self):
+        writer = BoundedWriter(5)
+
+        writer.write('abc')
+        self.assertEqual(writer.remaining(), 2)
+
+        position = writer.mark()
+        writer.write('de')
+        writer.rollback(position)
+        self.assertEqual(writer.getvalue(), 'abc')
+        self.assertEqual(writer.remaining(), 2)
+
+        with self.assertRaises(LimitReached):
+            writer.write('def')
+        self.assertEqual(writer.getvalue(), 'abcdef')
+
+        writer = BoundedWriter()
+        writer.write('a' * 100)
+        self.assertIsNone(writer.remaining())
+        self.assertEqual(writer.getvalue(), 'a' * 100)
+
+
+class TestEncodeJson(TestCase):
+    def test_encode_json(self):
+        for value in TEST_VALUES:
+            for indent in (None, 2, 4):
+                expected = ujson.dumps(value, indent=indent or 0, ensure_ascii=False)
+
+                self.assertEqual(encode_json(value, indent=indent), expected)
+
+                for max_length in (0, 3, 10, 30):
+                    result = encode_json(value, indent=indent, max_length=max_length)
+                    self.assertEqual(result[:max_length + 1], expected[:max_length + 1])
+                    self.assertTrue(len(result) > max_length or result == expected)
+
+    def test_encode_json_stops_at_max_length(self):
+        nested = {'a': {'b': [{'c': 'x' * 100} for _ in range(100000)]}}
+        expected = ujson.dumps(nested, indent=2, ensure_ascii=False)
+
+        result = encode_json(nested, indent=2, max_length=1000)
+        self.assertEqual(result[:1001], expected[:1001])
+        self.assertLess(len(result), 1200)
+
+        result = encode_json({'a': 'x' * 1000000}, max_length=1000)
+        self.assertEqual(result, '{"a":"' + 'x' * 995 + '"')
+
+        result = encode_json(list(range(1000000)), max_length=10)
+        self.assertEqual(result, '[0,1,2,3,4,')
+
+    def test_encode_json_not_serializable(self):
+        with self.assertRaises(TypeError):
+            encode_json({'a': {1, 2}})
+
+        with self.assertRaises(TypeError):
+            encode_json({'a': [{1, 2}]}, max_length=10)
+
+        self.assertEqual(encode_json(['x' * 100, {1, 2}], max_length=10)[:11], '["xxxxxxxxx')
+
+    def test_encode_json_lenient(self):
+        value = object()
+
+        self.assertEqual(
+            encode_json({'a': {1}, 'b': frozenset(), 'c': value, (1, 2): [value]}, lenient=True),
+            f'{{"a":[1],"b":[],"c":"{value}","(1, 2)":["{value}"]}}',
+        )
+        self.assertEqual(encode_json([{1}], indent=2, lenient=True), '[\n  [\n    1\n  ]\n]')
+        self.assertEqual(encode_json(['x', value], max_length=10, lenient=True)[:11], f'["x","{value}'[:11])
+
+    def test_write_json(self):
+        writer = BoundedWriter()
+        writer.write('value: ')
+        write_json(writer, {'a': [1]}, indent=2)
+        self.assertEqual(writer.getvalue(), 'value: {\n  "a": [\n    1\n  ]\n}')
+
+
+class TestEncodeRepr(TestCase):
+    def test_encode_repr(self):
+        test_values = TEST_VALUES + (
+            set(),
+            frozenset(),
+            {1, 'a', (1,)},
+            frozenset({'b'}),
+            (1,),
+            b"bytes with ' quote",
+            "it's",
+            'say "hi"',
+            """it's "both" """,
+            [{'a': ({1}, frozenset({2}), (3,))}],
+        )
+
+        for value in test_values:
+            expected = repr(value)
+
+            self.assertEqual(encode_repr(value), expected)
+
+            for max_length in (0, 3, 10, 30):
+                result = encode_repr(value, max_length=max_length)
+                self.assertEqual(result[:max_length + 1], expected[:max_length + 1])
+                self.assertTrue(len(result) > max_length or result == expected)
+
+    def test_encode_repr_keeps_quotes_of_truncated_strings(self):
+        for value in ("it's" * 100 + '"', "it's" * 100, b"it's" * 100 + b'"', 'a' * 100 + "it's"):
+            self.assertEqual(encode_repr(value, max_length=20)[:21], repr(value)[:21])
+
+    def test_encode_repr_stops_at_max_length(self):
+        nested = {'a': {'b': [{'c': 'x' * 100} for _ in range(100000)]}}
+        result = encode_repr(nested, max_length=1000)
+        self.assertEqual(result[:1001], repr(nested)[:1001])
+        self.assertLess(len(result), 1200)
+
+        self.assertEqual(encode_repr(set(range(100000)), max_length=10), '{0, 1, 2, 3')
+        self.assertEqual(encode_repr(frozenset(range(100000)), max_length=15), 'frozenset({0, 1, ')
+
+    def test_write_str(self):
+        for value in ('text', {'a': 'b'}, [1, 'a'], {1}, Decimal('1.5'), None):
+            writer = BoundedWriter()
+            write_str(writer, value)
+            self.assertEqual(writer.getvalue(), str(value))
+
+        writer = BoundedWriter(10)
+        with self.assertRaises(LimitReached):
+            write_str(writer, 'x' * 1000000)
+        self.assertEqual(writer.getvalue(), 'x' * 11)
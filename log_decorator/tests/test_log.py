@@ -1,10 +1,13 @@
+import dataclasses
+import inspect
+import importlib.util
 import logging
 from datetime import datetime
-from unittest import TestCase
+from unittest import TestCase, skipUnless
 from unittest.mock import MagicMock, patch, ANY
 from uuid import uuid1
 
-from log_decorator import log
+from log_decorator import call_id, emitters, log, sampling
 
 
 class TestLog(TestCase):
@@ -31,11 +34,11 @@ class TestLog(TestCase):
         test_kwarg2 = 1
         test_kwarg3 = {'kwarg3': 1}
 
-        @log.log(self.logger_inst_mock)
+        @log.log(self.logger_inst_mock, call_id_factory=call_id.uuid1_call_id)
         def test(arg1, arg2, *args, kwarg1, kwarg2, **varkw):
             return arg1, arg2, args, kwarg1, kwarg2, varkw
 
-        with patch('log_decorator.log.uuid1', self.uuid1_mock):
+        with patch('log_decorator.call_id.uuid1', self.uuid1_mock):
             result = test(test_arg1, test_arg2, test_arg3, kwarg1=test_kwarg1, kwarg2=test_kwarg2, **test_kwarg3)
 
         self.assertEqual(result, (test_arg1, test_arg2, (test_arg3,), test_kwarg1, test_kwarg2, test_kwarg3))
@@ -261,7 +264,18 @@ class TestLog(TestCase):
         for i in range(2):
             self.assertRaises(Exception, test)
 
-        self.logger_inst_mock.exception.assert_called_once_with(
+        self.logger_inst_mock.log.assert_called_once_with(
+            level=logging.INFO,
+            msg=f'call {test_func_name}',
+            extra={
+                'call_id': ANY,
+                'function': test_func_name,
+                'input_data': {},
+            },
+        )
+
+        self.assertEqual(self.logger_inst_mock.exception.call_count, 2)
+        self.logger_inst_mock.exception.assert_called_with(
             msg=f'error in {test_func_name}',
             extra={
                 'call_id': ANY,
@@ -391,3 +405,1119 @@ class TestLog(TestCase):
                 'input_data': {},
             },
         )
+
+    def test_call_plan(self):
+        def test(arg, *args, kwarg, **kwargs):
+            return
+
+        plan = log.CallPlan(test, hidden_params=['arg', 'kwarg__key'])
+
+        self.assertEqual(plan.func_name, 'log_decorator.tests.test_log.TestLog.test_call_plan.<locals>.test')
+        self.assertEqual(plan.arg_names, ('arg',))
+        self.assertEqual(plan.varargs, 'args')
+        self.assertEqual(plan.kwonly_args, ('kwarg',))
+        self.assertTrue(plan.get_hide_node('arg').hidden)
+        self.assertFalse(plan.get_hide_node('kwarg').hidden)
+        self.assertTrue(plan.get_hide_node('kwarg').get_child('key').hidden)
+        self.assertIsNone(plan.get_hide_node('args'))
+        self.assertIsNone(log.CallPlan(test).get_hide_node('arg'))
+        self.assertEqual(plan.call_msg, f'call {plan.func_name}')
+        self.assertEqual(plan.return_msg, f'return {plan.func_name}')
+        self.assertEqual(plan.error_msg, f'error in {plan.func_name}')
+
+    def test_get_logged_args_with_argspec(self):
+        def test(arg, *args, kwarg=None):
+            return arg
+
+        self.assertEqual(
+            log.get_logged_args(inspect.getfullargspec(test), (1, 2), {'kwarg': {'key': 'secret'}}, ['kwarg__key']),
+            {'arg': 1, '*args': (2,), 'kwarg': {'key': log.HIDDEN_VALUE}},
+        )
+
+    def test_log_introspects_once(self):
+        @log.log(self.logger_inst_mock)
+        def test(arg):
+            return arg
+
+        with patch('log_decorator.log.inspect.getfullargspec') as getfullargspec_mock:
+            test(1)
+            test(2)
+
+        getfullargspec_mock.assert_not_called()
+
+    def test_log_methods(self):
+        test_class_name = 'log_decorator.tests.test_log.TestLog.test_log_methods.<locals>.TestClass'
+
+        class TestClass:
+            def get_log_id(self):
+                return 'instance'
+
+            @log.log(self.logger_inst_mock)
+            def method(self, arg):
+                return arg
+
+            @log.log(self.logger_inst_mock)
+            @classmethod
+            def class_method(cls, arg):
+                return arg
+
+        self.assertEqual(TestClass().method(1), 1)
+        self.logger_inst_mock.log.assert_called_with(
+            level=logging.INFO,
+            msg=f'return {test_class_name}.method',
+            extra={
+                'call_id': ANY,
+                'function': f'{test_class_name}.method',
+                'input_data': {'self': 'instance', 'arg': 1},
+                'result': 1,
+            },
+        )
+
+        self.assertEqual(TestClass.class_method(2), 2)
+        self.logger_inst_mock.log.assert_called_with(
+            level=logging.INFO,
+            msg=f'return {test_class_name}.class_method',
+            extra={
+                'call_id': ANY,
+                'function': f'{test_class_name}.class_method',
+                'input_data': {'cls': str(TestClass), 'arg': 2},
+                'result': 2,
+            },
+        )
+
+    def test_log_disabled_level_skips_result_normalization(self):
+        self.logger_inst_mock.isEnabledFor.return_value = False
+
+        @log.log(self.logger_inst_mock)
+        def test(arg):
+            return arg
+
+        with patch('log_decorator.log.normalize_for_log', wraps=log.normalize_for_log) as normalize_mock:
+            self.assertEqual(test(1), 1)
+
+        normalize_mock.assert_called_once_with(1)
+        self.logger_inst_mock.isEnabledFor.assert_called_with(logging.INFO)
+        self.logger_inst_mock.log.assert_not_called()
+
+    def test_log_lazy_capture(self):
+        test_func_name = 'log_decorator.tests.test_log.TestLog.test_log_lazy_capture.<locals>.test'
+
+        self.logger_inst_mock.isEnabledFor.return_value = False
+
+        @log.log(self.logger_inst_mock, lazy_capture=True)
+        def test(arg):
+            if arg:
+                raise ValueError()
+            return arg
+
+        with patch('log_decorator.log.get_logged_args', wraps=log.get_logged_args) as get_logged_args_mock:
+            self.assertEqual(test(0), 0)
+            get_logged_args_mock.assert_not_called()
+
+            self.assertRaises(ValueError, test, 1)
+            get_logged_args_mock.assert_called_once()
+
+        self.logger_inst_mock.log.assert_not_called()
+        self.logger_inst_mock.exception.assert_called_once_with(
+            msg=f'error in {test_func_name}',
+            extra={
+                'call_id': ANY,
+                'function': test_func_name,
+                'input_data': {'arg': 1},
+            },
+        )
+
+    def test_log_lazy_capture_with_sampled_out_call(self):
+        test_exception_hook = MagicMock()
+
+        @log.log(self.logger_inst_mock, frequency=2, lazy_capture=True, exception_hook=test_exception_hook)
+        def test(arg):
+            raise ValueError()
+
+        self.assertRaises(ValueError, test, 1)
+
+        self.logger_inst_mock.log.assert_not_called()
+        self.logger_inst_mock.exception.assert_called_once_with(msg=ANY, extra=ANY)
+        test_exception_hook.assert_called_once_with(
+            self.logger_inst_mock,
+            ANY,
+            {'call_id': ANY, 'function': ANY, 'input_data': {'arg': 1}},
+        )
+
+    def test_normalize_for_log_types(self):
+        from collections import OrderedDict, namedtuple
+        from decimal import Decimal
+        from enum import Enum, IntEnum
+
+        class TestEnum(Enum):
+            A = 1
+
+        class TestIntEnum(IntEnum):
+            A = 1
+
+        class TestStr(str):
+            def get_log_id(self):
+                return 'test_str'
+
+        self.assertEqual(log.normalize_for_log('test'), 'test')
+        self.assertEqual(log.normalize_for_log(1.5), 1.5)
+        self.assertEqual(log.normalize_for_log(10 ** 30), 10 ** 30)
+        self.assertEqual(log.normalize_for_log(b'test'), "b'test'")
+        self.assertEqual(log.normalize_for_log(Decimal('1.1')), Decimal('1.1'))
+        self.assertEqual(log.normalize_for_log(TestEnum.A), 'TestEnum.A')
+        self.assertIs(log.normalize_for_log(TestIntEnum.A), TestIntEnum.A)
+        self.assertEqual(log.normalize_for_log(TestStr('test')), 'test_str')
+        self.assertEqual(log.normalize_for_log(OrderedDict(a=None)), {'a': 'None'})
+        self.assertEqual(log.normalize_for_log({1, None}), {1, 'None'})
+        self.assertEqual(log.normalize_for_log(({'a': [True]},)), ({'a': ['True']},))
+        self.assertEqual(log.normalize_for_log(namedtuple('Test', 'a')), str(namedtuple('Test', 'a')))
+
+    def test_register_log_repr(self):
+        class TestBase:
+            def get_log_id(self):
+                return 'log_id'
+
+        class TestChild(TestBase):
+            pass
+
+        self.assertEqual(log.normalize_for_log(TestChild()), 'log_id')
+
+        @log.register_log_repr(TestBase)
+        def test_converter(value):
+            return f'converted {type(value).__name__}'
+
+        try:
+            self.assertEqual(log.normalize_for_log(TestChild()), 'converted TestChild')
+            self.assertEqual(log.normalize_for_log([TestBase()]), ['converted TestBase'])
+
+            log.register_log_repr(TestChild, lambda value: 'child')
+            self.assertEqual(log.normalize_for_log(TestChild()), 'child')
+            self.assertEqual(log.normalize_for_log(TestBase()), 'converted TestBase')
+        finally:
+            log.unregister_log_repr(TestBase)
+            log.unregister_log_repr(TestChild)
+
+        self.assertEqual(log.normalize_for_log(TestChild()), 'log_id')
+
+    def test_normalize_for_log_caches_non_serializable_types(self):
+        class TestClass:
+            def __str__(self):
+                return 'test'
+
+        with patch('log_decorator.log.ujson.dumps', side_effect=TypeError) as dumps_mock:
+            self.assertEqual(log.normalize_for_log(TestClass()), 'test')
+            self.assertEqual(log.normalize_for_log(TestClass()), 'test')
+
+        dumps_mock.assert_called_once()
+
+    def test_normalize_for_log_caches_representation_of_types(self):
+        class TestModel:
+            loads = 0
+
+            def __getattr__(self, name):
+                # lazy loading attributes like ORM models do
+                TestModel.loads += 1
+                raise AttributeError(name)
+
+            def __str__(self):
+                return 'model'
+
+        class TestDynamic:
+            def __init__(self, log_id):
+                if log_id is not None:
+                    self.get_log_id = lambda: log_id
+
+        class TestJson(int):
+            pass
+
+        with patch('log_decorator.log.ujson.dumps', wraps=log.ujson.dumps) as dumps_mock:
+            self.assertEqual(log.normalize_for_log(TestModel()), 'model')
+            loads = TestModel.loads
+            self.assertEqual(log.normalize_for_log([TestModel(), TestModel()]), ['model'] * 2)
+            self.assertEqual(log.normalize_for_log([TestJson(1), TestJson(2)]), [1, 2])
+        self.assertEqual(TestModel.loads, loads)
+        self.assertEqual(dumps_mock.call_count, 2)
+
+        without_log_id = TestDynamic(None)
+        self.assertEqual(log.normalize_for_log([TestDynamic('a'), without_log_id]), ['a', str(without_log_id)])
+        self.assertEqual(log.normalize_for_log(TestDynamic('b')), 'b')
+
+    def test_log_id_memo(self):
+        class TestClass:
+            def __init__(self, log_id):
+                self.log_id = log_id
+                self.calls = 0
+
+            def get_log_id(self):
+                self.calls += 1
+                return self.log_id
+
+        value = TestClass('test')
+        memo = {}
+
+        self.assertEqual(log.with_log_id_memo(memo, log.normalize_for_log, [value, value]), ['test', 'test'])
+        self.assertEqual(log.with_log_id_memo(memo, log.normalize_for_log, {'a': value}), {'a': 'test'})
+        self.assertEqual(value.calls, 1)
+
+        self.assertEqual(log.with_log_id_memo(None, log.normalize_for_log, value), 'test')
+        self.assertEqual(log.normalize_for_log(value), 'test')
+        self.assertEqual(value.calls, 3)
+
+        # memoized results are not reused for new objects which got id of a collected one
+        del value  # noqa: WPS420
+        self.assertEqual(log.with_log_id_memo(memo, log.normalize_for_log, [TestClass(i) for i in range(3)]), [0, 1, 2])
+
+        self.logger_inst_mock.isEnabledFor.return_value = True
+
+        @log.log(self.logger_inst_mock, memoize_log_ids=True)
+        def test(arg):
+            return [arg, arg]
+
+        value = TestClass('test')
+        test(value)
+        self.assertEqual(self.logger_inst_mock.log.call_args.kwargs['extra']['result'], ['test', 'test'])
+        self.assertEqual(value.calls, 1)
+
+    def test_log_repr_factories(self):
+        @dataclasses.dataclass
+        class TestData:
+            name: str
+            created_at: datetime
+            secret: str = dataclasses.field(default='secret', repr=False)
+
+        created_at = datetime(2021, 1, 1)
+        self.assertEqual(log.normalize_for_log(TestData('test', created_at)), str(TestData('test', created_at)))
+
+        log.register_log_repr_factory(log.dataclass_log_repr)
+        self.addCleanup(log.unregister_log_repr_factory, log.dataclass_log_repr)
+        self.assertEqual(
+            log.normalize_for_log(TestData('test', created_at)),
+            {'name': 'test', 'created_at': str(created_at)},
+        )
+
+        class TestBase:
+            pass
+
+        class TestChild(TestBase):
+            def get_log_id(self):
+                return 'child'
+
+        @log.register_log_repr_factory
+        def test_factory(value_type):
+            if issubclass(value_type, TestBase):
+                return lambda value: type(value).__name__
+            return None
+
+        try:
+            self.assertEqual(log.normalize_for_log([TestBase(), TestChild()]), ['TestBase', 'child'])
+            self.assertEqual(log.normalize_for_log(TestData('test', created_at))['name'], 'test')
+        finally:
+            log.unregister_log_repr_factory(test_factory)
+
+        self.assertTrue(log.normalize_for_log(TestBase()).startswith('<'))
+
+    def test_log_repr_factories_recursion(self):
+        @dataclasses.dataclass
+        class TestNode:
+            name: str
+            parent: object = None
+            children: list = dataclasses.field(default_factory=list)
+
+        log.register_log_repr_factory(log.dataclass_log_repr)
+        self.addCleanup(log.unregister_log_repr_factory, log.dataclass_log_repr)
+
+        root = TestNode('root')
+        root.children.append(TestNode('child', root))
+        self.logger_inst_mock.isEnabledFor.return_value = True
+
+        @log.log(self.logger_inst_mock)
+        def test(node):
+            return node.name
+
+        self.assertEqual(test(root), 'root')
+
+        input_data = self.logger_inst_mock.log.call_args.kwargs['extra']['input_data']
+        child = input_data['node']['children'][0]
+        self.assertEqual(child['name'], 'child')
+        self.assertTrue(child['parent'].startswith('<'))
+        self.assertIn('TestNode object at', child['parent'])
+
+        node = TestNode('0')
+        for i in range(1, 200):
+            node = TestNode(str(i), node)
+        result = log.normalize_for_log(node)
+        for _ in range(log.MAX_LOG_REPR_DEPTH - 1):
+            result = result['parent']
+        self.assertIn('TestNode object at', result['parent'])
+
+    def test_log_repr_factories_limits(self):
+        @dataclasses.dataclass
+        class TestData:
+            items: list
+            text: str
+
+        log.register_log_repr_factory(log.dataclass_log_repr)
+        self.addCleanup(log.unregister_log_repr_factory, log.dataclass_log_repr)
+
+        limits = log.CaptureLimits(max_depth=3, max_items=2, max_length=5)
+        result = log.normalize_for_log(TestData([{'a': [1, 2, 3]}] * 10000, 'x' * 10000), limits)
+
+        self.assertEqual(
+            result,
+            {'items': [{'a': '<list of 3 items>'}, {'a': '<list of 3 items>'}, '<9998 more items>'], 'text': ANY},
+        )
+        self.assertEqual(result['text'], 'xxxxx<9995 more chars>')
+
+    @skipUnless(importlib.util.find_spec('pydantic'), 'pydantic is not installed')
+    def test_pydantic_log_repr(self):
+        import pydantic
+
+        class TestModel(pydantic.BaseModel):
+            name: str
+            created_at: datetime
+
+        created_at = datetime(2021, 1, 1)
+        log.register_log_repr_factory(log.pydantic_log_repr)
+        self.addCleanup(log.unregister_log_repr_factory, log.pydantic_log_repr)
+        self.assertEqual(
+            log.normalize_for_log(TestModel(name='test', created_at=created_at)),
+            {'name': 'test', 'created_at': str(created_at)},
+        )
+
+    @skipUnless(importlib.util.find_spec('numpy'), 'numpy is not installed')
+    def test_numpy_log_repr(self):
+        import numpy
+
+        self.assertEqual(log.normalize_for_log(numpy.int64(1)), 1)
+        self.assertEqual(
+            log.normalize_for_log(numpy.arange(4).reshape(2, 2)),
+            {'type': 'ndarray', 'dtype': 'int64', 'shape': [2, 2], 'nbytes': 32, 'head': [0, 1, 2, 3]},
+        )
+
+        value = numpy.arange(100, dtype=numpy.float32)[::2]
+        value[1] = numpy.nan
+        self.assertEqual(
+            log.summarize_array(value, preview_items=2, stats=True),
+            {
+                'type': 'ndarray',
+                'dtype': 'float32',
+                'shape': [50],
+                'nbytes': 200,
+                'head': [0.0, ANY],
+                'tail': [96.0, 98.0],
+                'nan_count': 1,
+                'min': 0.0,
+                'max': 98.0,
+                'mean': sum(range(0, 100, 2)[2:]) / 49,
+            },
+        )
+        self.assertEqual(log.summarize_array(numpy.array([numpy.nan]), stats=True)['nan_count'], 1)
+        self.assertNotIn('min', log.summarize_array(numpy.array(['a']), stats=True))
+
+    def test_summarize_buffer(self):
+        import array
+
+        self.assertEqual(log.normalize_for_log(b'test'), "b'test'")
+        self.assertEqual(
+            log.normalize_for_log(b'test' * log.MAX_BYTES_REPR_LENGTH),
+            {
+                'type': 'bytes',
+                'format': 'B',
+                'shape': [4 * log.MAX_BYTES_REPR_LENGTH],
+                'nbytes': 4 * log.MAX_BYTES_REPR_LENGTH,
+                'head': "b'testtest'",
+                'tail': "b'testtest'",
+            },
+        )
+        self.assertEqual(
+            log.normalize_for_log(memoryview(b'test')),
+            {'type': 'memoryview', 'format': 'B', 'shape': [4], 'nbytes': 4, 'head': "b'test'"},
+        )
+        self.assertEqual(
+            log.normalize_for_log([array.array('i', range(100))]),
+            [
+                {
+                    'type': 'array',
+                    'format': 'i',
+                    'shape': [100],
+                    'nbytes': 400,
+                    'head': list(range(8)),
+                    'tail': list(range(92, 100)),
+                },
+            ],
+        )
+        self.assertEqual(
+            log.summarize_buffer(memoryview(bytes(24)).cast('B', (2, 3, 4))),
+            {'type': 'memoryview', 'format': 'B', 'shape': [2, 3, 4], 'nbytes': 24},
+        )
+
+        value = bytearray(2 * log.MAX_BYTES_REPR_LENGTH)
+        self.assertEqual(log.normalize_for_log(value)['type'], 'bytearray')
+        value.extend(b'test')  # the buffer is released after the summary is taken
+
+    def test_normalize_for_log_with_limits(self):
+        self.assertEqual(
+            log.normalize_for_log({'a': [1, 2, 3], 'b': None}, log.CaptureLimits()),
+            {'a': [1, 2, 3], 'b': 'None'},
+        )
+
+        limits = log.CaptureLimits(max_items=2)
+        self.assertEqual(log.normalize_for_log(list(range(50000)), limits), [0, 1, '<49998 more items>'])
+        self.assertEqual(log.normalize_for_log((1, 2, 3), limits), (1, 2, '<1 more items>'))
+        self.assertEqual(
+            log.normalize_for_log({'a': 1, 'b': 2, 'c': 3}, limits),
+            {'a': 1, 'b': 2, '...': '<1 more items>'},
+        )
+
+        limits = log.CaptureLimits(max_length=3)
+        self.assertEqual(log.normalize_for_log('x' * 1000, limits), 'xxx<997 more chars>')
+        self.assertEqual(log.normalize_for_log(b'xxxx', limits), "b'xxx'<1 more chars>")
+        self.assertEqual(log.normalize_for_log(['abc', 'abcd'], limits), ['abc', 'abc<1 more chars>'])
+
+        limits = log.CaptureLimits(max_depth=1)
+        self.assertEqual(
+            log.normalize_for_log({'a': {'b': 1}, 'c': [1, 2], 'd': 1}, limits),
+            {'a': '<dict of 1 items>', 'c': '<list of 2 items>', 'd': 1},
+        )
+
+        limits = log.CaptureLimits(max_size=10)
+        self.assertEqual(
+            log.normalize_for_log(['x' * 6, 'y' * 6, 'z' * 6], limits),
+            ['xxxxxx', 'yyyy<2 more chars>', '<1 more items>'],
+        )
+
+    def test_log_with_capture_limits(self):
+        test_func_name = 'log_decorator.tests.test_log.TestLog.test_log_with_capture_limits.<locals>.test'
+
+        @log.log(self.logger_inst_mock, capture_limits=log.CaptureLimits(max_items=1, max_size=10))
+        def test(arg, *args):
+            return arg
+
+        test([1, 2, 3], 'x' * 20)
+
+        self.logger_inst_mock.log.assert_called_with(
+            level=logging.INFO,
+            msg=f'return {test_func_name}',
+            extra={
+                'call_id': ANY,
+                'function': test_func_name,
+                'input_data': {'arg': [1, '<2 more items>'], '*args': ('xxxxxxxxx<11 more chars>',)},
+                'result': [1, '<2 more items>'],
+            },
+        )
+
+    def test_log_return_record_shares_captured_data(self):
+        @log.log(self.logger_inst_mock)
+        def test(arg):
+            return arg
+
+        test({'key': ['value']})
+
+        call_extra = self.logger_inst_mock.log.call_args_list[0].kwargs['extra']
+        return_extra = self.logger_inst_mock.log.call_args_list[1].kwargs['extra']
+
+        self.assertNotIn('result', call_extra)
+        self.assertIs(return_extra['input_data'], call_extra['input_data'])
+
+    def test_log_hidden_params_wildcards(self):
+        test_func_name = 'log_decorator.tests.test_log.TestLog.test_log_hidden_params_wildcards.<locals>.test'
+
+        test_payload = {
+            'users': [{'login': 'a', 'password': '1'}, {'login': 'b', 'password': '2', 'token': 't'}],
+            'meta': ('x', {'password': '3'}),
+        }
+
+        @log.log(self.logger_inst_mock, hidden_params=[
+            'payload__users__*__password',
+            'payload__users__1__token',
+            'payload__meta__-1__*',
+            'args__0__key',
+            'kwarg__test1',
+        ])
+        def test(payload, *args, kwarg, kwarg1):
+            return
+
+        test(test_payload, {'key': 1, 'other': 2}, kwarg={'test1': 1}, kwarg1={'test1': 1})
+
+        self.logger_inst_mock.log.assert_called_with(
+            level=logging.INFO,
+            msg=f'return {test_func_name}',
+            extra={
+                'call_id': ANY,
+                'function': test_func_name,
+                'input_data': {
+                    'payload': {
+                        'users': [
+                            {'login': 'a', 'password': log.HIDDEN_VALUE},
+                            {'login': 'b', 'password': log.HIDDEN_VALUE, 'token': log.HIDDEN_VALUE},
+                        ],
+                        'meta': ('x', {'password': log.HIDDEN_VALUE}),
+                    },
+                    '*args': ({'key': log.HIDDEN_VALUE, 'other': 2},),
+                    'kwarg': {'test1': log.HIDDEN_VALUE},
+                    'kwarg1': {'test1': 1},
+                },
+                'result': 'None',
+            },
+        )
+        self.assertEqual(test_payload['users'][0]['password'], '1')
+
+    def test_log_hidden_params_with_capture_limits(self):
+        test_func_name = 'log_decorator.tests.test_log.TestLog.test_log_hidden_params_with_capture_limits.<locals>.test'
+
+        @log.log(
+            self.logger_inst_mock,
+            hidden_params=['arg__*__password', 'arg__0__login__x'],
+            capture_limits=log.CaptureLimits(max_items=2),
+        )
+        def test(arg):
+            return
+
+        test([{'login': 'a', 'password': '1'}, {'password': '2'}, {'password': '3'}])
+
+        self.logger_inst_mock.log.assert_called_with(
+            level=logging.INFO,
+            msg=f'return {test_func_name}',
+            extra={
+                'call_id': ANY,
+                'function': test_func_name,
+                'input_data': {
+                    'arg': [
+                        {'login': log.HIDDEN_VALUE, 'password': log.HIDDEN_VALUE},
+                        {'password': log.HIDDEN_VALUE},
+                        '<1 more items>',
+                    ],
+                },
+                'result': 'None',
+            },
+        )
+
+    def test_get_call_plan(self):
+        def get_test_func():
+            @log.log(self.logger_inst_mock, frequency=2)
+            def test():
+                return
+
+            return test
+
+        test_1 = get_test_func()
+        test_2 = get_test_func()
+
+        test_1()
+        test_1()
+        test_2()
+
+        self.assertEqual(log.get_call_plan(test_1).counter.value, 2)
+        self.assertEqual(log.get_call_plan(test_2).counter.value, 1)
+        self.assertEqual(self.logger_inst_mock.log.call_count, 2)
+
+        log.get_call_plan(test_1).counter.reset()
+        self.assertEqual(log.get_call_plan(test_1).counter.value, 0)
+
+        class TestClass:
+            @log.log(self.logger_inst_mock)
+            def method(self):
+                return
+
+        TestClass().method()
+
+        self.assertEqual(log.get_call_plan(TestClass.method).counter.value, 1)
+        self.assertIs(log.get_call_plan(TestClass().method), log.get_call_plan(TestClass.method))
+        self.assertIsNone(log.get_call_plan(get_test_func))
+        self.assertIsNone(log.get_call_plan(len))
+
+    def test_log_sampler(self):
+        test_func_name = 'log_decorator.tests.test_log.TestLog.test_log_sampler.<locals>.test'
+
+        class TestSampler(log.Sampler):
+            def __init__(self):
+                self.calls = []
+
+            def clone(self):
+                return TestSampler()
+
+            def should_sample(self, call_number):
+                self.calls.append(call_number)
+                return call_number == 2
+
+        with self.assertRaises(ValueError):
+            log.log(self.logger_inst_mock, frequency=2, sampler=TestSampler())
+
+        @log.log(self.logger_inst_mock, sampler=TestSampler())
+        def test(arg):
+            if arg:
+                raise ValueError()
+
+        test(0)
+        test(0)
+        self.assertRaises(ValueError, test, 1)
+
+        self.assertEqual(self.logger_inst_mock.log.call_count, 2)
+        self.logger_inst_mock.exception.assert_called_once_with(
+            msg=f'error in {test_func_name}',
+            extra={
+                'call_id': ANY,
+                'function': test_func_name,
+                'input_data': {'arg': 1},
+            },
+        )
+
+    def test_log_sampler_skipped_for_disabled_records(self):
+        sampler = MagicMock(spec=log.Sampler)
+        sampler.clone.return_value = sampler
+
+        @log.log(self.logger_inst_mock, lvl=logging.DEBUG, sampler=sampler)
+        def test():
+            return
+
+        @log.log(self.logger_inst_mock, exceptions_only=True, sampler=sampler)
+        def test_exceptions_only():
+            return
+
+        self.logger_inst_mock.isEnabledFor.return_value = False
+        test()
+        self.logger_inst_mock.isEnabledFor.return_value = True
+        test_exceptions_only()
+
+        sampler.should_sample.assert_not_called()
+        self.logger_inst_mock.log.assert_not_called()
+
+        test()
+        sampler.should_sample.assert_called_once_with(2)
+
+    def test_log_call_id(self):
+        @log.log(self.logger_inst_mock)
+        def test():
+            return
+
+        test()
+        test()
+
+        call_ids = [i.kwargs['extra']['call_id'] for i in self.logger_inst_mock.log.call_args_list]
+
+        self.assertEqual(call_ids[0], call_ids[1])
+        self.assertEqual(call_ids[2], call_ids[3])
+        self.assertLess(call_ids[0], call_ids[2])
+        self.assertEqual(len(call_ids[0]), len(self.test_call_id))
+
+    def test_log_track_exec_time_units(self):
+        test_func_name = 'log_decorator.tests.test_log.TestLog.test_log_track_exec_time_units.<locals>.test'
+
+        @log.log(self.logger_inst_mock, track_exec_time=True, track_cpu_time=True, exec_time_unit='us')
+        def test():
+            return
+
+        with patch('log_decorator.log.time.perf_counter_ns', side_effect=[1000, 3500]):
+            with patch('log_decorator.log.time.thread_time_ns', side_effect=[100, 600]):
+                test()
+
+        self.logger_inst_mock.log.assert_called_with(
+            level=logging.INFO,
+            msg=f'return {test_func_name}',
+            extra={
+                'call_id': ANY,
+                'function': test_func_name,
+                'input_data': {},
+                'execution_time_us': 2.5,
+                'cpu_time_us': 0.5,
+                'result': 'None',
+            },
+        )
+
+        @log.log(self.logger_inst_mock, track_exec_time=True)
+        def test_ms():
+            return
+
+        with patch('log_decorator.log.time.perf_counter_ns', side_effect=[0, 1500]):
+            test_ms()
+
+        self.assertEqual(self.logger_inst_mock.log.call_args.kwargs['extra']['execution_time_ms'], 0.0015)
+
+        with self.assertRaises(ValueError):
+            log.log(self.logger_inst_mock, exec_time_unit='s')
+
+    def test_log_collect_stats(self):
+        test_func_name = 'log_decorator.tests.test_log.TestLog.test_log_collect_stats.<locals>.test'
+
+        @log.log(self.logger_inst_mock, collect_stats=True, frequency=10)
+        def test(arg):
+            if arg:
+                raise ValueError()
+
+        test(0)
+        test(0)
+        self.assertRaises(ValueError, test, 1)
+
+        snapshot = log.STATS_REGISTRY.snapshot()[test_func_name]
+        self.assertEqual(snapshot['count'], 3)
+        self.assertEqual(snapshot['errors'], 1)
+        self.assertIsNotNone(snapshot['p99_ms'])
+        self.logger_inst_mock.log.assert_not_called()
+
+    def test_log_stats_summary(self):
+        test_func_name = 'log_decorator.tests.test_log.TestLog.test_log_stats_summary.<locals>.test'
+
+        @log.log(self.logger_inst_mock, collect_stats=True, stats_interval=0, exceptions_only=True)
+        def test():
+            return
+
+        test()
+
+        self.logger_inst_mock.log.assert_called_once_with(
+            level=logging.INFO,
+            msg=f'stats {test_func_name}',
+            extra={'function': test_func_name, 'stats': ANY},
+        )
+        self.assertEqual(self.logger_inst_mock.log.call_args.kwargs['extra']['stats']['count'], 1)
+        self.assertEqual(log.STATS_REGISTRY.snapshot()[test_func_name]['count'], 0)
+
+    def test_log_with_emitter(self):
+        test_func_name = 'log_decorator.tests.test_log.TestLog.test_log_with_emitter.<locals>.test'
+
+        emitter = MagicMock()
+        emitter.isEnabledFor.return_value = True
+
+        @log.log(self.logger_inst_mock, emitter=emitter)
+        def test(arg):
+            if arg:
+                raise ValueError()
+            return arg
+
+        test(0)
+        self.assertRaises(ValueError, test, 1)
+
+        self.assertEqual(
+            [i.kwargs['msg'] for i in emitter.log.call_args_list],
+            [f'call {test_func_name}', f'return {test_func_name}', f'call {test_func_name}'],
+        )
+        emitter.exception.assert_called_once_with(msg=f'error in {test_func_name}', extra=ANY)
+        self.logger_inst_mock.log.assert_not_called()
+        self.logger_inst_mock.exception.assert_not_called()
+
+    def test_log_with_batching_emitter(self):
+        test_func_name = 'log_decorator.tests.test_log.TestLog.test_log_with_batching_emitter.<locals>.test'
+
+        logger = logging.getLogger('test_log_batching_emitter')
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        handler = MagicMock(level=logging.NOTSET)
+        logger.handlers = [handler]
+
+        emitter = emitters.BatchingEmitter(logger, batch_size=10)
+
+        @log.log(logger, emitter=emitter)
+        def test(arg):
+            if arg:
+                raise ValueError()
+            return arg
+
+        test(0)
+        handler.handle.assert_not_called()
+
+        self.assertRaises(ValueError, test, 1)
+
+        records = [i.args[0] for i in handler.handle.call_args_list]
+        self.assertEqual(
+            [i.getMessage() for i in records],
+            [
+                f'call {test_func_name}',
+                f'return {test_func_name}',
+                f'call {test_func_name}',
+                f'error in {test_func_name}',
+            ],
+        )
+        self.assertEqual(records[1].result, 0)
+        self.assertIs(records[3].exc_info[0], ValueError)
+
+    def test_log_generator(self):
+        test_func_name = 'log_decorator.tests.test_log.TestLog.test_log_generator.<locals>.test'
+
+        sent_values = []
+
+        @log.log(self.logger_inst_mock, item_sampler=sampling.FrequencySampler(2), track_exec_time=True)
+        def test(count):
+            for i in range(count):
+                sent_values.append((yield i))
+            return count
+
+        generator = test(3)
+
+        self.logger_inst_mock.log.assert_called_once_with(
+            level=logging.INFO,
+            msg=f'call {test_func_name}',
+            extra=ANY,
+        )
+
+        self.assertEqual(next(generator), 0)
+        self.assertEqual(generator.send('sent'), 1)
+        self.assertEqual(list(generator), [2])
+        self.assertEqual(sent_values, ['sent', None, None])
+
+        self.assertEqual(
+            [i.kwargs['msg'] for i in self.logger_inst_mock.log.call_args_list],
+            [f'call {test_func_name}', f'yield {test_func_name}', f'return {test_func_name}'],
+        )
+        self.assertEqual(
+            self.logger_inst_mock.log.call_args_list[1].kwargs['extra'],
+            {'call_id': ANY, 'function': test_func_name, 'item_number': 2, 'item': 1},
+        )
+        self.logger_inst_mock.log.assert_called_with(
+            level=logging.INFO,
+            msg=f'return {test_func_name}',
+            extra={
+                'call_id': ANY,
+                'function': test_func_name,
+                'input_data': {'count': 3},
+                'items_count': 3,
+                'execution_time_ms': ANY,
+                'result': 3,
+            },
+        )
+        self.logger_inst_mock.exception.assert_not_called()
+
+    def test_log_generator_close(self):
+        test_func_name = 'log_decorator.tests.test_log.TestLog.test_log_generator_close.<locals>.test'
+
+        closed = []
+
+        @log.log(self.logger_inst_mock, hide_input_from_return=True)
+        def test():
+            try:
+                yield 1
+                yield 2
+            finally:
+                closed.append(True)
+
+        generator = test()
+        next(generator)
+        generator.close()
+
+        self.assertEqual(closed, [True])
+        self.logger_inst_mock.log.assert_called_with(
+            level=logging.INFO,
+            msg=f'return {test_func_name}',
+            extra={
+                'call_id': ANY,
+                'function': test_func_name,
+                'input_data': log.HIDDEN_VALUE,
+                'items_count': 1,
+                'result': 'None',
+                'closed': True,
+            },
+        )
+
+    def test_log_generator_with_exception(self):
+        test_func_name = 'log_decorator.tests.test_log.TestLog.test_log_generator_with_exception.<locals>.test'
+
+        class ExceptionWithReturnValue(Exception):
+            return_value = 'test'
+
+        @log.log(self.logger_inst_mock, lazy_capture=True, exceptions_only=True)
+        def test(arg):
+            try:
+                yield 1
+            except KeyError:
+                yield 2
+            raise arg
+
+        generator = test(ValueError())
+        self.assertEqual(next(generator), 1)
+        self.assertEqual(generator.throw(KeyError()), 2)
+        self.assertRaises(ValueError, next, generator)
+
+        self.logger_inst_mock.log.assert_not_called()
+        self.logger_inst_mock.exception.assert_called_once_with(
+            msg=f'error in {test_func_name}',
+            extra={
+                'call_id': ANY,
+                'function': test_func_name,
+                'input_data': {'arg': ANY},
+                'items_count': 2,
+            },
+        )
+
+        generator = test(ExceptionWithReturnValue())
+        next(generator)
+        with self.assertRaises(StopIteration) as stop:
+            generator.throw(KeyError())
+            next(generator)
+
+        self.assertEqual(stop.exception.value, 'test')
+
+    def test_log_background_capture(self):
+        test_func_name = 'log_decorator.tests.test_log.TestLog.test_log_background_capture.<locals>.test'
+
+        with self.assertRaises(ValueError):
+            log.log(self.logger_inst_mock, background_capture=True)
+
+        logger = logging.getLogger('test_log_background_capture')
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        handler = MagicMock(level=logging.NOTSET)
+        logger.handlers = [handler]
+
+        emitter = emitters.QueueEmitter(logger)
+        emitter.stop()
+        exception_hook = MagicMock()
+
+        @log.log(logger, emitter=emitter, background_capture=True, exception_hook=exception_hook)
+        def test(arg, items):
+            items.append(3)
+            if arg:
+                raise ValueError()
+            return items
+
+        nested = [1]
+        items = [nested]
+        test(0, items)
+        self.assertRaises(ValueError, test, 1, [])
+        exception_hook.assert_called_once_with(logger, ANY, ANY)
+        self.assertEqual(exception_hook.call_args.args[2]['input_data'], {'arg': 1, 'items': []})
+
+        # the input is copied before the call, but nested containers are shared with the caller
+        nested.append(2)
+        items.append(4)
+
+        # records are queued with captured values which are normalized when the emitter thread prepares them
+        records = [emitter.queue.get_nowait() for _ in range(emitter.queue.qsize())]
+        self.assertIsInstance(records[0].input_data, emitters.DeferredValue)
+        records = [emitter._listener.prepare(i) for i in records]  # noqa: WPS437
+
+        self.assertEqual(
+            [i.getMessage() for i in records],
+            [
+                f'call {test_func_name}',
+                f'return {test_func_name}',
+                f'call {test_func_name}',
+                f'error in {test_func_name}',
+            ],
+        )
+        self.assertEqual(records[0].input_data, {'arg': 0, 'items': [[1, 2]]})
+        self.assertIs(records[1].input_data, records[0].input_data)
+        self.assertEqual(records[1].result, [[1, 2], 3])
+        self.assertEqual(records[3].input_data, {'arg': 1, 'items': []})
+
+    def test_log_generator_background_capture(self):
+        logger = logging.getLogger('test_log_generator_background_capture')
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        handler = MagicMock(level=logging.NOTSET)
+        logger.handlers = [handler]
+
+        emitter = emitters.QueueEmitter(logger)
+
+        @log.log(logger, emitter=emitter, background_capture=True, item_sampler=sampling.FrequencySampler(1))
+        def test(items):
+            for i in items:
+                yield {'item': i}
+            return len(items)
+
+        self.assertEqual(list(test([1, 2])), [{'item': 1}, {'item': 2}])
+        emitter.stop()
+
+        records = [i.args[0] for i in handler.handle.call_args_list]
+        self.assertEqual(records[0].input_data, {'items': [1, 2]})
+        self.assertEqual([i.item for i in records[1:3]], [{'item': 1}, {'item': 2}])
+        self.assertEqual(records[3].result, 2)
+
+    def test_snapshot_value(self):
+        for value in ([1, [2]], {'a': [1]}, {1}, bytearray(b'test')):
+            snapshot = log.snapshot_value(value)
+            self.assertEqual(snapshot, value)
+            self.assertIsNot(snapshot, value)
+
+        for value in ((1, [2]), 'test', object()):
+            self.assertIs(log.snapshot_value(value), value)
+
+    def test_describe_shape(self):
+        class Array:
+            shape = (2, 3)
+            dtype = 'float64'
+            nbytes = 48
+
+        class Sized:
+            def __len__(self):
+                return 5
+
+        class Unsized:
+            def __len__(self):
+                raise TypeError()
+
+        self.assertEqual(log.describe_shape(None), {'type': 'NoneType'})
+        self.assertEqual(log.describe_shape(1.5), {'type': 'float'})
+        self.assertEqual(log.describe_shape('test'), {'type': 'str', 'len': 4})
+        self.assertEqual(log.describe_shape(b'test'), {'type': 'bytes', 'len': 4})
+        self.assertEqual(log.describe_shape([1, [2, 3]]), {'type': 'list', 'len': 2})
+        self.assertEqual(log.describe_shape({1, 2}), {'type': 'set', 'len': 2})
+        self.assertEqual(
+            log.describe_shape({'a': [1], 2: {}}),
+            {'type': 'dict', 'len': 2, 'keys': ['a', '2']},
+        )
+        self.assertEqual(
+            log.describe_shape({'a': 1, 'b': 2, 'c': 3}, log.CaptureLimits(max_items=1)),
+            {'type': 'dict', 'len': 3, 'keys': ['a', '<2 more items>']},
+        )
+        self.assertEqual(
+            log.describe_shape(memoryview(b'test')),
+            {'type': 'memoryview', 'shape': [4], 'nbytes': 4},
+        )
+        self.assertEqual(
+            log.describe_shape(Array()),
+            {'type': 'Array', 'shape': [2, 3], 'dtype': 'float64', 'nbytes': 48},
+        )
+        self.assertEqual(log.describe_shape(Sized()), {'type': 'Sized', 'len': 5})
+        self.assertEqual(log.describe_shape(Unsized()), {'type': 'Unsized'})
+        self.assertEqual(log.describe_shape(Sized), {'type': 'type'})
+        self.assertEqual(log.describe_shape(object()), {'type': 'object'})
+
+    def test_log_capture_mode_shapes(self):
+        self.logger_inst_mock.isEnabledFor.return_value = True
+
+        @log.log(
+            self.logger_inst_mock,
+            capture_mode=log.CaptureMode.SHAPES,
+            hidden_params=['token', 'args__0', 'payload__password'],
+        )
+        def test(payload, token, *args, **kwargs):
+            return [payload]
+
+        with patch('log_decorator.log.normalize_for_log') as normalize_mock:
+            test({'name': 'test', 'password': 'secret'}, 'secret', 'secret', [1, 2], kwarg='test')
+        normalize_mock.assert_not_called()
+
+        self.assertEqual(
+            self.logger_inst_mock.log.call_args.kwargs['extra']['input_data'],
+            {
+                'payload': {'type': 'dict', 'len': 2, 'keys': ['name', 'password']},
+                'token': 'hidden',
+                '*args': ['hidden', {'type': 'list', 'len': 2}],
+                'kwarg': {'type': 'str', 'len': 4},
+            },
+        )
+        self.assertEqual(self.logger_inst_mock.log.call_args.kwargs['extra']['result'], {'type': 'list', 'len': 1})
+
+        @log.log(
+            self.logger_inst_mock,
+            capture_mode='shapes',
+            lazy_capture=True,
+            exceptions_only=True,
+            item_sampler=sampling.FrequencySampler(1),
+        )
+        def test_generator(items):
+            yield from items
+            raise ValueError()
+
+        self.assertRaises(ValueError, list, test_generator(['test']))
+        self.assertEqual(
+            self.logger_inst_mock.exception.call_args.kwargs['extra']['input_data'],
+            {'items': {'type': 'list', 'len': 1}},
+        )
+
+        self.logger_inst_mock.log.reset_mock()
+
+        @log.log(self.logger_inst_mock, capture_mode=log.CaptureMode.SHAPES, item_sampler=sampling.FrequencySampler(1))
+        def test_items(items):
+            yield from items
+
+        list(test_items(['test']))
+        self.assertEqual(self.logger_inst_mock.log.call_args_list[1].kwargs['extra']['item'], {'type': 'str', 'len': 4})
@@ -1,7 +1,11 @@
 import logging
+import sys
 from unittest import TestCase
+from unittest.mock import patch
 
-from log_decorator.log_formatter import LogFormatter, FormatterMode
+import ujson
+
+from log_decorator.log_formatter import DEFAULT_SEPARATOR, LogFormatter, FormatterMode
 
 TEST_VERBOSE_RESULT_1 = '''test msg
 
@@ -96,6 +100,231 @@ class TestLogFormatter(TestCase):
         result = test_formatter.format(self._get_record_mock())
         self.assertEqual(result, TEST_VERBOSE_RESULT_3)
 
+    def test_verbose_formatter_truncates_each_field(self):
+        record = self._get_record_mock()
+        record.input_data = {'items': [{'id': i, 'name': f'name {i}'} for i in range(100000)]}
+        record.result = 'x' * 1000000
+
+        test_formatter = LogFormatter(max_length=1000)
+        result = test_formatter.format(record)
+
+        input_data, result_data = result.split(DEFAULT_SEPARATOR)[1:3]
+        self.assertEqual(len(result), 1000)
+        self.assertLessEqual(abs(len(input_data) - len('INPUT DATA:\n') - len(result_data) + len('RESULT:\n')), 1)
+        self.assertTrue(input_data.endswith('...'))
+        self.assertTrue(result_data.startswith('RESULT:\n"xxx'))
+        self.assertTrue(result.endswith(DEFAULT_SEPARATOR))
+
+        expected = ujson.dumps(record.input_data, indent=2, ensure_ascii=False)
+        self.assertEqual(input_data, f'INPUT DATA:\n{expected[:len(input_data) - 15]}...')
+
+        record.input_data = {'test': {1, 2}}
+        result = test_formatter.format(record)
+
+        input_data, result_data = result.split(DEFAULT_SEPARATOR)[1:3]
+        self.assertEqual(len(result), 1000)
+        self.assertEqual(input_data, "INPUT DATA:\n{'test': {1, 2}}")
+        self.assertEqual(result_data, f'RESULT:\n"{"x" * (len(result_data) - 12)}...')
+
+    def test_compact_formatter_truncates_each_field(self):
+        record = self._get_record_mock()
+        record.input_data = {'test': list(range(100000))}
+        record.result = "it's " * 100000
+
+        test_formatter = LogFormatter(formatter_mode=FormatterMode.COMPACT, max_length=200)
+        result = test_formatter.format(record)
+
+        self.assertEqual(len(result), 200)
+        self.assertTrue(result.startswith("test msg {'input_data': {'test': [0, 1, 2, "))
+        self.assertIn("..., 'result': \"it's it's", result)
+        self.assertTrue(result.endswith('...}'))
+
+        record.input_data = {'test': 1}
+        result = test_formatter.format(record)
+
+        self.assertEqual(len(result), 200)
+        self.assertTrue(result.startswith("test msg {'input_data': {'test': 1}, 'result': \"it's it's"))
+
+        test_formatter = LogFormatter(formatter_mode=FormatterMode.COMPACT, max_length=25)
+        self.assertEqual(test_formatter.format(record), "test msg {'input_data'...")
+
+    def test_json_formatter(self):
+        record = self._get_record_mock()
+        record.result = [1, None]
+
+        test_formatter = LogFormatter(formatter_mode=FormatterMode.JSON)
+        result = test_formatter.format(record)
+        self.assertEqual(
+            result,
+            f'{{"timestamp":{ujson.dumps(record.created)},"level":"DEBUG","logger":"test","message":"test msg",'
+            f'"input_data":{{"test":"123"}},"result":[1,null]}}',
+        )
+
+        test_formatter = LogFormatter(formatter_mode=FormatterMode.JSON, limit_keys_to=['test'])
+        self.assertEqual(
+            list(ujson.loads(test_formatter.format(record))),
+            ['timestamp', 'level', 'logger', 'message', 'test'],
+        )
+
+        record = self._get_record_mock()
+        record.message = 'test msg'
+        test_formatter = LogFormatter(formatter_mode=FormatterMode.JSON, limit_keys_to=None)
+        result = ujson.loads(test_formatter.format(record))
+        self.assertEqual(result['message'], 'test msg')
+        self.assertEqual(result['result'], ['1'])
+
+    def test_json_formatter_stringifies_only_unsupported_values(self):
+        record = self._get_record_mock()
+        value = object()
+        record.input_data = {'x': 0, 's': {0}, 'f': frozenset(), 'o': value, (1, 2): [value]}
+        record.result = value
+
+        for max_length in (None, 1000):
+            test_formatter = LogFormatter(formatter_mode=FormatterMode.JSON, max_length=max_length)
+            result = ujson.loads(test_formatter.format(record))
+            self.assertEqual(
+                result['input_data'],
+                {'x': 0, 's': [0], 'f': [], 'o': str(value), '(1, 2)': [str(value)]},
+            )
+            self.assertEqual(result['result'], str(value))
+
+    def test_json_formatter_unsupported_values_are_bounded(self):
+        record = self._get_record_mock()
+        record.input_data = {'items': list(range(1000000)), 'tags': {'a'}, 'text': 'x' * 1000000}
+
+        test_formatter = LogFormatter(formatter_mode=FormatterMode.JSON, max_length=1000)
+        with patch('log_decorator.encoders.ujson.dumps', wraps=ujson.dumps) as dumps_mock:
+            result = test_formatter.format(record)
+
+        self.assertLessEqual(len(result), 1000)
+        self.assertTrue(ujson.loads(result)['input_data'].startswith('{"items":[0,1,2,'))
+        self.assertLess(dumps_mock.call_count, 1000)
+
+    def test_json_formatter_exception(self):
+        try:
+            raise ValueError('test')
+        except ValueError:
+            record = logging.getLogger('unittest').makeRecord(
+                'test', logging.ERROR, '', 0, 'error in test', (), sys.exc_info(), extra={'input_data': {}},
+            )
+
+        result = ujson.loads(LogFormatter(formatter_mode=FormatterMode.JSON).format(record))
+
+        self.assertEqual(result['input_data'], {})
+        self.assertEqual(result['exception_type'], 'ValueError')
+        self.assertTrue(result['exception'].startswith('Traceback'))
+        self.assertTrue(result['exception'].endswith('ValueError: test'))
+
+    def test_json_formatter_truncates_each_field(self):
+        record = self._get_record_mock()
+        record.input_data = {'items': [{'id': i, 'name': f'name "{i}"'} for i in range(100000)]}
+        record.result = '"quoted"\n' * 100000
+
+        test_formatter = LogFormatter(formatter_mode=FormatterMode.JSON, max_length=1000)
+        result = test_formatter.format(record)
+
+        self.assertLessEqual(len(result), 1000)
+        self.assertGreater(len(result), 900)
+
+        result = ujson.loads(result)
+        self.assertTrue(result['input_data'].startswith('{"items":[{"id":0,"name":"name \\"0\\""},'))
+        self.assertTrue(result['input_data'].endswith('...'))
+        self.assertTrue(result['result'].startswith('"quoted"\n"quoted"'))
+        self.assertTrue(result['result'].endswith('...'))
+
+        record.input_data = {'test': 1}
+        result = ujson.loads(test_formatter.format(record))
+        self.assertEqual(result['input_data'], {'test': 1})
+
+    def test_json_formatter_truncates_message(self):
+        record = self._get_record_mock()
+        record.msg = 'long "message" ' * 1000
+        record.result = 'x' * 1000
+
+        test_formatter = LogFormatter(formatter_mode=FormatterMode.JSON, max_length=200)
+        result = test_formatter.format(record)
+
+        self.assertLessEqual(len(result), 200)
+        result = ujson.loads(result)
+        self.assertTrue(result['message'].startswith('long "message" long'))
+        self.assertTrue(result['message'].endswith('...'))
+        self.assertEqual(result['result'], '...')
+
+        record.msg = 'short message'
+        self.assertEqual(ujson.loads(test_formatter.format(record))['message'], 'short message')
+
+    def test_json_formatter_exc_info_without_exception(self):
+        record = logging.getLogger('unittest').makeRecord(
+            'test', logging.ERROR, '', 0, 'error in test', (), (None, None, None), extra={'result': 1},
+        )
+
+        result = ujson.loads(LogFormatter(formatter_mode=FormatterMode.JSON).format(record))
+
+        self.assertEqual(result['result'], 1)
+        self.assertNotIn('exception_type', result)
+
+    def test_keys_order_and_renaming(self):
+        record = self._get_record_mock()
+
+        test_formatter = LogFormatter(formatter_mode=FormatterMode.COMPACT, limit_keys_to=['result', 'input_data'])
+        self.assertEqual(test_formatter.format(record), "test msg {'result': {'1'}, 'input_data': {'test': '123'}}")
+        self.assertEqual(test_formatter.limit_keys_to, frozenset(('input_data', 'result')))
+
+        test_formatter = LogFormatter(formatter_mode=FormatterMode.COMPACT, limit_keys_to={'test', 'result', 'missing'})
+        self.assertEqual(test_formatter.format(record), "test msg {'result': {'1'}, 'test': {}}")
+
+        test_formatter = LogFormatter(
+            formatter_mode=FormatterMode.COMPACT,
+            rename_keys={'input_data': 'args', 'missing': 'test'},
+        )
+        self.assertEqual(test_formatter.format(record), "test msg {'args': {'test': '123'}, 'result': {'1'}}")
+
+        test_formatter = LogFormatter(rename_keys={'input_data': 'args'}, separator='\n\n')
+        self.assertEqual(test_formatter.format(record), TEST_VERBOSE_RESULT_3.replace('INPUT DATA', 'ARGS'))
+
+        test_formatter = LogFormatter(formatter_mode=FormatterMode.JSON, rename_keys={'result': 'return_value'})
+        self.assertEqual(list(ujson.loads(test_formatter.format(record)))[-2:], ['input_data', 'return_value'])
+
+        test_formatter = LogFormatter(
+            formatter_mode=FormatterMode.COMPACT,
+            limit_keys_to=None,
+            rename_keys={'msg': 'm'},
+        )
+        result = test_formatter.format(record)
+        self.assertIn("'m': 'test msg'", result)
+        self.assertIn("'message': 'test msg'", result)
+
+    def test_compact_formatter_format_string(self):
+        record = self._get_record_mock()
+
+        test_formatter = LogFormatter(formatter_mode=FormatterMode.COMPACT)
+        with patch.object(logging.Formatter, 'format') as format_mock:
+            self.assertEqual(test_formatter.format(record), "test msg {'input_data': {'test': '123'}, 'result': {'1'}}")
+        format_mock.assert_not_called()
+
+        test_formatter = LogFormatter(formatter_mode=FormatterMode.COMPACT, fmt='{levelname} {message}', style='{')
+        self.assertEqual(
+            test_formatter.format(record),
+            "DEBUG test msg {'input_data': {'test': '123'}, 'result': {'1'}}",
+        )
+
+        try:
+            raise ValueError('test')
+        except ValueError:
+            record.exc_info = sys.exc_info()
+
+        test_formatter = LogFormatter(formatter_mode=FormatterMode.COMPACT)
+        result = test_formatter.format(record)
+        self.assertTrue(result.startswith('test msg\nTraceback'))
+        self.assertTrue(result.endswith("ValueError: test {'input_data': {'test': '123'}, 'result': {'1'}}"))
+
+        class UpperLogFormatter(LogFormatter):
+            def formatMessage(self, record):
+                return super().formatMessage(record).upper()
+
+        test_formatter = UpperLogFormatter(formatter_mode=FormatterMode.COMPACT, limit_keys_to=['test'])
+        self.assertEqual(test_formatter.format(self._get_record_mock()), "TEST MSG {'test': {}}")
+
     @staticmethod
     def _get_record_mock():
         return logging.getLogger('unittest').makeRecord(
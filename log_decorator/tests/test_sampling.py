@@ -0,0 +1,123 @@
+import gc
+import threading
+from unittest import TestCase
+from unittest.mock import patch
+
+from log_decorator.sampling import (
+    AdaptiveSampler,
+    CallCounter,
+    FrequencySampler,
+    ProbabilitySampler,
+    RateLimitSampler,
+)
+
+
+class TestCallCounter(TestCase):
+    def test_increment(self):
+        counter = CallCounter()
+
+        self.assertEqual(counter.value, 0)
+        self.assertEqual(counter.increment(), 1)
+        self.assertEqual(counter.increment(), 2)
+        self.assertEqual(counter.value, 2)
+
+        counter.reset()
+
+        self.assertEqual(counter.value, 0)
+        self.assertEqual(counter.increment(), 1)
+
+    def test_increment_in_threads(self):
+        counter = CallCounter()
+        threads_count = 8
+        increments_count = 10000
+
+        def increment():
+            for _ in range(increments_count):
+                counter.increment()
+
+        threads = [threading.Thread(target=increment) for _ in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(counter.value, threads_count * increments_count)
+
+    def test_numbers_are_shared_by_threads(self):
+        counter = CallCounter()
+        sampler = FrequencySampler(10)
+        sampled = []
+
+        def call():
+            for _ in range(5):
+                if sampler.should_sample(counter.increment()):
+                    sampled.append(1)
+
+        threads = [threading.Thread(target=call) for _ in range(200)]
+        for thread in threads:
+            thread.start()
+            thread.join()
+
+        self.assertEqual(len(sampled), 100)
+        self.assertEqual(counter.value, 1000)
+
+    def test_shards_of_finished_threads_are_pruned(self):
+        counter = CallCounter()
+        counter.increment()
+
+        threads = [threading.Thread(target=counter.increment) for _ in range(50)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        gc.collect()
+
+        self.assertEqual(len(counter._shards), 1)
+        self.assertEqual(counter.value, 51)
+
+
+class TestSamplers(TestCase):
+    def test_frequency_sampler(self):
+        sampler = FrequencySampler(3).clone()
+
+        self.assertEqual([sampler.should_sample(i) for i in range(1, 7)], [False, False, True, False, False, True])
+
+    def test_probability_sampler(self):
+        sampler = ProbabilitySampler(0.5).clone()
+
+        with patch('log_decorator.sampling.random.random', side_effect=[0.1, 0.9]):
+            self.assertTrue(sampler.should_sample(1))
+            self.assertFalse(sampler.should_sample(2))
+
+        self.assertFalse(ProbabilitySampler(0).should_sample(1))
+        self.assertTrue(ProbabilitySampler(1).should_sample(1))
+
+    @patch('log_decorator.sampling.time.monotonic')
+    def test_rate_limit_sampler(self, monotonic_mock):
+        monotonic_mock.return_value = 100
+        sampler = RateLimitSampler(2).clone()
+
+        self.assertEqual([sampler.should_sample(i) for i in range(3)], [True, True, False])
+
+        monotonic_mock.return_value = 100.5
+        self.assertEqual([sampler.should_sample(i) for i in range(2)], [True, False])
+
+        monotonic_mock.return_value = 110
+        self.assertEqual([sampler.should_sample(i) for i in range(3)], [True, True, False])
+
+    @patch('log_decorator.sampling.random.random', return_value=0.3)
+    @patch('log_decorator.sampling.time.monotonic')
+    def test_adaptive_sampler(self, monotonic_mock, random_mock):
+        monotonic_mock.return_value = 100
+        sampler = AdaptiveSampler(10).clone()
+
+        self.assertTrue(all(sampler.should_sample(i) for i in range(39)))
+
+        monotonic_mock.return_value = 101
+        sampler.should_sample(40)
+        self.assertEqual(sampler.probability, 0.25)
+        self.assertFalse(sampler.should_sample(41))
+
+        monotonic_mock.return_value = 103
+        self.assertTrue(sampler.should_sample(42))
+        self.assertEqual(sampler.probability, 1)
@@ -0,0 +1,87 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from log_decorator.stats import CallStats, LatencyHistogram, StatsRegistry, TimeUnit
+
+
+class TestLatencyHistogram(TestCase):
+    def test_buckets(self):
+        for value in (0, 1, 7, 8, 15, 16, 17, 1000, 123456789):
+            index = LatencyHistogram.get_bucket_index(value)
+            upper_bound = LatencyHistogram.get_bucket_upper_bound(index)
+
+            self.assertLessEqual(value, upper_bound)
+            self.assertLess(upper_bound - value, max(value, 1) / 8)
+            self.assertEqual(LatencyHistogram.get_bucket_index(upper_bound + 1), index + 1)
+
+    def test_percentile(self):
+        histogram = LatencyHistogram()
+        self.assertEqual(histogram.percentile(50), 0)
+
+        for value in range(1, 101):
+            histogram.record(value * 1000)
+
+        self.assertEqual(histogram.count, 100)
+        self.assertAlmostEqual(histogram.percentile(50), 50000, delta=50000 / 8)
+        self.assertAlmostEqual(histogram.percentile(99), 99000, delta=99000 / 8)
+        self.assertAlmostEqual(histogram.percentile(100), 100000, delta=100000 / 8)
+
+
+class TestCallStats(TestCase):
+    def test_snapshot(self):
+        stats = CallStats('test')
+
+        stats.record(1000000)
+        stats.record(3000000)
+        stats.record(None)
+
+        snapshot = stats.snapshot()
+
+        self.assertEqual(snapshot['count'], 3)
+        self.assertEqual(snapshot['errors'], 1)
+        self.assertEqual(snapshot['mean_ms'], 2)
+        self.assertEqual(snapshot['min_ms'], 1)
+        self.assertEqual(snapshot['max_ms'], 3)
+        self.assertAlmostEqual(snapshot['p50_ms'], 1, delta=1 / 8)
+        self.assertEqual(snapshot['p99_ms'], 3)
+
+        snapshot = stats.snapshot(TimeUnit.US, percentiles=(75,))
+        self.assertEqual(snapshot['max_us'], 3000)
+        self.assertIn('p75_us', snapshot)
+
+        stats.reset()
+        snapshot = stats.snapshot()
+
+        self.assertEqual(snapshot['count'], 0)
+        self.assertIsNone(snapshot['mean_ms'])
+        self.assertIsNone(snapshot['p50_ms'])
+
+    @patch('log_decorator.stats.time.monotonic')
+    def test_pop_summary(self, monotonic_mock):
+        monotonic_mock.return_value = 100
+        stats = CallStats('test')
+        stats.record(1000)
+
+        monotonic_mock.return_value = 105
+        self.assertIsNone(stats.pop_summary(10))
+
+        monotonic_mock.return_value = 110
+        summary = stats.pop_summary(10)
+
+        self.assertEqual(summary['count'], 1)
+        self.assertEqual(summary['period_s'], 10)
+        self.assertEqual(stats.snapshot()['count'], 0)
+
+
+class TestStatsRegistry(TestCase):
+    def test_registry(self):
+        registry = StatsRegistry()
+
+        stats = registry.get_stats('test')
+        self.assertIs(registry.get_stats('test'), stats)
+
+        stats.record(1000)
+        self.assertEqual(registry.snapshot()['test']['count'], 1)
+
+        registry.reset()
+        self.assertEqual(registry.snapshot()['test']['count'], 0)
@@ -0,0 +1,182 @@
+import io
+import logging
+import os
+import tempfile
+from contextlib import redirect_stdout
+from unittest import TestCase
+from unittest.mock import patch
+
+import ujson
+
+from log_decorator import binary_trace, log, trace_index
+from log_decorator.log_formatter import FormatterMode, LogFormatter
+
+
+class TestTraceIndex(TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.binary_path = os.path.join(self.directory.name, 'trace.bin')
+        self.json_path = os.path.join(self.directory.name, 'trace.log')
+
+        self.logger = logging.getLogger('test_trace_index')
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+
+        json_handler = logging.FileHandler(self.json_path)
+        json_handler.setFormatter(LogFormatter(formatter_mode=FormatterMode.JSON, limit_keys_to=None))
+        self.logger.handlers = [binary_trace.BinaryTraceHandler(self.binary_path), json_handler]
+
+    def tearDown(self):
+        for handler in self.logger.handlers:
+            handler.close()
+        self.logger.handlers = []
+        self.directory.cleanup()
+
+        super().tearDown()
+
+    def test_find(self):
+        slow_func_name = 'log_decorator.tests.test_trace_index.TestTraceIndex.test_find.<locals>.slow'
+        fast_func_name = 'log_decorator.tests.test_trace_index.TestTraceIndex.test_find.<locals>.fast'
+
+        clock = [0]
+
+        @log.log(self.logger, track_exec_time=True)
+        def slow(arg, duration_ms):
+            clock[0] += duration_ms * 1000000
+            return arg
+
+        @log.log(self.logger)
+        def fast():
+            return
+
+        with patch('time.perf_counter_ns', side_effect=lambda: clock[0]):
+            slow(1, 60)
+            fast()
+            slow(2, 1)
+            slow(3, 50)
+
+        for path in (self.binary_path, self.json_path):
+            with trace_index.TraceIndex(path) as index:
+                self.assertEqual(len(index), 8)
+
+                records = list(index.find(function=slow_func_name, min_execution_time_ms=50))
+                self.assertEqual([i['message'] for i in records], [f'return {slow_func_name}'] * 2)
+                self.assertEqual([i['result'] for i in records], [1, 3])
+                self.assertEqual([i['input_data']['arg'] for i in records], [1, 3])
+
+                records = list(index.find(function=fast_func_name))
+                self.assertEqual(
+                    [i['message'] for i in records],
+                    [f'call {fast_func_name}', f'return {fast_func_name}'],
+                )
+
+                records = list(index.find(call_id=records[0]['call_id']))
+                self.assertEqual([i['function'] for i in records], [fast_func_name] * 2)
+
+                records = list(index.find(call_id=records[0]['call_id'], function=slow_func_name))
+                self.assertEqual(records, [])
+
+                self.assertEqual(list(index.find(function='unknown')), [])
+
+                timestamps = [i['timestamp'] for i in index.find()]
+                self.assertEqual(timestamps, sorted(timestamps))
+                self.assertEqual(
+                    [i['timestamp'] for i in index.find(since=timestamps[2], until=timestamps[5])],
+                    timestamps[2:5],
+                )
+                records = list(index.find(function=slow_func_name, since=timestamps[2], until=timestamps[5]))
+                self.assertEqual([i['message'] for i in records], [f'call {slow_func_name}'])
+
+    def test_index_update(self):
+        self.logger.info('test 1', extra={'function': 'test', 'execution_time_us': 2000})
+
+        for path in (self.binary_path, self.json_path):
+            with trace_index.TraceIndex(path) as index:
+                self.assertEqual(len(index), 1)
+            self.assertTrue(os.path.exists(f'{path}.idx'))
+
+        self.logger.info('test 2', extra={'function': 'other', 'execution_time_ns': 3000000})
+        with open(self.json_path, 'a') as stream:
+            stream.write('not json\n{"timestamp":')
+
+        for path in (self.binary_path, self.json_path):
+            with trace_index.TraceIndex(path) as index:
+                self.assertEqual([i['message'] for i in index.find(min_execution_time_ms=2)], ['test 1', 'test 2'])
+                self.assertEqual([i['message'] for i in index.find(min_execution_time_ms=2.5)], ['test 2'])
+
+            with patch.object(trace_index.TraceIndex, '_update_json') as update_json_mock:
+                with patch.object(trace_index.TraceIndex, '_update_binary') as update_binary_mock:
+                    with trace_index.TraceIndex(path) as index:
+                        self.assertEqual(len(index), 2)
+
+            self.assertEqual(update_binary_mock.call_count + update_json_mock.call_count, int(path == self.json_path))
+
+    def test_replaced_file(self):
+        self.logger.info('test 1', extra={'function': 'test'})
+
+        with trace_index.TraceIndex(self.json_path) as index:
+            self.assertEqual(len(index), 1)
+
+        os.remove(self.json_path)
+        with open(self.json_path, 'w') as stream:
+            stream.write(ujson.dumps({'timestamp': 1.5, 'message': 'test 2', 'function': 'other'}))
+            stream.write('\n')
+
+        with trace_index.TraceIndex(self.json_path) as index:
+            self.assertEqual([i['message'] for i in index.find(function='other')], ['test 2'])
+            self.assertEqual(list(index.find(function='test')), [])
+
+        with open(f'{self.json_path}.idx', 'wb') as stream:
+            stream.write(b'broken')
+
+        with trace_index.TraceIndex(self.json_path) as index:
+            self.assertEqual(len(index), 1)
+
+    def test_rotated_file(self):
+        self.logger.handlers[0].close()
+        os.remove(self.binary_path)
+        handler = binary_trace.BinaryTraceHandler(self.binary_path, max_bytes=10 ** 6, backup_count=1)
+        self.logger.handlers[0] = handler
+
+        # interned strings written at the start of each file are longer than the fingerprint
+        message = 'test message ' * 10
+        for i in range(10):
+            self.logger.info(message, extra={'function': 'test', 'call_id': f'old {i}'})
+        with trace_index.TraceIndex(self.binary_path) as index:
+            self.assertEqual(len(index), 10)
+        size = os.path.getsize(self.binary_path)
+
+        handler.doRollover()
+        for i in range(20):
+            self.logger.info(message, extra={'function': 'test', 'call_id': f'new {i}'})
+        self.assertGreater(os.path.getsize(self.binary_path), size)
+
+        with trace_index.TraceIndex(self.binary_path) as index:
+            self.assertEqual(len(index), 20)
+            self.assertEqual([i['call_id'] for i in index.find(call_id='new 1')], ['new 1'])
+            self.assertEqual(list(index.find(call_id='old 1')), [])
+
+    def test_empty_file(self):
+        path = os.path.join(self.directory.name, 'empty.bin')
+        with open(path, 'wb') as stream:
+            stream.write(b'\x01')
+
+        with trace_index.TraceIndex(path) as index:
+            self.assertEqual(len(index), 0)
+            self.assertEqual(list(index.find()), [])
+
+        self.assertFalse(os.path.exists(f'{path}.idx'))
+
+    def test_main(self):
+        self.logger.info('test', extra={'function': 'test', 'call_id': '1'})
+        self.logger.info('test', extra={'function': 'test', 'call_id': '2'})
+
+        index_path = os.path.join(self.directory.name, 'index')
+        output = io.StringIO()
+        with redirect_stdout(output):
+            trace_index.main([self.binary_path, '--index', index_path, '--function', 'test', '--call-id', '2'])
+
+        self.assertEqual([ujson.loads(i)['call_id'] for i in output.getvalue().splitlines()], ['2'])
+        self.assertTrue(os.path.exists(index_path))
@@ -0,0 +1,343 @@
+"""
+Index of trace files for queries by `call_id`, `function`, time and execution time.
+
+Trace files written by `BinaryTraceHandler` or by `LogFormatter` in `FormatterMode.JSON` (one JSON object per line)
+are memory-mapped and scanned once to build a sidecar index file (`<path>.idx` by default) with offset, timestamp,
+function, call id and execution time of each record. Queries are answered from the index and only matching records
+are read from the file. The index is updated incrementally when the file grows and rebuilt if the file is replaced
+(e.g. rotated), which is detected by bytes at the start of the file and just before the end of its indexed part.
+
+Run to print matching records as JSON lines:
+
+    python -m log_decorator.trace_index trace.bin --function app.handle --min-execution-time-ms 50
+"""
+import argparse
+import bisect
+import marshal
+import math
+import mmap
+import os
+import sys
+from array import array
+from enum import Enum
+from typing import Any, Iterable, Iterator, Optional
+
+import ujson
+
+from .binary_trace import FRAME_HEADER, HEADER_FRAME, MAGIC, RECORD_FRAME, TraceDecoder
+
+INDEX_SUFFIX = '.idx'
+
+INDEX_VERSION = 2
+
+FINGERPRINT_SIZE = 64
+
+EXECUTION_TIME_KEYS = {  # noqa: WPS407
+    'execution_time_ms': 1,
+    'execution_time_us': 1e-3,
+    'execution_time_ns': 1e-6,
+}
+
+
+class TraceFormat(str, Enum):
+    """Available trace file formats."""
+
+    BINARY = 'binary'
+    JSON = 'json'
+
+
+class TraceIndex:
+    """
+    Memory-mapped trace file with its index.
+
+    The index is loaded from `index_path` (`path` with `.idx` suffix by default), records appended to the file since
+    the index was saved are indexed and the index is saved back. Use it as a context manager or call `close` to unmap
+    the file.
+    """
+
+    def __init__(self, path: str, index_path: Optional[str] = None):
+        self.path = path
+        self.index_path = index_path or f'{path}{INDEX_SUFFIX}'
+
+        self._file = open(path, 'rb')  # noqa: WPS515
+        size = os.fstat(self._file.fileno()).st_size
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+        self._reset()
+        self._load()
+        if self._update():
+            self._save()
+
+        self._call_id_index = None
+        self._time_index = None
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __enter__(self) -> 'TraceIndex':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Unmap and close the trace file."""
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+    def find(
+        self,
+        function: Optional[str] = None,
+        call_id: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        min_execution_time_ms: Optional[float] = None,
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Yield records matching all passed conditions, e.g. `find(function=name, min_execution_time_ms=50)` yields
+        return records of calls slower than 50 ms (execution time is tracked with `track_exec_time=True`).
+
+        `since` and `until` are timestamps (inclusive and exclusive). Records are yielded as dicts the same as
+        `binary_trace.read_trace` does, in the file order if `call_id` or `function` is passed and in the time order
+        otherwise.
+        """
+        function_id = None
+        if function is not None:
+            function_id = self._function_ids.get(function)
+            if function_id is None:
+                return
+
+        if call_id is not None:
+            numbers = self._get_call_id_index().get(call_id, ())
+        elif function_id is not None:
+            numbers = self._function_records[function_id]
+        else:
+            numbers = self._get_time_range(since, until)
+
+        for number in numbers:
+            if function_id is not None and self._functions_column[number] != function_id:
+                continue
+            if since is not None and not self._timestamps[number] >= since:
+                continue
+            if until is not None and not self._timestamps[number] < until:
+                continue
+            if min_execution_time_ms is not None and not self._execution_times[number] >= min_execution_time_ms:
+                continue
+            yield self._read(number)
+
+    def _reset(self) -> None:
+        self._format = None
+        self._size = 0
+        self._offsets = array('q')
+        self._timestamps = array('d')
+        self._execution_times = array('d')
+        self._functions = []
+        self._function_ids = {}
+        self._function_records = []
+        self._functions_column = array('l')
+        self._call_ids = []
+        self._segments = []
+        self._segments_column = array('l')
+
+    def _load(self) -> None:
+        try:
+            with open(self.index_path, 'rb') as index_file:
+                index = marshal.load(index_file)
+        except (OSError, EOFError, ValueError, TypeError):
+            return
+
+        if (
+            type(index) is not dict
+            or index.get('version') != INDEX_VERSION
+            or index['size'] > len(self._data)
+            or _get_fingerprint(self._data, index['size']) != index['fingerprint']
+        ):
+            return
+
+        self._format = TraceFormat(index['format'])
+        self._size = index['size']
+        self._offsets.frombytes(index['offsets'])
+        self._timestamps.frombytes(index['timestamps'])
+        self._execution_times.frombytes(index['execution_times'])
+        self._functions = index['functions']
+        self._function_ids = {j: i for i, j in enumerate(self._functions)}
+        self._function_records = [array('q', i) for i in index['function_records']]
+        self._functions_column.frombytes(index['functions_column'])
+        # call ids are stored as a single string, which is much faster to load than a list of strings
+        self._call_ids = index['call_ids'].split('\n') if self._offsets else []
+        self._segments = index['segments']
+        self._segments_column.frombytes(index['segments_column'])
+
+    def _save(self) -> None:
+        index = {
+            'version': INDEX_VERSION,
+            'format': self._format.value,
+            'size': self._size,
+            'fingerprint': _get_fingerprint(self._data, self._size),
+            'offsets': self._offsets.tobytes(),
+            'timestamps': self._timestamps.tobytes(),
+            'execution_times': self._execution_times.tobytes(),
+            'functions': self._functions,
+            'function_records': [i.tobytes() for i in self._function_records],
+            'functions_column': self._functions_column.tobytes(),
+            'call_ids': '\n'.join(self._call_ids),
+            'segments': self._segments,
+            'segments_column': self._segments_column.tobytes(),
+        }
+
+        temporary_path = f'{self.index_path}.tmp'
+        with open(temporary_path, 'wb') as index_file:
+            marshal.dump(index, index_file)
+        os.replace(temporary_path, self.index_path)
+
+    def _update(self) -> bool:
+        """Index records written after the indexed part of the file, return if there were any."""
+        if self._size == len(self._data):
+            return False
+
+        if self._format is None:
+            if len(self._data) < FRAME_HEADER.size + len(MAGIC):
+                # the header of a binary file may be not written completely yet
+                return False
+            is_binary = self._data[FRAME_HEADER.size:FRAME_HEADER.size + len(MAGIC)] == MAGIC
+            self._format = TraceFormat.BINARY if is_binary else TraceFormat.JSON
+
+        indexed_size = self._size
+        if self._format == TraceFormat.BINARY:
+            self._update_binary()
+        else:
+            self._update_json()
+        return self._size != indexed_size
+
+    def _update_binary(self) -> None:
+        data = self._data
+        position = self._size
+        decoder = TraceDecoder(self._segments[-1] if self._segments else None)
+
+        while position + FRAME_HEADER.size <= len(data):
+            length, kind = FRAME_HEADER.unpack_from(data, position)
+            end = position + FRAME_HEADER.size + length
+            if end > len(data):
+                break
+
+            record = decoder.decode(kind, data[position + FRAME_HEADER.size:end])
+            if kind == HEADER_FRAME:
+                self._segments.append(decoder.strings)
+            elif record is not None:
+                self._add(position, record)
+            position = end
+
+        self._size = position
+
+    def _update_json(self) -> None:
+        data = self._data
+        position = self._size
+
+        while True:
+            end = data.find(b'\n', position)
+            if end == -1:
+                break
+
+            try:
+                record = ujson.loads(data[position:end])
+            except ValueError:
+                record = None
+            if type(record) is dict:
+                self._add(position, record)
+            position = end + 1
+
+        self._size = position
+
+    def _add(self, offset: int, record: dict[str, Any]) -> None:
+        timestamp = record.get('timestamp')
+        execution_time = math.nan
+        for key, ratio in EXECUTION_TIME_KEYS.items():
+            if key in record:
+                execution_time = record[key] * ratio
+                break
+
+        function = record.get('function')
+        function_id = -1
+        if type(function) is str:
+            function_id = self._function_ids.get(function)
+            if function_id is None:
+                function_id = len(self._functions)
+                self._functions.append(function)
+                self._function_ids[function] = function_id
+                self._function_records.append(array('q'))
+            self._function_records[function_id].append(len(self._offsets))
+
+        call_id = record.get('call_id')
+
+        self._offsets.append(offset)
+        self._timestamps.append(timestamp if type(timestamp) is float else -math.inf)
+        self._execution_times.append(execution_time)
+        self._functions_column.append(function_id)
+        self._call_ids.append(call_id if type(call_id) is str else '')
+        self._segments_column.append(len(self._segments) - 1)
+
+    def _read(self, number: int) -> dict[str, Any]:
+        offset = self._offsets[number]
+
+        if self._format == TraceFormat.JSON:
+            return ujson.loads(self._data[offset:self._data.find(b'\n', offset)])
+
+        length = FRAME_HEADER.unpack_from(self._data, offset)[0]
+        payload = self._data[offset + FRAME_HEADER.size:offset + FRAME_HEADER.size + length]
+        return TraceDecoder(self._segments[self._segments_column[number]]).decode(RECORD_FRAME, payload)
+
+    def _get_call_id_index(self) -> dict[str, list[int]]:
+        if self._call_id_index is None:
+            self._call_id_index = {}
+            for number, call_id in enumerate(self._call_ids):
+                self._call_id_index.setdefault(call_id, []).append(number)
+        return self._call_id_index
+
+    def _get_time_range(self, since: Optional[float], until: Optional[float]) -> list[int]:
+        if self._time_index is None:
+            # records of different threads may be written not exactly in the order of their timestamps
+            order = sorted(range(len(self)), key=self._timestamps.__getitem__)
+            self._time_index = (order, [self._timestamps[i] for i in order])
+
+        order, timestamps = self._time_index
+        start = 0 if since is None else bisect.bisect_left(timestamps, since)
+        end = len(order) if until is None else bisect.bisect_left(timestamps, until)
+        return order[start:end]
+
+
+def _get_fingerprint(data: Any, size: int) -> bytes:
+    """
+    Return bytes identifying the file indexed up to `size`: the start of a file is the same in all files written by
+    the same handler (header and interned strings), so bytes of the last indexed records are taken too.
+    """
+    return data[:FINGERPRINT_SIZE] + data[max(size - FINGERPRINT_SIZE, 0):size]
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    """Print records of the trace file matching the query as JSON lines."""
+    parser = argparse.ArgumentParser(description='Query binary or JSON lines trace file using its sidecar index.')
+    parser.add_argument('path', help='trace file')
+    parser.add_argument('--index', help=f'index file, trace file path with {INDEX_SUFFIX} suffix by default')
+    parser.add_argument('--function', help='function name')
+    parser.add_argument('--call-id', help='call id')
+    parser.add_argument('--since', type=float, help='min timestamp of records')
+    parser.add_argument('--until', type=float, help='max timestamp of records (exclusive)')
+    parser.add_argument('--min-execution-time-ms', type=float, help='min execution time of return records')
+    args = parser.parse_args(argv)
+
+    with TraceIndex(args.path, args.index) as index:
+        records = index.find(
+            function=args.function,
+            call_id=args.call_id,
+            since=args.since,
+            until=args.until,
+            min_execution_time_ms=args.min_execution_time_ms,
+        )
+        for record in records:
+            sys.stdout.write(ujson.dumps(record, ensure_ascii=False, default=repr))
+            sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()